@@ -0,0 +1,62 @@
+"""
+compares the latency and accuracy of each TaskClassifier backend
+on the training examples of a settings file
+
+python -m benchmarks.classifier_backends [path/to/settings.yml]
+"""
+from sys import argv
+from time import perf_counter
+
+from numpy import arange, array_split, median, ndarray, setdiff1d
+from numpy.random import default_rng
+
+from task_tracker.yaml_utils.dataloader import YamlLoader
+from task_tracker.trained_models.task_classifier import TaskClassifier
+from task_tracker.trained_models.backends import BACKENDS, ClassifierBackend
+
+FOLDS = 5
+LATENCY_SAMPLES = 200
+
+
+def cross_validated_accuracy(
+    backend_name: str, x: ndarray, y: ndarray, folds: int = FOLDS
+) -> float:
+    """
+    fraction of held out examples classified correctly
+    """
+    shuffled = default_rng(0).permutation(len(y))
+    correct = 0
+    for fold in array_split(shuffled, folds):
+        train = setdiff1d(shuffled, fold)
+        backend = BACKENDS[backend_name]()
+        backend.fit(x[train], y[train])
+        correct += (backend.predict(x[fold]) == y[fold]).sum()
+    return correct / len(y)
+
+
+def single_row_latency(backend: ClassifierBackend, x: ndarray) -> float:
+    """
+    median time (in ms) to predict one input vector
+    """
+    timings = list()
+    for index in arange(LATENCY_SAMPLES) % len(x):
+        start = perf_counter()
+        backend.predict(x[index : index + 1])
+        timings.append(perf_counter() - start)
+    return median(timings) * 1000
+
+
+if __name__ == "__main__":
+    settings_path = argv[1] if len(argv) > 1 else "task_tracker/config/settings.yml"
+    settings = YamlLoader.safe_load_tasks(settings_path)
+    x, y = TaskClassifier.encode_train_data(settings=settings)
+    print(f"{len(y)} examples, {len(settings.Tasks)} tasks, {x.shape[1]} features")
+    print(f"{'backend':<16}{'accuracy':>10}{'latency (ms)':>14}")
+    for backend_name in BACKENDS:
+        backend = BACKENDS[backend_name]()
+        backend.fit(x, y)
+        print(
+            f"{backend_name:<16}"
+            f"{cross_validated_accuracy(backend_name, x, y):>10.3f}"
+            f"{single_row_latency(backend, x):>14.3f}"
+        )
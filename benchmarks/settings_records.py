@@ -0,0 +1,64 @@
+"""
+compares the memory and attribute access time of the settings
+loaded into Tasks dicts and into (frozen) task records
+
+python -m benchmarks.settings_records [path/to/settings.yml]
+"""
+from sys import argv
+from copy import deepcopy
+from timeit import timeit
+from tracemalloc import start, stop, take_snapshot
+
+from yaml import safe_load
+
+from task_tracker.yaml_utils.dataloader import YamlLoader
+from task_tracker.yaml_utils.datatypes import Tasks, tasks
+from task_tracker.yaml_utils.records import records
+
+ACCESSES = 100_000
+
+
+def allocated_bytes(load, data: dict) -> int:
+    """
+    bytes allocated to hold the loaded settings
+    """
+    data = deepcopy(data)
+    start()
+    before = take_snapshot()
+    settings = load(data)
+    after = take_snapshot()
+    stop()
+    del settings
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def attribute_access(settings: Tasks) -> float:
+    """
+    time (in ns) to read a task's flags and slot settings
+    """
+    task = next(iter(settings.Tasks.values()))
+    slot_names = list(task.Memory)
+
+    def read() -> None:
+        task.Complete
+        task.Possible
+        task.Action.Say
+        for slot_name in slot_names:
+            task.Memory[slot_name].Default
+
+    return timeit(read, number=ACCESSES) / ACCESSES * 1e9
+
+
+if __name__ == "__main__":
+    settings_path = argv[1] if len(argv) > 1 else "task_tracker/config/settings.yml"
+    with open(settings_path) as datafile:
+        data = safe_load(datafile)
+    YamlLoader.check_data(data)
+    print(f"{len(data['Tasks'])} tasks")
+    print(f"{'settings':<10}{'memory (KiB)':>14}{'access (ns)':>13}")
+    for name, load in (("Tasks", tasks), ("records", records)):
+        print(
+            f"{name:<10}"
+            f"{allocated_bytes(load, data) / 1024:>14.1f}"
+            f"{attribute_access(load(deepcopy(data))):>13.0f}"
+        )
@@ -1,3 +1,6 @@
+from task_tracker.core import cache_policy
+
+
 def ExampleAction(location: str) -> str:
     return "some generated text"
 
@@ -6,6 +9,7 @@ def PlayRadio() -> str:
     return "[radio turns on]"
 
 
+@cache_policy.cache_action(ttl=60)
 def TimeNow() -> str:
     return "3pm"
 
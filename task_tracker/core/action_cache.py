@@ -0,0 +1,92 @@
+from typing import Any, Dict, Hashable, Optional
+from threading import Lock
+
+from task_tracker.datastructures.lru_cache import LRUCache
+from task_tracker.yaml_utils.action_binder import BoundAction
+from task_tracker.core.cache_policy import CachePolicy
+
+_MISS = object()  # (None can be a cached result)
+
+
+class ActionCache:
+    """
+    results of custom actions with a cache policy
+    keyed by the action's argument values
+    (one cache per action - and one ActionCache per StateTracker
+    as the policies come from its settings)
+    """
+
+    def __init__(self) -> None:
+        self.policies: Dict[str, CachePolicy] = dict()
+        self.caches: Dict[str, LRUCache] = dict()
+        self.lock = Lock()
+
+    def configure(self, policies: Dict[str, CachePolicy]) -> None:
+        """
+        sets the cache policies from the settings
+        (clearing any cached results)
+        """
+        with self.lock:
+            self.policies = dict(policies)
+            self.caches.clear()
+
+    def call(self, action: BoundAction, slot_values: Dict[str, Any]) -> Any:
+        """
+        the cached result of the action (if it has a cache policy)
+        otherwise the result of calling it
+        """
+        cache = self.get_cache(action)
+        key = None if cache is None else ActionCache.key(action, slot_values)
+        if key is None:
+            return action(slot_values)
+        result = cache.get(key, _MISS)
+        if result is _MISS:
+            result = action(slot_values)
+            cache.put(key, result)
+        return result
+
+    def get_cache(self, action: BoundAction) -> Optional[LRUCache]:
+        cache = self.caches.get(action.name)
+        if cache is not None:
+            return cache
+        policy = self.policies.get(
+            action.name, getattr(action.function, "cache_policy", None)
+        )
+        if policy is None:
+            return None
+        with self.lock:
+            return self.caches.setdefault(
+                action.name,
+                LRUCache(max_entries=policy.max_entries, ttl=policy.ttl),
+            )
+
+    @staticmethod
+    def key(action: BoundAction, slot_values: Dict[str, Any]) -> Optional[Hashable]:
+        """
+        the values of the action's arguments
+        (None if they cannot be hashed - in which case nothing is cached)
+        """
+        key = (
+            tuple(
+                map(lambda argument: argument.resolve(slot_values), action.arguments)
+            ),
+            tuple(
+                sorted(
+                    (keyword, argument.resolve(slot_values))
+                    for keyword, argument in action.keyword_arguments.items()
+                )
+            ),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        hits, misses, evictions etc. of each action's cache
+        """
+        return {
+            action_name: cache.stats() for action_name, cache in self.caches.items()
+        }
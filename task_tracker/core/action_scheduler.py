@@ -0,0 +1,92 @@
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from threading import Semaphore
+from time import monotonic
+
+from task_tracker.yaml_utils.action_binder import ActionBinder, BoundAction
+from task_tracker.core.action_cache import ActionCache
+
+ScheduledAction = Tuple[str, Future, Optional[float]]  # action name, result, deadline
+
+
+class ActionScheduler:
+    """
+    runs the Do actions of all the tasks completed in a turn
+    concurrently on a bounded pool of threads
+    (actions can be limited to a number of concurrent calls
+    and given a timeout - by action name)
+    the results of actions with a cache policy are kept in its action_cache
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        timeout: Optional[float] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+        concurrency_limits: Optional[Dict[str, int]] = None,
+        action_cache: Optional[ActionCache] = None,
+    ) -> None:
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="action"
+        )
+        self.timeout = timeout
+        self.action_cache = ActionCache() if action_cache is None else action_cache
+        self.timeouts = dict() if timeouts is None else timeouts
+        self.semaphores = {
+            action_name: Semaphore(limit)
+            for action_name, limit in (
+                dict() if concurrency_limits is None else concurrency_limits
+            ).items()
+        }
+
+    def submit(self, custom_action: str, slots: Dict[str, Any]) -> ScheduledAction:
+        """
+        starts the (bound) action with the slot values
+        (its timeout starts now - not when its result is needed)
+        """
+        action = ActionBinder.bind(custom_action)
+        timeout = self.timeouts.get(action.name, self.timeout)
+        return (
+            action.name,
+            self.executor.submit(
+                ActionScheduler.run,
+                action,
+                slots,
+                self.semaphores.get(action.name),
+                self.action_cache,
+            ),
+            None if timeout is None else monotonic() + timeout,
+        )
+
+    @staticmethod
+    def run(
+        action: BoundAction,
+        slots: Dict[str, Any],
+        semaphore: Optional[Semaphore],
+        action_cache: ActionCache,
+    ) -> Any:
+        if semaphore is None:
+            return action_cache.call(action, slots)
+        with semaphore:
+            return action_cache.call(action, slots)
+
+    @staticmethod
+    def results(scheduled_actions: List[ScheduledAction]) -> Optional[Dict[str, str]]:
+        """
+        waits for the result of each action
+        returns action_name,action_result
+        (or None if any action ran out of time)
+        """
+        action_dictionary = dict()
+        for action_name, future, deadline in scheduled_actions:
+            try:
+                action_dictionary[f"__{action_name}__"] = future.result(
+                    timeout=None if deadline is None else max(0, deadline - monotonic())
+                )
+            except TimeoutError:
+                future.cancel()
+                return None
+        return action_dictionary
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,29 @@
+from typing import Callable
+
+
+class CachePolicy:
+    """
+    how long (in seconds) the results of a custom action can be reused
+    and how many (of the most recently used) results to keep
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 1000) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+
+def cache_action(ttl: float, max_entries: int = 1000) -> Callable:
+    """
+    declares a cache policy for a custom action
+    e.g.
+    @cache_action(ttl=60)
+    def TimeNow() -> str:
+        ...
+    (a policy in the settings' Actions: section takes precedence)
+    """
+
+    def set_cache_policy(custom_action: Callable) -> Callable:
+        custom_action.cache_policy = CachePolicy(ttl=ttl, max_entries=max_entries)
+        return custom_action
+
+    return set_cache_policy
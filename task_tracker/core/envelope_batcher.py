@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, List, Tuple
+from concurrent.futures import Future
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import monotonic
+
+QueuedItem = Tuple[Any, Future, float]  # item, result, time queued
+
+
+class EnvelopeBatcher:
+    """
+    collects the envelopes which arrive within a window
+    (until max_size are waiting or the first has waited max_wait_ms)
+    and forwards them together in one batch
+    each caller gets back the result for its own envelope
+    """
+
+    def __init__(
+        self,
+        forward_many: Callable[[List[Any]], List[Any]],
+        max_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self.forward_many = forward_many
+        self.max_size = max_size
+        self.max_wait_ms = max_wait_ms
+        self.queue: "Queue[QueuedItem]" = Queue()
+        self.batches = 0
+        self.batched = 0
+        self.largest_batch = 0
+        self.waited = 0.0
+        self.longest_wait = 0.0
+        self.lock = Lock()
+        self.closed = False
+        self.worker = Thread(
+            target=self.forward_continuously, name="envelope-batcher", daemon=True
+        )
+        self.worker.start()
+
+    def submit(self, envelope: Any) -> Future:
+        """
+        queues the envelope for the next batch
+        (raises RuntimeError once the batcher is closed)
+        """
+        result: Future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("envelope batcher is closed")
+            self.queue.put((envelope, result, monotonic()))
+        return result
+
+    def forward(self, envelope: Any) -> Any:
+        """
+        same as submit but waits for the result
+        """
+        return self.submit(envelope).result()
+
+    def next_batch(self) -> List[QueuedItem]:
+        """
+        waits for an envelope then collects any more
+        until the batch is full or the first envelope has waited long enough
+        """
+        batch = [self.queue.get()]
+        deadline = batch[0][2] + self.max_wait_ms / 1000
+        while len(batch) < self.max_size:
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, deadline - monotonic())))
+            except Empty:
+                break
+        return batch
+
+    def forward_continuously(self) -> None:
+        """
+        forwards each batch (until close queues None)
+        """
+        closed = False
+        while not closed:
+            batch = self.next_batch()
+            closed = any(result is None for _, result, _ in batch)
+            batch = [item for item in batch if item[1] is not None]
+            if any(batch):
+                self.forward_batch(batch)
+        self.drain()
+
+    def drain(self) -> None:
+        """
+        fails any envelope still queued once the worker stops
+        (none should be - as nothing is queued after close)
+        """
+        while True:
+            try:
+                _, result, _ = self.queue.get_nowait()
+            except Empty:
+                return
+            if result is not None and result.set_running_or_notify_cancel():
+                result.set_exception(RuntimeError("envelope batcher is closed"))
+
+    def forward_batch(self, batch: List[QueuedItem]) -> None:
+        """
+        every (not cancelled) caller gets either its result or an exception
+        (including when forward_many returns the wrong number of results)
+        """
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not any(batch):
+            return
+        self.record(batch, started=monotonic())
+        try:
+            results = self.forward_many([envelope for envelope, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"{len(results)} results returned for {len(batch)} envelopes"
+                )
+        except Exception as error:
+            for _, result, _ in batch:
+                result.set_exception(error)
+            return
+        for (_, result, _), envelope in zip(batch, results):
+            result.set_result(envelope)
+
+    def record(self, batch: List[QueuedItem], started: float) -> None:
+        with self.lock:
+            self.batches += 1
+            self.batched += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for _, _, queued in batch:
+                self.waited += started - queued
+                self.longest_wait = max(self.longest_wait, started - queued)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        queue depth, batch sizes and the latency (in ms) added by waiting
+        """
+        with self.lock:
+            return dict(
+                queue_depth=self.queue.qsize(),
+                batches=self.batches,
+                mean_batch_size=self.batched / self.batches if self.batches else 0.0,
+                max_batch_size=self.largest_batch,
+                mean_added_latency=self.waited / self.batched * 1000
+                if self.batched
+                else 0.0,
+                max_added_latency=self.longest_wait * 1000,
+            )
+
+    def close(self) -> None:
+        """
+        forwards the envelopes already queued then stops
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put((None, None, monotonic()))
+        self.worker.join()
@@ -1,10 +1,17 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from asyncio import CancelledError, Future, get_running_loop, shield, wait, wait_for
+from concurrent.futures import Executor
+
 from task_tracker.datastructures.slots import Slots
-from task_tracker.datastructures.signals import Signals
+from task_tracker.datastructures.signals import Signals, WORD_EMBEDDINGS
 from task_tracker.datastructures.stack import Stack
 from task_tracker.core.task_policy import TaskPolicy
 from task_tracker.core.task_compiler import TaskCompiler
-from task_tracker.yaml_utils.dataloader import YamlLoader
+from task_tracker.core.action_scheduler import ActionScheduler
+from task_tracker.yaml_utils.artifact import SettingsArtifact
 from task_tracker.yaml_utils.datatypes import Tasks
+from task_tracker.trained_models.task_classifier import DEFAULT_CLASSIFIER_PATH
+from task_tracker.startup import timed
 
 
 class StateTracker:
@@ -17,13 +24,57 @@ class StateTracker:
     def __init__(
         self,
         settings_filename: str,
-        task_classifier_path: str = "task_tracker/trained_models/random_forest.joblib",
+        task_classifier_path: str = DEFAULT_CLASSIFIER_PATH,
+        compiled_settings_path: Optional[str] = None,
+        encoding_workers: int = 1,
+        feature_executor: Optional[Executor] = None,
+        classifier_executor: Optional[Executor] = None,
+        action_executor: Optional[Executor] = None,
+        action_scheduler: Optional[ActionScheduler] = None,
     ) -> None:
-        settings = YamlLoader.safe_load_tasks(settings_filename)
-        self.selector = TaskPolicy(
-            settings=settings, task_classifier_path=task_classifier_path
+        """
+        the executors run the blocking stages of update_async
+        (None = the event loop's default executor)
+        the action_scheduler runs the actions of the tasks completed in a turn
+        concurrently (by default on up to 8 threads without timeouts)
+        and caches their results as set in the settings' Actions: section
+        (so each tracker should have its own action_scheduler)
+        """
+        self.action_scheduler = (
+            ActionScheduler() if action_scheduler is None else action_scheduler
         )
+        self.feature_executor = feature_executor
+        self.classifier_executor = classifier_executor
+        self.action_executor = action_executor
+        with timed("load settings"):
+            settings = SettingsArtifact.load(
+                settings_path=settings_filename, artifact_path=compiled_settings_path
+            )
+        with timed("load task policy"):
+            self.selector = TaskPolicy(
+                settings=settings,
+                task_classifier_path=task_classifier_path,
+                encoding_workers=encoding_workers,
+            )
         self.compilor = TaskCompiler()
+        with timed("bind actions"):
+            self.compilor.bind_actions(
+                settings, action_cache=self.action_scheduler.action_cache
+            )
+        with timed("parse templates"):
+            self.compilor.parse_templates(settings)
+
+    def warm_up(self) -> None:
+        """
+        embeds every word of the Say templates
+        ahead of the first turn
+        (e.g. preload(warm_up=tracker.warm_up))
+        """
+        WORD_EMBEDDINGS.warm(
+            template
+            for task in self.selector.settings.Tasks.values()
+            for template in task.Action.Say
+        )
 
     def update(self, signals: Signals, slots: Slots, tasks: Stack) -> None:
         """
@@ -36,4 +87,120 @@ class StateTracker:
             slots=slots,
             tasks=tasks,
         )
-        self.compilor.pop_tasks_off_stack(tasks=tasks)
+        self.compilor.pop_tasks_off_stack(tasks=tasks, scheduler=self.action_scheduler)
+
+    async def update_async(
+        self,
+        signals: Signals,
+        slots: Slots,
+        tasks: Stack,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        same as update
+        but the blocking stages run on the executors
+        without blocking the event loop
+        (asyncio.TimeoutError is raised if the turn takes longer than timeout seconds
+        - see _update_async for what is updated by a turn which times out)
+        """
+        if timeout is None:
+            await self._update_async(signals=signals, slots=slots, tasks=tasks)
+        else:
+            await wait_for(
+                self._update_async(signals=signals, slots=slots, tasks=tasks),
+                timeout=timeout,
+            )
+
+    async def _update_async(self, signals: Signals, slots: Slots, tasks: Stack) -> None:
+        """
+        1) feature extraction starts on the feature_executor
+        while the slot values are updated and the triggers evaluated
+        (also on the feature_executor - as triggers can use features)
+        2) TaskClassifier: only if no task was triggered (on the classifier_executor)
+        3) the tasks are pushed to the stack and the completed tasks executed
+        (on the action_executor)
+        the stack is never changed once the turn has returned or raised:
+        if cancelled (or timed out) during 1) only the slot values
+        (and remembered trigger results) in the stack are updated
+        and once 3) has started the turn runs to completion
+        (the cancellation is raised when the stage finishes)
+        """
+        loop = get_running_loop()
+        features = loop.run_in_executor(
+            self.feature_executor,
+            self.selector.classifier.extract_features,
+            signals,
+        )
+        features.add_done_callback(StateTracker.retrieve_exception)
+        try:
+            triggered = await StateTracker.run_to_completion(
+                self.feature_executor,
+                self.selector.select_triggered_tasks,
+                signals,
+                slots,
+                tasks,
+            )
+            predicted = dict()
+            if not any(triggered):
+                await features
+                predicted = await loop.run_in_executor(
+                    self.classifier_executor,
+                    self.selector.select_tasks_via_model,
+                    signals,
+                )
+        finally:
+            features.cancel()
+        await StateTracker.run_to_completion(
+            self.action_executor, self.finish_turn, signals, tasks, triggered, predicted
+        )
+
+    def finish_turn(
+        self,
+        signals: Signals,
+        tasks: Stack,
+        triggered: Dict[str, Tasks],
+        predicted: Dict[str, Tasks],
+    ) -> None:
+        """
+        pushes the selected tasks to the stack
+        and executes the completed tasks
+        """
+        self.selector.update_feature_slot_values(signals=signals, tasks=tasks)
+        tasks.push_tasks_to_stack(triggered=triggered, predicted=predicted)
+        self.compilor.pop_tasks_off_stack(tasks=tasks, scheduler=self.action_scheduler)
+
+    @staticmethod
+    async def run_to_completion(
+        executor: Optional[Executor], function: Callable, *arguments: Any
+    ) -> Any:
+        """
+        runs the function on the executor
+        (if cancelled the cancellation is only raised once the function returns)
+        """
+        result = get_running_loop().run_in_executor(executor, function, *arguments)
+        try:
+            return await shield(result)
+        except CancelledError:
+            await wait([result])
+            raise
+
+    @staticmethod
+    def retrieve_exception(future: Future) -> None:
+        """
+        marks the exception of a future which may never be awaited as retrieved
+        (so it is not logged as never retrieved)
+        """
+        if not future.cancelled():
+            future.exception()
+
+    def update_many(self, turns: List[Tuple[Signals, Slots, Stack]]) -> None:
+        """
+        same as update
+        but for the (signals, slots, tasks) of many conversations at once
+        so the task classifier is only called once for the whole batch
+        """
+        self.selector.push_tasks_to_stacks(turns=turns)
+        for _, _, tasks in turns:
+            self.compilor.pop_tasks_off_stack(
+                tasks=tasks, scheduler=self.action_scheduler
+            )
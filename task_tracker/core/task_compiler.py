@@ -1,11 +1,15 @@
-from typing import Dict, Tuple, Generator, Optional
+from typing import Any, Dict, List, Tuple, Generator, Optional
 from random import choice
 
 from task_tracker.datastructures.stack import Stack
-from task_tracker.yaml_utils.datatypes import Tasks
-from task_tracker.yaml_utils.dataloader import YamlLoader
+from task_tracker.datastructures.open_tasks import OpenTasks
+from task_tracker.yaml_utils.datatypes import Tasks, YamlFields
+from task_tracker.yaml_utils.action_binder import ActionBinder
+from task_tracker.yaml_utils.template_parser import TemplateParser
+from task_tracker.core.action_cache import ActionCache
+from task_tracker.core.cache_policy import CachePolicy
+from task_tracker.core.action_scheduler import ActionScheduler, ScheduledAction
 from task_tracker.yaml_utils.messages import DefaultMessages
-from task_tracker.config.custom_actions import *
 
 
 class TaskCompiler:
@@ -14,67 +18,161 @@ class TaskCompiler:
     """
 
     @staticmethod
-    def pop_tasks_off_stack(tasks: Stack) -> None:
+    def bind_actions(settings: Tasks, action_cache: ActionCache) -> None:
+        """
+        parses every Do call up front
+        (rather than when its task is first completed)
+        and sets the cache policies of the custom actions in the settings
+        """
+        for task in settings.Tasks.values():
+            for custom_action in task.Action.Do:
+                ActionBinder.bind(custom_action)
+        action_cache.configure(
+            {
+                action_name: CachePolicy(
+                    ttl=cache_policy.TTL, max_entries=cache_policy.MaxEntries
+                )
+                for action_name, cache_policy in settings.get(
+                    YamlFields.ACTIONS.value.THIS.value, dict()
+                ).items()
+            }
+        )
+
+    @staticmethod
+    def parse_templates(settings: Tasks) -> None:
+        """
+        parses every Say template up front
+        (rather than when it is first used)
+        """
+        for task in settings.Tasks.values():
+            for response_template in task.Action.Say:
+                TemplateParser.parse(response_template)
+
+    @staticmethod
+    def pop_tasks_off_stack(
+        tasks: Stack,
+        scheduler: Optional[ActionScheduler] = None,
+        action_cache: Optional[ActionCache] = None,
+    ) -> None:
+        """
+        replies for the complete (or impossible) tasks
+        and prompts for the slots incomplete tasks are missing
+        (only the tasks which are finished or missing slots are visited)
+        """
         tasks.system_utterance = "\n".join(
-            TaskCompiler.compile_tasks(open_tasks=tasks.open)
+            TaskCompiler.compile_tasks(
+                open_tasks=tasks.open.finished_tasks(),
+                scheduler=scheduler,
+                action_cache=action_cache,
+            )
         )
-        prompts = list(TaskCompiler.get_prompts(open_tasks=tasks.open))
+        prompts = list(TaskCompiler.get_missing_slot_prompts(open_tasks=tasks.open))
         tasks.system_prompt = choice(prompts) if any(prompts) else None
         tasks.pop()
 
     @staticmethod
-    def get_prompts(open_tasks: Tasks) -> Generator[str, None, None]:
+    def get_missing_slot_prompts(open_tasks: OpenTasks) -> Generator[str, None, None]:
         """
         take any prompts from incomplete tasks
         only from slots which haven't been filled yet
         (to encourage the user to provide the necessary
         slot information for their completion)
+        only the slots which are missing are visited
         """
-        for task in open_tasks.values():
-            if not task.Complete:
-                for slot in task.Memory.values():
-                    if slot.Default is None and slot.Prompt is not None:
-                        yield slot.Prompt
+        for task_name, slot_name in open_tasks.missing_slots():
+            prompt = open_tasks[task_name].Memory[slot_name].Prompt
+            if prompt is not None:
+                yield prompt
 
     @staticmethod
-    def compile_tasks(open_tasks: Tasks) -> Generator[str, None, None]:
+    def compile_tasks(
+        open_tasks: Tasks,
+        scheduler: Optional[ActionScheduler] = None,
+        action_cache: Optional[ActionCache] = None,
+    ) -> Generator[str, None, None]:
         """
         for each open task in the stack
         - complete tasks:
             get template replies (if applicable)
+        (with a scheduler the actions of all complete tasks run concurrently
+        but the replies stay in stack order - and are cached in its action cache
+        - without one they are run in turn and cached in action_cache if given)
         """
+        scheduled_actions = (
+            dict()
+            if scheduler is None
+            else dict(TaskCompiler.schedule_actions(open_tasks, scheduler))
+        )
         for task_name, task in open_tasks.items():
             if not task.Possible:
                 yield TaskCompiler.impossible_task(task_name)
                 continue
             if task.Complete:
-                response = TaskCompiler.complete_task(task)
+                if task_name in scheduled_actions:
+                    action_dictionary = ActionScheduler.results(
+                        scheduled_actions[task_name]
+                    )
+                    if action_dictionary is None:
+                        yield TaskCompiler.timed_out_task(task_name)
+                        continue
+                    response = TaskCompiler.complete_task(
+                        task, action_dictionary=action_dictionary
+                    )
+                else:
+                    response = TaskCompiler.complete_task(
+                        task, action_cache=action_cache
+                    )
                 if response is None:
                     continue
                 yield response
 
     @staticmethod
-    def complete_task(task: Tasks) -> Optional[str]:
+    def schedule_actions(
+        open_tasks: Tasks, scheduler: ActionScheduler
+    ) -> Generator[Tuple[str, List[ScheduledAction]], None, None]:
+        """
+        starts the actions of every complete (and possible) task
+        returns task_name,scheduled_actions
+        """
+        for task_name, task in open_tasks.items():
+            if task.Possible and task.Complete:
+                slot_dictionary = dict(
+                    TaskCompiler.get_slot_dictionary(task_memory=task.Memory)
+                )
+                yield task_name, list(
+                    map(
+                        lambda custom_action: scheduler.submit(
+                            custom_action, slots=slot_dictionary
+                        ),
+                        task.Action.Do,
+                    )
+                )
+
+    @staticmethod
+    def complete_task(
+        task: Tasks,
+        action_dictionary: Optional[Dict[str, str]] = None,
+        action_cache: Optional[ActionCache] = None,
+    ) -> Optional[str]:
         """
         execute all tasks
+        (unless their results are given or in the action cache)
         return a response (if any)
         """
         slot_dictionary = dict(
             TaskCompiler.get_slot_dictionary(
-                task_memory=task.Memory, as_action_parameter=True
-            )
-        )
-        action_dictionary = dict(
-            TaskCompiler.get_action_dictionary(
-                task_actions=task.Action.Do, slots=slot_dictionary
+                task_memory=task.Memory,
             )
         )
-        if any(task.Action.Say):
-            slot_dictionary = dict(
-                TaskCompiler.get_slot_dictionary(
-                    task_memory=task.Memory,
+        if action_dictionary is None:
+            action_dictionary = dict(
+                TaskCompiler.get_action_dictionary(
+                    task_actions=task.Action.Do,
+                    slots=slot_dictionary,
+                    action_cache=action_cache,
                 )
             )
+        if any(task.Action.Say):
             return TaskCompiler.fill_response_template(
                 response_template=choice(task.Action.Say),
                 slot_dictionary=slot_dictionary,
@@ -83,33 +181,34 @@ class TaskCompiler:
 
     @staticmethod
     def get_action_dictionary(
-        task_actions: Tasks, slots: Dict[str, str]
+        task_actions: Tasks,
+        slots: Dict[str, Any],
+        action_cache: Optional[ActionCache] = None,
     ) -> Generator[Tuple[str, str], None, None]:
         """
         a generator to return of all custom actions in a task and their computed result
-        fills in action slots and evaluates it to get results
+        calls each (bound) action with the slot values
+        (unless its result is in the action cache)
         returns action_name,action_result
         """
         for custom_action in task_actions:
-            action_name = list(YamlLoader.extract_action_name_from_call(custom_action))[
-                0
-            ]
-            action_result = eval(custom_action.format(**slots))
-            yield f"__{action_name}__", action_result
+            action = ActionBinder.bind(custom_action)
+            yield f"__{action.name}__", (
+                action(slots)
+                if action_cache is None
+                else action_cache.call(action, slots)
+            )
 
     @staticmethod
     def get_slot_dictionary(
-        task_memory: Tasks, as_action_parameter: bool = False
-    ) -> Generator[Tuple[str, str], None, None]:
+        task_memory: Tasks,
+    ) -> Generator[Tuple[str, Any], None, None]:
         """
         a generator to return all slots in a task
         returns slot_name,slot_value
         """
         for slot_name, slot_data in task_memory.items():
-            slot_value = slot_data.Default
-            if as_action_parameter:
-                slot_value = f"'{slot_value}'"
-            yield slot_name, slot_value
+            yield slot_name, slot_data.Default
 
     @staticmethod
     def fill_response_template(
@@ -119,10 +218,18 @@ class TaskCompiler:
     ) -> str:
         """
         fill in all slots and action references
+        (the template is parsed once and reused)
+        """
+        return TemplateParser.parse(response_template).render(
+            slot_values=slot_dictionary, action_results=action_dictionary
+        )
+
+    @staticmethod
+    def timed_out_task(task_label: str) -> str:
+        """
+        respond with the default reply for actions which ran out of time
         """
-        for action_name, action_result in action_dictionary.items():
-            response_template = response_template.replace(action_name, action_result)
-        return response_template.format(**slot_dictionary)
+        return DefaultMessages.ACTION_TIMEOUT.value.format(task_name=task_label.lower())
 
     @staticmethod
     def impossible_task(task_label: str) -> str:
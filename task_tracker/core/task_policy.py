@@ -1,11 +1,11 @@
-from typing import List, Generator, Tuple, Dict, Union
+from typing import Any, List, Generator, Tuple, Dict, Set, Iterable
 
 from task_tracker.datastructures.slots import Slots
-from task_tracker.datastructures.signals import Signals
+from task_tracker.datastructures.signals import Signals, SIGNAL_FEATURES
 from task_tracker.datastructures.stack import Stack
 from task_tracker.yaml_utils.datatypes import Tasks
 from task_tracker.trained_models.task_classifier import TaskClassifier
-from task_tracker.yaml_utils.dataloader import YamlLoader
+from task_tracker.yaml_utils.trigger_compiler import TriggerCompiler, CompiledTrigger
 
 
 class TaskPolicy:
@@ -15,53 +15,141 @@ class TaskPolicy:
     and adds tasks to open task stack
     """
 
-    def __init__(self, settings: Tasks, task_classifier_path: str) -> None:
+    def __init__(
+        self, settings: Tasks, task_classifier_path: str, encoding_workers: int = 1
+    ) -> None:
         self.settings = settings
         self.classifier = TaskClassifier(
-            settings=self.settings, classifier_path=task_classifier_path
+            settings=self.settings,
+            classifier_path=task_classifier_path,
+            encoding_workers=encoding_workers,
         )
+        self.memory_slots = list(
+            dict.fromkeys(
+                slot_name
+                for task in self.settings.Tasks.values()
+                for slot_name in task.Memory
+            )
+        )
+        self.feature_slots = list(
+            filter(lambda slot_name: slot_name in SIGNAL_FEATURES, self.memory_slots)
+        )
+        self.triggers = dict(self.compile_triggers())
+        self.trigger_order = {
+            task_name: index for index, task_name in enumerate(self.triggers)
+        }
+        self.trigger_dependencies = self.index_trigger_dependencies(self.triggers)
 
     def push_tasks_to_stack(self, signals: Signals, slots: Slots, tasks: Stack) -> None:
         """
         updates:
-            - slot values in settings
+            - slot values in the conversation's stack
             - the current task predicted by the Policy
             - the triggered tasks according to conditions specified in settings
             - the stack with new tasks from this turn
         """
-        self.update_slot_values(slots=slots, signals=signals, tasks=tasks)
-        tasks.push_tasks_to_stack(
-            triggered=self.select_tasks_via_triggers(
-                signals=signals, slots=slots, tasks=tasks
-            ),
-            predicted=self.select_tasks_via_model(signals=signals),
+        self.push_tasks_to_stacks(turns=[(signals, slots, tasks)])
+
+    def push_tasks_to_stacks(self, turns: List[Tuple[Signals, Slots, Stack]]) -> None:
+        """
+        same as push_tasks_to_stack
+        but for the turns of many conversations at once
+        (the task classifier is only called once for the whole batch
+        and only for the turns where no task was triggered
+        - since triggered tasks override predicted ones anyway)
+        """
+        triggered_tasks = list()
+        for signals, slots, tasks in turns:
+            triggered_tasks.append(
+                self.select_triggered_tasks(signals=signals, slots=slots, tasks=tasks)
+            )
+        predictions = iter(
+            self.select_tasks_via_model_many(
+                signals=[
+                    signals
+                    for (signals, _, _), triggered in zip(turns, triggered_tasks)
+                    if not any(triggered)
+                ]
+            )
         )
+        for (signals, _, tasks), triggered in zip(turns, triggered_tasks):
+            self.update_feature_slot_values(signals=signals, tasks=tasks)
+            tasks.push_tasks_to_stack(
+                triggered=triggered,
+                predicted=dict() if any(triggered) else next(predictions),
+            )
+
+    def select_triggered_tasks(
+        self, signals: Signals, slots: Slots, tasks: Stack
+    ) -> Dict[str, Tasks]:
+        """
+        updates the slot values in the conversation's stack
+        and selects the tasks triggered this turn
+        (needs none of the signals' features unless a trigger uses them)
+        """
+        self.update_slot_values(slots=slots, signals=signals, tasks=tasks)
+        return self.select_tasks_via_triggers(signals=signals, slots=slots, tasks=tasks)
 
     def update_slot_values(self, slots: Slots, signals: Signals, tasks: Stack) -> None:
         """
-        fills in global slot values in settings
+        fills in global slot values for this conversation
+        (the settings are shared by all conversations and left untouched)
+        slots computed from features of the signals are only filled
+        if the features were already extracted (see update_feature_slot_values)
         """
         # TODO: think about how to set Local scope slots
-        for task in self.settings.Tasks.values():
-            for slot_name in task.Memory:
+        for slot_name in self.memory_slots:
+            if hasattr(slots, slot_name):
+                slot_value = getattr(slots, slot_name)
+            elif slot_name in SIGNAL_FEATURES:
                 slot_value = (
-                    getattr(slots, slot_name)
-                    if hasattr(slots, slot_name)
-                    else getattr(signals, slot_name)
-                    if hasattr(signals, slot_name)
-                    else getattr(tasks, slot_name)
+                    getattr(signals, slot_name)
+                    if signals.extracted(slot_name)
+                    else None
+                )
+            elif hasattr(signals, slot_name):
+                slot_value = getattr(signals, slot_name)
+            else:
+                slot_value = getattr(tasks, slot_name)
+                if callable(slot_value):
+                    slot_value = slot_value()  # e.g. the open tasks (not the method)
+            if slot_value is not None:
+                tasks.remember(slot_name=slot_name, slot_value=slot_value)
+
+    def update_feature_slot_values(self, signals: Signals, tasks: Stack) -> None:
+        """
+        fills in the slots computed from features of the signals
+        which have been extracted by now (e.g. by the task classifier)
+        (features are never extracted just to fill a slot)
+        """
+        for slot_name in self.feature_slots:
+            if signals.extracted(slot_name):
+                tasks.remember(
+                    slot_name=slot_name, slot_value=getattr(signals, slot_name)
                 )
-                if slot_value is not None:
-                    task.Memory[slot_name].Default = slot_value
 
     def select_tasks_via_model(self, signals: Signals) -> Dict[str, Tasks]:
         """
         current tasks predicted by task classifier
         """
-        task_labels = self.classifier.predict(signals.vector())
+        task_labels = self.classifier.classify(signals)
         tasks = dict(self.get_task_data(task_labels))
         return tasks
 
+    def select_tasks_via_model_many(
+        self, signals: List[Signals]
+    ) -> List[Dict[str, Tasks]]:
+        """
+        current tasks predicted by task classifier
+        for each of the signals (in a single call to the classifier)
+        """
+        if not any(signals):
+            return list()
+        task_labels = self.classifier.classify_many(signals)
+        return list(
+            map(lambda task_label: dict(self.get_task_data([task_label])), task_labels)
+        )
+
     def get_task_data(
         self, task_labels: List[str]
     ) -> Generator[Tuple[str, Tasks], None, None]:
@@ -91,53 +179,88 @@ class TaskPolicy:
         self, signals: Signals, slots: Slots, tasks: Stack
     ) -> Generator[str, None, None]:
         """
-        extracts all task triggers from settings
-        checks if any trigger conditions are met
+        checks if any (precompiled) trigger conditions are met
         if so, corresponding task label returned
+        only triggers whose slot values changed since the previous turn
+        are re-evaluated (the rest are remembered in the stack)
         """
-        for task_name, task in self.settings.Tasks.items():
-            trigger_slots = dict(
-                self.get_trigger_slots(
-                    trigger_condition=task.TriggeredBy,
+        trigger_values = dict(
+            zip(
+                self.trigger_dependencies,
+                self.get_trigger_values(
+                    slot_names=self.trigger_dependencies,
                     signals=signals,
                     slots=slots,
                     tasks=tasks,
-                )
+                ),
             )
-            if not any(trigger_slots):
+        )
+        for task_name in self.get_stale_triggers(
+            trigger_values=trigger_values, previous_values=tasks.trigger_values
+        ):
+            trigger = self.triggers[task_name]
+            if trigger(*map(trigger_values.get, trigger.slot_names)):
+                tasks.trigger_results.add(task_name)
+            else:
+                tasks.trigger_results.discard(task_name)
+        tasks.trigger_values = trigger_values
+        yield from sorted(tasks.trigger_results, key=self.trigger_order.get)
+
+    def get_stale_triggers(
+        self, trigger_values: Dict[str, Any], previous_values: Dict[str, Any]
+    ) -> Set[str]:
+        """
+        the tasks whose trigger uses a slot
+        whose value changed since the previous turn
+        """
+        stale_triggers = set()
+        for slot_name, slot_value in trigger_values.items():
+            if (
+                slot_name in previous_values
+                and previous_values[slot_name] == slot_value
+            ):
                 continue
-            if eval(task.TriggeredBy.format(**trigger_slots)):
-                yield task_name
+            stale_triggers.update(self.trigger_dependencies[slot_name])
+        return stale_triggers
 
     @staticmethod
-    def get_trigger_slots(
-        trigger_condition: str, signals: Signals, slots: Slots, tasks: Tasks
-    ) -> Generator[Tuple[str, str], None, None]:
+    def index_trigger_dependencies(
+        triggers: Dict[str, CompiledTrigger]
+    ) -> Dict[str, List[str]]:
+        """
+        maps each slot name to the tasks whose trigger uses it
+        e.g. {'location': ['Bar', 'Baz']}
+        """
+        dependencies: Dict[str, List[str]] = dict()
+        for task_name, trigger in triggers.items():
+            for slot_name in trigger.slot_names:
+                dependencies.setdefault(slot_name, list()).append(task_name)
+        return dependencies
+
+    def compile_triggers(self) -> Generator[Tuple[str, CompiledTrigger], None, None]:
         """
-        extract slots from trigger condition
-        fill those slots with relevant values
+        compiles (or reuses the compiled) trigger condition of each task
+        tasks whose trigger uses no slots are never triggered
+        """
+        for task_name, task in self.settings.Tasks.items():
+            trigger = TriggerCompiler.compile(task.TriggeredBy)
+            if any(trigger.slot_names):
+                yield task_name, trigger
+
+    @staticmethod
+    def get_trigger_values(
+        slot_names: Iterable[str], signals: Signals, slots: Slots, tasks: Stack
+    ) -> Generator[Any, None, None]:
+        """
+        fill the slots used in a trigger condition with relevant values
         from the signals, slots and tasks (if any)
         """
-        for slot_name in YamlLoader.extract_slots_from_string(trigger_condition):
+        for slot_name in slot_names:
             if hasattr(signals, slot_name):
-                slot_value = getattr(signals, slot_name)
-                yield slot_name, TaskPolicy.format_slot_value(slot_value)
+                yield getattr(signals, slot_name)
             elif hasattr(slots, slot_name):
-                slot_value = getattr(slots, slot_name)
-                yield slot_name, TaskPolicy.format_slot_value(slot_value)
+                yield getattr(slots, slot_name)
             elif hasattr(tasks, slot_name):
-                slot_value = getattr(tasks, slot_name)
-                yield slot_name, TaskPolicy.format_slot_value(slot_value)
+                yield getattr(tasks, slot_name)
             else:
-                yield slot_name, None
-
-    @staticmethod
-    def format_slot_value(slot_value: Union[str, float]) -> Union[str, float]:
-        """
-        format slot values that are strings
-        to be wrapped in string quotes for proper evaluation
-        """
-        if not isinstance(slot_value, str):
-            return slot_value
-        slot_value = slot_value.replace("'", " ")
-        return f"'{slot_value}'"
+                yield None
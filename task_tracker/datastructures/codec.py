@@ -0,0 +1,413 @@
+from typing import Any, Dict, List, Optional, Tuple
+from struct import Struct
+
+from numpy import generic
+
+from task_tracker.yaml_utils.datatypes import Tasks
+from task_tracker.datastructures.slots import Slots
+from task_tracker.datastructures.stack import Stack
+from task_tracker.datastructures.task_state import TaskState
+
+VERSION = 1
+
+FULL = 0
+DELTA = 1
+
+# which parts of the stack a delta changes
+TRIGGERED = 1
+PREDICTED = 2
+OPEN = 4
+UTTERANCE = 8
+PROMPT = 16
+MEMORY = 32
+
+COMPLETE = 1
+
+# slot value types
+NONE, FALSE, TRUE, INT, FLOAT, STR, BYTES, LIST, TUPLE, DICT = range(10)
+
+FLOAT_FORMAT = Struct("<d")
+
+OpenTask = Tuple[bool, Dict[str, Any]]  # Complete, slot values
+
+
+class StackSnapshot:
+    """
+    the state of a stack which cannot be rebuilt from the settings
+    (task names, the slot values written in the conversation,
+    Complete flags and the pending response and prompt)
+    the remembered trigger values are left out as the triggers are
+    simply all re-evaluated on the next turn
+    """
+
+    def __init__(
+        self,
+        triggered: List[str],
+        predicted: List[str],
+        open: Dict[str, OpenTask],
+        system_utterance: Optional[str],
+        system_prompt: Optional[str],
+        memory: Dict[str, Any],
+    ) -> None:
+        self.triggered = triggered
+        self.predicted = predicted
+        self.open = open
+        self.system_utterance = system_utterance
+        self.system_prompt = system_prompt
+        self.memory = memory
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, StackSnapshot) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"StackSnapshot({vars(self)})"
+
+
+class BinaryWriter:
+    """
+    appends varints, strings and (tagged) slot values to a buffer
+    """
+
+    def __init__(self, version: int, kind: int) -> None:
+        self.buffer = bytearray((version, kind))
+
+    def varint(self, number: int) -> None:
+        while number > 0x7F:
+            self.buffer.append(number & 0x7F | 0x80)
+            number >>= 7
+        self.buffer.append(number)
+
+    def string(self, text: str) -> None:
+        encoded = text.encode()
+        self.varint(len(encoded))
+        self.buffer += encoded
+
+    def strings(self, texts: List[str]) -> None:
+        self.varint(len(texts))
+        for text in texts:
+            self.string(text)
+
+    def values(self, values: Dict[str, Any]) -> None:
+        self.varint(len(values))
+        for name, value in values.items():
+            self.string(name)
+            self.value(value)
+
+    def value(self, value: Any) -> None:
+        """
+        numpy scalars (e.g. the sentiment of the signals)
+        are written as the equivalent python value
+        """
+        if isinstance(value, generic):
+            value = value.item()
+        if value is None:
+            self.buffer.append(NONE)
+        elif value is False or value is True:
+            self.buffer.append(TRUE if value else FALSE)
+        elif isinstance(value, int):
+            self.buffer.append(INT)
+            self.varint(value << 1 if value >= 0 else (-value << 1) - 1)
+        elif isinstance(value, float):
+            self.buffer.append(FLOAT)
+            self.buffer += FLOAT_FORMAT.pack(value)
+        elif isinstance(value, str):
+            self.buffer.append(STR)
+            self.string(value)
+        elif isinstance(value, bytes):
+            self.buffer.append(BYTES)
+            self.varint(len(value))
+            self.buffer += value
+        elif isinstance(value, (list, tuple)):
+            self.buffer.append(LIST if isinstance(value, list) else TUPLE)
+            self.varint(len(value))
+            for item in value:
+                self.value(item)
+        elif isinstance(value, dict):
+            self.buffer.append(DICT)
+            self.varint(len(value))
+            for key, item in value.items():
+                self.value(key)
+                self.value(item)
+        else:
+            raise TypeError(f"cannot encode slot values of type {type(value)}")
+
+
+class BinaryReader:
+    """
+    reads back what a BinaryWriter wrote
+    """
+
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        version = self.data[0] if len(self.data) > 1 else None
+        if version != VERSION:
+            raise ValueError(
+                f"cannot decode state of version {version} (expected {VERSION})"
+            )
+        self.kind = self.data[1]
+        self.offset = 2
+
+    def byte(self) -> int:
+        self.offset += 1
+        return self.data[self.offset - 1]
+
+    def varint(self) -> int:
+        number = shift = 0
+        while True:
+            byte = self.byte()
+            number |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return number
+            shift += 7
+
+    def raw(self, length: int) -> bytes:
+        self.offset += length
+        return self.data[self.offset - length : self.offset].tobytes()
+
+    def string(self) -> str:
+        return self.raw(self.varint()).decode()
+
+    def strings(self) -> List[str]:
+        return [self.string() for _ in range(self.varint())]
+
+    def values(self) -> Dict[str, Any]:
+        return {self.string(): self.value() for _ in range(self.varint())}
+
+    def value(self) -> Any:
+        tag = self.byte()
+        if tag == NONE:
+            return None
+        if tag in (FALSE, TRUE):
+            return tag == TRUE
+        if tag == INT:
+            number = self.varint()
+            return number >> 1 if number & 1 == 0 else -((number + 1) >> 1)
+        if tag == FLOAT:
+            return FLOAT_FORMAT.unpack(self.raw(FLOAT_FORMAT.size))[0]
+        if tag == STR:
+            return self.string()
+        if tag == BYTES:
+            return self.raw(self.varint())
+        if tag in (LIST, TUPLE):
+            items = [self.value() for _ in range(self.varint())]
+            return items if tag == LIST else tuple(items)
+        if tag == DICT:
+            return {self.value(): self.value() for _ in range(self.varint())}
+        raise ValueError(f"cannot decode slot value of type {tag}")
+
+
+class StackCodec:
+    """
+    compact versioned binary encoding of a Stack
+    either in full or as a delta against the previous turn's snapshot
+    (only the state which cannot be rebuilt from the settings is stored
+    so the settings are needed to decode)
+    """
+
+    @staticmethod
+    def snapshot(stack: Stack) -> StackSnapshot:
+        return StackSnapshot(
+            triggered=list(stack.triggered),
+            predicted=list(stack.predicted),
+            open={
+                task_name: (task.Complete, dict(task.slot_values))
+                for task_name, task in stack.open.items()
+            },
+            system_utterance=stack.system_utterance,
+            system_prompt=stack.system_prompt,
+            memory=dict(stack.memory),
+        )
+
+    @staticmethod
+    def restore(snapshot: StackSnapshot, tasks: Tasks) -> Stack:
+        """
+        rebuilds the stack from the task settings (settings.Tasks)
+        (open tasks which are no longer in the settings are dropped)
+        """
+        stack = Stack()
+        stack.triggered = list(snapshot.triggered)
+        stack.predicted = list(snapshot.predicted)
+        for task_name, (complete, slot_values) in snapshot.open.items():
+            if task_name in tasks:
+                task = TaskState(tasks[task_name])
+                task.slot_values.update(slot_values)
+                stack.open[task_name] = task
+                stack.open.set_complete(task_name=task_name, complete=complete)
+        stack.system_utterance = snapshot.system_utterance
+        stack.system_prompt = snapshot.system_prompt
+        stack.memory = dict(snapshot.memory)
+        return stack
+
+    @staticmethod
+    def encode(stack: Stack) -> bytes:
+        return StackCodec.encode_snapshot(StackCodec.snapshot(stack))
+
+    @staticmethod
+    def encode_snapshot(snapshot: StackSnapshot) -> bytes:
+        writer = BinaryWriter(version=VERSION, kind=FULL)
+        writer.strings(snapshot.triggered)
+        writer.strings(snapshot.predicted)
+        StackCodec.write_open_tasks(writer, snapshot.open)
+        writer.value(snapshot.system_utterance)
+        writer.value(snapshot.system_prompt)
+        writer.values(snapshot.memory)
+        return bytes(writer.buffer)
+
+    @staticmethod
+    def encode_delta(previous: StackSnapshot, stack: Stack) -> bytes:
+        """
+        only the parts of the stack which changed since the previous snapshot
+        (e.g. a slot filled in one open task)
+        """
+        return StackCodec.encode_snapshot_delta(previous, StackCodec.snapshot(stack))
+
+    @staticmethod
+    def encode_snapshot_delta(
+        previous: StackSnapshot, snapshot: StackSnapshot
+    ) -> bytes:
+        changes = (
+            (TRIGGERED, snapshot.triggered != previous.triggered),
+            (PREDICTED, snapshot.predicted != previous.predicted),
+            (OPEN, snapshot.open != previous.open),
+            (UTTERANCE, snapshot.system_utterance != previous.system_utterance),
+            (PROMPT, snapshot.system_prompt != previous.system_prompt),
+            (MEMORY, snapshot.memory != previous.memory),
+        )
+        changed = sum(part for part, differs in changes if differs)
+        writer = BinaryWriter(version=VERSION, kind=DELTA)
+        writer.varint(changed)
+        if changed & TRIGGERED:
+            writer.strings(snapshot.triggered)
+        if changed & PREDICTED:
+            writer.strings(snapshot.predicted)
+        if changed & OPEN:
+            removed, updated = StackCodec.diff_open_tasks(previous.open, snapshot.open)
+            writer.strings(removed)
+            StackCodec.write_open_tasks(writer, updated)
+        if changed & UTTERANCE:
+            writer.value(snapshot.system_utterance)
+        if changed & PROMPT:
+            writer.value(snapshot.system_prompt)
+        if changed & MEMORY:
+            writer.strings(
+                [name for name in previous.memory if name not in snapshot.memory]
+            )
+            writer.values(
+                {
+                    name: value
+                    for name, value in snapshot.memory.items()
+                    if name not in previous.memory or previous.memory[name] != value
+                }
+            )
+        return bytes(writer.buffer)
+
+    @staticmethod
+    def decode(
+        data: bytes, tasks: Tasks, previous: Optional[StackSnapshot] = None
+    ) -> Stack:
+        """
+        the stack (rebuilt from the task settings)
+        deltas are applied to the previous snapshot
+        """
+        return StackCodec.restore(
+            StackCodec.decode_snapshot(data=data, previous=previous), tasks=tasks
+        )
+
+    @staticmethod
+    def decode_snapshot(
+        data: bytes, previous: Optional[StackSnapshot] = None
+    ) -> StackSnapshot:
+        reader = BinaryReader(data)
+        if reader.kind == FULL:
+            return StackSnapshot(
+                triggered=reader.strings(),
+                predicted=reader.strings(),
+                open=StackCodec.read_open_tasks(reader),
+                system_utterance=reader.value(),
+                system_prompt=reader.value(),
+                memory=reader.values(),
+            )
+        if previous is None:
+            raise ValueError("a delta can only be decoded given the previous snapshot")
+        changed = reader.varint()
+        snapshot = StackSnapshot(
+            triggered=previous.triggered,
+            predicted=previous.predicted,
+            open=dict(previous.open),
+            system_utterance=previous.system_utterance,
+            system_prompt=previous.system_prompt,
+            memory=dict(previous.memory),
+        )
+        if changed & TRIGGERED:
+            snapshot.triggered = reader.strings()
+        if changed & PREDICTED:
+            snapshot.predicted = reader.strings()
+        if changed & OPEN:
+            for task_name in reader.strings():
+                del snapshot.open[task_name]
+            snapshot.open.update(StackCodec.read_open_tasks(reader))
+        if changed & UTTERANCE:
+            snapshot.system_utterance = reader.value()
+        if changed & PROMPT:
+            snapshot.system_prompt = reader.value()
+        if changed & MEMORY:
+            for name in reader.strings():
+                del snapshot.memory[name]
+            snapshot.memory.update(reader.values())
+        return snapshot
+
+    @staticmethod
+    def diff_open_tasks(
+        previous: Dict[str, OpenTask], current: Dict[str, OpenTask]
+    ) -> Tuple[List[str], Dict[str, OpenTask]]:
+        """
+        the tasks removed and the tasks added or changed
+        (if the tasks were reordered all of them are replaced)
+        """
+        kept = [task_name for task_name in previous if task_name in current]
+        added = [task_name for task_name in current if task_name not in previous]
+        if kept + added != list(current):
+            return list(previous), current
+        return (
+            [task_name for task_name in previous if task_name not in current],
+            {
+                task_name: task
+                for task_name, task in current.items()
+                if previous.get(task_name) != task
+            },
+        )
+
+    @staticmethod
+    def write_open_tasks(writer: BinaryWriter, open_tasks: Dict[str, OpenTask]) -> None:
+        writer.varint(len(open_tasks))
+        for task_name, (complete, slot_values) in open_tasks.items():
+            writer.string(task_name)
+            writer.varint(COMPLETE if complete else 0)
+            writer.values(slot_values)
+
+    @staticmethod
+    def read_open_tasks(reader: BinaryReader) -> Dict[str, OpenTask]:
+        open_tasks = dict()
+        for _ in range(reader.varint()):
+            task_name = reader.string()
+            open_tasks[task_name] = (
+                reader.varint() & COMPLETE == COMPLETE,
+                reader.values(),
+            )
+        return open_tasks
+
+
+class SlotsCodec:
+    """
+    compact versioned binary encoding of Slots
+    """
+
+    @staticmethod
+    def encode(slots: Slots) -> bytes:
+        writer = BinaryWriter(version=VERSION, kind=FULL)
+        writer.values(vars(slots))
+        return bytes(writer.buffer)
+
+    @staticmethod
+    def decode(data: bytes) -> Slots:
+        return Slots(**BinaryReader(data).values())
@@ -0,0 +1,138 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+from sys import getsizeof
+from threading import Lock
+from time import monotonic
+
+
+class LRUCache:
+    """
+    a thread-safe least recently used cache
+    bounded by its number of entries
+    and by the (approximate) total size of its entries in bytes
+    (entries can also expire ttl seconds after they were cached)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Hashable, Any], int]] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = LRUCache.sizeof_entry if sizeof is None else sizeof
+        self.entries: Dict[Hashable, Any] = OrderedDict()
+        self.sizes: Dict[Hashable, int] = dict()
+        self.ttl = ttl
+        self.expiry_times: Dict[Hashable, float] = dict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """
+        the cached value (marked as most recently used)
+        or default if it is not cached (or has expired)
+        """
+        with self.lock:
+            if key in self.expiry_times and self.expiry_times[key] <= monotonic():
+                self.remove(key)
+                self.evictions += 1
+            if key not in self.entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        caches the value
+        evicting the least recently used entries to stay within bounds
+        (values bigger than the whole cache are not cached)
+        """
+        size = self.sizeof(key, value)
+        if self.max_entries < 1 or (
+            self.max_bytes is not None and size > self.max_bytes
+        ):
+            return
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.sizes[key]
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self.sizes[key] = size
+            self.total_bytes += size
+            if self.ttl is not None:
+                self.expiry_times[key] = monotonic() + self.ttl
+            self.evict()
+
+    def resize(self, max_entries: int, max_bytes: Optional[int] = None) -> None:
+        """
+        changes the bounds of the cache
+        (evicting entries if it is now too big)
+        """
+        with self.lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        removes the least recently used entries
+        until the cache is within its bounds
+        (expects the lock to be held)
+        """
+        while len(self.entries) > self.max_entries or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes
+        ):
+            self.remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def remove(self, key: Hashable) -> None:
+        """
+        (expects the lock to be held)
+        """
+        del self.entries[key]
+        self.total_bytes -= self.sizes.pop(key)
+        self.expiry_times.pop(key, None)
+
+    def discard(self, key: Hashable) -> None:
+        """
+        removes the entry if it is cached
+        """
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.expiry_times.clear()
+            self.total_bytes = 0
+
+    @staticmethod
+    def sizeof_entry(key: Hashable, value: Any) -> int:
+        return getsizeof(key) + getsizeof(value)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return dict(
+            entries=len(self.entries),
+            bytes=self.total_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+        )
@@ -0,0 +1,127 @@
+from typing import Any, Dict, Generator, Optional, Tuple
+
+from task_tracker.yaml_utils.datatypes import Tasks
+from task_tracker.datastructures.task_state import TaskState
+
+
+class OpenTasks(dict):
+    """
+    the open tasks of a conversation (task name -> task)
+    indexed by the slots each task is still missing
+    so completeness is only rechecked for the tasks whose slots changed
+    (slot values of open tasks should be set via set_slot_value
+    and tasks added or removed via item assignment and del
+    - task settings are wrapped in a TaskState as they are read-only)
+    """
+
+    def __init__(self, open_tasks: Optional[Dict[str, Tasks]] = None) -> None:
+        super().__init__()
+        self.unfilled: Dict[str, Dict[str, None]] = dict()
+        self.owners: Dict[str, Dict[str, None]] = dict()
+        self.changed: Dict[str, None] = dict()
+        self.finished: Dict[str, None] = dict()
+        self.positions: Dict[str, int] = dict()
+        self.pushes = 0
+        for task_name, task in ({} if open_tasks is None else open_tasks).items():
+            self[task_name] = task
+
+    def __setitem__(self, task_name: str, task: Tasks) -> None:
+        if task_name in self:
+            self.forget(task_name)
+        else:
+            self.positions[task_name] = self.pushes
+            self.pushes += 1
+        if not isinstance(task, TaskState):
+            task = TaskState(task)
+        super().__setitem__(task_name, task)
+        self.unfilled[task_name] = dict()
+        for slot_name, slot in task.Memory.items():
+            self.owners.setdefault(slot_name, dict())[task_name] = None
+            if slot.Default is None:
+                self.unfilled[task_name][slot_name] = None
+        self.changed[task_name] = None
+        if task.Complete or not task.Possible:
+            self.finished[task_name] = None
+
+    def __reduce__(self) -> Tuple[type, Tuple[Dict[str, Tasks]]]:
+        return OpenTasks, (dict(self),)
+
+    def __delitem__(self, task_name: str) -> None:
+        self.forget(task_name)
+        self.changed.pop(task_name, None)
+        self.positions.pop(task_name)
+        super().__delitem__(task_name)
+
+    def forget(self, task_name: str) -> None:
+        """
+        removes the task from the indexes
+        """
+        for slot_name in self[task_name].Memory:
+            owners = self.owners.get(slot_name, dict())
+            owners.pop(task_name, None)
+            if not any(owners):
+                self.owners.pop(slot_name, None)
+        self.unfilled.pop(task_name, None)
+        self.finished.pop(task_name, None)
+
+    def set_slot_value(self, slot_name: str, slot_value: Any) -> None:
+        """
+        sets the value of the slot in every open task which has it
+        """
+        for task_name in self.owners.get(slot_name, ()):
+            self[task_name].Memory[slot_name].Default = slot_value
+            if slot_value is None:
+                self.unfilled[task_name][slot_name] = None
+            else:
+                self.unfilled[task_name].pop(slot_name, None)
+            self.changed[task_name] = None
+
+    def set_complete(self, task_name: str, complete: bool) -> None:
+        """
+        sets the Complete flag of the task
+        """
+        task = self[task_name]
+        task.Complete = complete
+        if task.Complete or not task.Possible:
+            self.finished[task_name] = None
+        else:
+            self.finished.pop(task_name, None)
+
+    def update_completeness(self) -> None:
+        """
+        sets the Complete flag of the tasks whose slots changed
+        """
+        for task_name in self.changed:
+            task = self[task_name]
+            task.Complete = not any(self.unfilled[task_name])
+            if task.Complete or not task.Possible:
+                self.finished[task_name] = None
+            else:
+                self.finished.pop(task_name, None)
+        self.changed.clear()
+
+    def finished_tasks(self) -> Dict[str, Tasks]:
+        """
+        the complete or impossible tasks (in stack order)
+        """
+        return {
+            task_name: self[task_name]
+            for task_name in sorted(self.finished, key=self.positions.get)
+        }
+
+    def pop_finished(self) -> None:
+        """
+        removes the complete or impossible tasks
+        """
+        for task_name in list(self.finished):
+            del self[task_name]
+
+    def missing_slots(self) -> Generator[Tuple[str, str], None, None]:
+        """
+        the slots which incomplete tasks are still missing
+        returns task_name,slot_name
+        """
+        for task_name, unfilled in self.unfilled.items():
+            if not self[task_name].Complete:
+                for slot_name in unfilled:
+                    yield task_name, slot_name
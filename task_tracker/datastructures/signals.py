@@ -1,25 +1,138 @@
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
 
-from numpy import ndarray, max, concatenate, zeros
-from chars2vec import load_model
+from numpy import ndarray, array, max, concatenate, zeros
 
-from conversation_metrics.models.custom_models import customise_models
-from conversation_metrics.structures.utterance import Utterance
+from task_tracker.datastructures.lru_cache import LRUCache
+from task_tracker.startup import LazyResource
 
-customise_models(
-    measure_formality=None,
-    measure_sentiment=None,
-    extract_entities=None,
-    vectorise=None,
-)
 EMBEDDING_DIMENSION = 300
-syntax_model = load_model("eng_300")
+FEATURE_VERSION = 1  # bump whenever the Signals vector changes
+CHEAP_FEATURES = slice(2 + EMBEDDING_DIMENSION, None)  # the syntax in Signals.vector()
+
+
+def load_utterance_encoder() -> Type:
+    """
+    conversation_metrics is only imported (and its models customised)
+    the first time an utterance is encoded
+    """
+    from conversation_metrics.models.custom_models import customise_models
+    from conversation_metrics.structures.utterance import Utterance
+
+    customise_models(
+        measure_formality=None,
+        measure_sentiment=None,
+        extract_entities=None,
+        vectorise=None,
+    )
+    return Utterance
+
+
+def load_syntax_model():
+    """
+    chars2vec (and keras) is only imported
+    the first time a word is embedded
+    """
+    from chars2vec import load_model
+
+    return load_model("eng_300")
+
+
+utterance_encoder = LazyResource(
+    name="conversation_metrics utterance encoder", load=load_utterance_encoder
+)
+syntax_model = LazyResource(name="chars2vec eng_300 model", load=load_syntax_model)
+
+UtteranceFeatures = Tuple[float, float, ndarray]
+UTTERANCE_FEATURES = "utterance"  # sentiment, formality and semantics
+SYNTAX_FEATURES = "syntax"
+SIGNAL_FEATURES = {  # signals computed from a group of features
+    "sentiment": UTTERANCE_FEATURES,
+    "formality": UTTERANCE_FEATURES,
+}
+
+
+def sizeof_features(key: Tuple[str, str], features: Any) -> int:
+    """
+    approximate size in bytes of a group of features cached for an utterance
+    """
+    _, utterance = key
+    return len(utterance) + sum(
+        map(
+            lambda feature: feature.nbytes if isinstance(feature, ndarray) else 8,
+            features if isinstance(features, tuple) else (features,),
+        )
+    )
+
+
+FEATURE_CACHE = LRUCache(
+    max_entries=10000, max_bytes=64 * 1024 * 1024, sizeof=sizeof_features
+)
+
+
+class WordEmbeddings:
+    """
+    chars2vec embeddings memoised per word
+    (only unseen words are sent to the model - in a single batch)
+    """
+
+    def __init__(self, max_words: int = 50000) -> None:
+        self.cache = LRUCache(
+            max_entries=max_words,
+            sizeof=lambda word, embedding: len(word) + embedding.nbytes,
+        )
+
+    def vectorize_words(self, words: List[str]) -> ndarray:
+        """
+        an embedding per word
+        (words are lower cased like chars2vec does)
+        """
+        words = list(map(lambda word: word.lower(), words))
+        embeddings = dict()
+        unseen_words = list()
+        for word in dict.fromkeys(words):
+            embedding = self.cache.get(word)
+            if embedding is None:
+                unseen_words.append(word)
+            else:
+                embeddings[word] = embedding
+        if any(unseen_words):
+            for word, embedding in zip(
+                unseen_words, syntax_model.get().vectorize_words(unseen_words)
+            ):
+                embedding = embedding.copy()
+                self.cache.put(word, embedding)
+                embeddings[word] = embedding
+        return array(list(map(embeddings.get, words)))
+
+    def max_pool(self, words: List[str]) -> ndarray:
+        """
+        the element-wise maximum of the embeddings of all the words
+        """
+        if not any(words):
+            return zeros(EMBEDDING_DIMENSION)
+        return max(self.vectorize_words(words), axis=0)
+
+    def warm(self, texts: Iterable[str]) -> None:
+        """
+        embeds every word in the texts ahead of time
+        (e.g. all Say templates, since these are common replies)
+        """
+        words = list(
+            dict.fromkeys(word for text in texts for word in text.lower().split())
+        )
+        if any(words):
+            self.vectorize_words(words)
+
+
+WORD_EMBEDDINGS = WordEmbeddings()
 
 
 class Signals:
     """
     stores annotator signals
     for task classifier to use
+    (features are only computed when first used
+    and are cached in the feature_cache - shared across the process by default)
     """
 
     def __init__(
@@ -27,14 +140,104 @@ class Signals:
         user_utterance: str,
         intent: Optional[str],
         topic: Optional[str],
+        feature_cache: Optional[LRUCache] = None,
     ) -> None:
         self.user_utterance = user_utterance
         self.intent = intent
         self.topic = topic
-        encoded_text = Utterance(text=user_utterance, utterance_index=0)
-        self.sentiment = encoded_text.sentiment
-        self.formality = encoded_text.formality
-        self._semantics = (
+        self.feature_cache = FEATURE_CACHE if feature_cache is None else feature_cache
+        self.normalised_utterance = Signals.normalise(user_utterance)
+        self.features: Dict[str, Any] = dict()
+
+    @property
+    def sentiment(self) -> float:
+        return self.get_features(UTTERANCE_FEATURES)[0]
+
+    @property
+    def formality(self) -> float:
+        return self.get_features(UTTERANCE_FEATURES)[1]
+
+    @property
+    def _semantics(self) -> ndarray:
+        return self.get_features(UTTERANCE_FEATURES)[2]
+
+    @property
+    def _syntax(self) -> ndarray:
+        return self.get_features(SYNTAX_FEATURES)
+
+    def vector(self) -> ndarray:
+        """
+        convert signals into a vector
+        """
+        return concatenate(
+            [[self.sentiment], [self.formality], self._semantics, self._syntax]
+        )
+
+    def cheap_vector(self) -> ndarray:
+        """
+        the part of the signals vector which is cheap to compute
+        (i.e. vector()[CHEAP_FEATURES] - without the conversation_metrics encoding)
+        """
+        return self._syntax
+
+    def extracted(self, signal_name: str) -> bool:
+        """
+        whether the features the signal is computed from
+        have already been extracted (so reading it costs nothing)
+        """
+        return SIGNAL_FEATURES[signal_name] in self.features
+
+    def get_features(self, group: str) -> Any:
+        """
+        a group of features of the utterance
+        (extracted on first use or reused from the feature cache)
+        """
+        if group not in self.features:
+            key = (group, self.normalised_utterance)
+            features = self.feature_cache.get(key)
+            if features is None:
+                features = FEATURE_EXTRACTORS[group](self.normalised_utterance)
+                self.feature_cache.put(key, features)
+            self.features[group] = features
+        return self.features[group]
+
+    @staticmethod
+    def extract_many(signals: List["Signals"], group: str) -> None:
+        """
+        extracts a group of features for many signals at once
+        (the unseen words of all the utterances are embedded
+        in a single call to chars2vec - the conversation_metrics encoder
+        has no batch interface so each distinct utterance is encoded in turn)
+        """
+        missing = list(
+            filter(
+                lambda signal: group not in signal.features
+                and (group, signal.normalised_utterance) not in signal.feature_cache,
+                signals,
+            )
+        )
+        if group == SYNTAX_FEATURES:
+            WORD_EMBEDDINGS.warm(
+                map(lambda signal: signal.normalised_utterance, missing)
+            )
+        for signal in signals:
+            signal.get_features(group)
+
+    @staticmethod
+    def normalise(user_utterance: str) -> str:
+        """
+        the utterance without leading, trailing or repeated whitespace
+        """
+        return " ".join(user_utterance.split())
+
+    @staticmethod
+    def extract_utterance_features(user_utterance: str) -> UtteranceFeatures:
+        """
+        sentiment, formality and semantics of the utterance
+        (vectors are read-only since they are shared through the cache)
+        """
+        encoded_text = utterance_encoder.get()(text=user_utterance, utterance_index=0)
+        semantics = (
             max(
                 list(map(lambda entity: entity.semantics, encoded_text.entities)),
                 axis=0,
@@ -42,17 +245,21 @@ class Signals:
             if any(encoded_text.entities)
             else zeros(EMBEDDING_DIMENSION)
         )
-        self._syntax = max(
-            syntax_model.vectorize_words(user_utterance.split())
-            if any(user_utterance)
-            else zeros((1, EMBEDDING_DIMENSION)),
-            axis=0,
-        )
+        semantics.setflags(write=False)
+        return encoded_text.sentiment, encoded_text.formality, semantics
 
-    def vector(self) -> ndarray:
+    @staticmethod
+    def extract_syntax_features(user_utterance: str) -> ndarray:
         """
-        convert signals into a vector
+        syntax of the utterance
+        (read-only since it is shared through the cache)
         """
-        return concatenate(
-            [[self.sentiment], [self.formality], self._semantics, self._syntax]
-        )
+        syntax = WORD_EMBEDDINGS.max_pool(user_utterance.split())
+        syntax.setflags(write=False)
+        return syntax
+
+
+FEATURE_EXTRACTORS: Dict[str, Callable[[str], Any]] = {
+    UTTERANCE_FEATURES: Signals.extract_utterance_features,
+    SYNTAX_FEATURES: Signals.extract_syntax_features,
+}
@@ -1,6 +1,8 @@
-from typing import Dict, Optional, Generator, Tuple, List
+from typing import Any, Dict, Optional, List, Set
 
 from task_tracker.yaml_utils.datatypes import Tasks
+from task_tracker.datastructures.task_state import TaskState
+from task_tracker.datastructures.open_tasks import OpenTasks
 
 
 class Stack:
@@ -12,9 +14,12 @@ class Stack:
     def __init__(self, open_tasks: Optional[Dict[str, Tasks]] = None) -> None:
         self.triggered: List[str] = list()
         self.predicted: List[str] = list()
-        self.open = dict() if open_tasks is None else open_tasks
+        self.open = OpenTasks(open_tasks)
         self.system_utterance: Optional[str] = None
         self.system_prompt: Optional[str] = None
+        self.trigger_values: Dict[str, Any] = dict()
+        self.trigger_results: Set[str] = set()
+        self.memory: Dict[str, Any] = dict()
 
     def __repr__(self) -> str:
         return f"""
@@ -39,43 +44,52 @@ class Stack:
         selected_tasks = triggered if any(triggered) else predicted
         for task_name, task_data in selected_tasks.items():
             self.push(task_label=task_name, task_data=task_data)
-        for task in self.open.values():
-            task.Complete = self.slots_filled(task_memory=task.Memory)
+        self.open.update_completeness()
 
     def push(self, task_label: str, task_data: Tasks) -> None:
         """
+        the task is added to the stack as this conversation's own copy
+        (the task settings themselves are shared and never modified)
+        filled with the slot values remembered in this conversation
         if the same task already exists in open stack,
         copy across its slot values
         (without overriding more current values)
         """
+        task = task_data if isinstance(task_data, TaskState) else TaskState(task_data)
+        for slot_name, slot in task.Memory.items():
+            if slot_name in self.memory:
+                slot.Default = self.memory[slot_name]
         existing_task_data = self.open.get(task_label)
         if existing_task_data is not None:
-            for slot_name, slot_value in task_data.Memory.items():
-                if slot_value.Default is None:
-                    slot_value.Default = existing_task_data.Memory[slot_name].Default
-        self.open[task_label] = task_data
+            for slot_name, slot in task.Memory.items():
+                if slot.Default is None:
+                    slot.Default = existing_task_data.Memory[slot_name].Default
+        self.open[task_label] = task
+
+    def remember(self, slot_name: str, slot_value: Any) -> None:
+        """
+        sets the value of a slot for this conversation
+        in all open tasks (and any tasks opened later)
+        """
+        self.memory[slot_name] = slot_value
+        self.open.set_slot_value(slot_name=slot_name, slot_value=slot_value)
 
     def pop(self) -> None:
         """
         remove the task from open tasks
         which are impossible or complete
         """
-        self.open = dict(self.filter_tasks())
+        self.open.pop_finished()
+
+    @property
+    def open(self) -> OpenTasks:
+        return self._open
 
-    def filter_tasks(self) -> Generator[Tuple[str, str], None, None]:
-        for task_name, task in self.open.items():
-            if not task.Complete and task.Possible:
-                yield task_name, task
+    @open.setter
+    def open(self, open_tasks: Dict[str, Tasks]) -> None:
+        self._open = (
+            open_tasks if isinstance(open_tasks, OpenTasks) else OpenTasks(open_tasks)
+        )
 
     def open_tasks(self) -> List[str]:
         return list(self.open)
-
-    @staticmethod
-    def slots_filled(task_memory: Tasks) -> bool:
-        """
-        all slots in task Memory have a value
-        """
-        for slot in task_memory.values():
-            if slot.Default is None:
-                return False
-        return True
@@ -0,0 +1,117 @@
+from typing import Any, Dict, Iterator, Tuple
+from collections.abc import Mapping
+
+from task_tracker.yaml_utils.datatypes import Tasks, YamlFields
+from task_tracker.yaml_utils.records import Record
+
+
+class SlotState:
+    """
+    a slot of an open task in one conversation
+    its settings are read from the (shared) task settings
+    its value is only copied into the conversation once written
+    """
+
+    def __init__(
+        self, slot_name: str, settings: Tasks, slot_values: Dict[str, Any]
+    ) -> None:
+        self.slot_name = slot_name
+        self.settings = settings
+        self.slot_values = slot_values
+
+    @property
+    def Default(self) -> Any:
+        if self.slot_name in self.slot_values:
+            return self.slot_values[self.slot_name]
+        return self.settings.Default
+
+    @Default.setter
+    def Default(self, slot_value: Any) -> None:
+        self.slot_values[self.slot_name] = slot_value
+
+    @property
+    def Prompt(self) -> Any:
+        return self.settings.Prompt
+
+    @property
+    def Scope(self) -> Any:
+        return self.settings.Scope
+
+
+class MemoryState(Mapping):
+    """
+    the Memory of an open task in one conversation
+    (slot name -> SlotState)
+    """
+
+    def __init__(self, settings: Tasks, slot_values: Dict[str, Any]) -> None:
+        self.settings = settings
+        self.slot_values = slot_values
+
+    def __reduce__(self) -> Tuple[type, Tuple[Tasks, Dict[str, Any]]]:
+        return MemoryState, (self.settings, self.slot_values)
+
+    def __getitem__(self, slot_name: str) -> SlotState:
+        return SlotState(
+            slot_name=slot_name,
+            settings=self.settings[slot_name],
+            slot_values=self.slot_values,
+        )
+
+    def __getattr__(self, slot_name: str) -> SlotState:
+        if slot_name not in self.settings:
+            raise AttributeError(slot_name)
+        return self[slot_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.settings)
+
+    def __len__(self) -> int:
+        return len(self.settings)
+
+
+class TaskState:
+    """
+    an open task in one conversation
+    layered over the task settings (which are shared by all conversations)
+    only the slot values written in this conversation
+    and the Complete flag are stored here (copy-on-write)
+    """
+
+    def __init__(self, settings: Tasks) -> None:
+        self.settings = settings
+        self.slot_values: Dict[str, Any] = dict()
+        self.Complete: bool = settings.Complete
+        self.Memory = MemoryState(
+            settings=settings.Memory, slot_values=self.slot_values
+        )
+
+    def __repr__(self) -> str:
+        return repr(self.as_dict())
+
+    @property
+    def Action(self) -> Tasks:
+        return self.settings.Action
+
+    @property
+    def TriggeredBy(self) -> str:
+        return self.settings.TriggeredBy
+
+    @property
+    def Possible(self) -> bool:
+        return self.settings.Possible
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        the task as it would appear in the settings
+        (with this conversation's values filled in)
+        """
+        task = Record.to_dict(self.settings)
+        task[YamlFields.TASKS.value.MEMORY.value.THIS.value] = memory = dict()
+        for slot_name, slot in self.Memory.items():
+            memory[slot_name] = Record.to_dict(slot.settings)
+            memory[slot_name][
+                YamlFields.TASKS.value.MEMORY.value.SLOT.value.DEFAULT.value
+            ] = slot.Default
+        task[YamlFields.TASKS.value.FLAG.value.COMPLETE.value] = self.Complete
+        return task
@@ -1,18 +1,59 @@
-from typing import Tuple
+from typing import List, Optional, Tuple
+from os.path import dirname, join
 
 from task_tracker.core.state_tracker import StateTracker
+from task_tracker.core.envelope_batcher import EnvelopeBatcher
 from task_tracker.yaml_utils.datatypes import Tasks
 from task_tracker.datastructures.slots import Slots
 from task_tracker.datastructures.signals import Signals
 from task_tracker.datastructures.stack import Stack
+from task_tracker.datastructures.codec import StackCodec, SlotsCodec
+from task_tracker.storage.session_store import SessionStore, MemorySessionStore
+from task_tracker.storage.session_journal import SessionJournal
 
 from oxengine import Envelope, OxService
 
 
 class MANTaskPolicy(OxService):
-    def __init__(self) -> None:
-        path_to_settings = "task_tracker/config/settings.yml"
+    def __init__(
+        self,
+        session_store: Optional[SessionStore] = None,
+        journal: Optional[SessionJournal] = None,
+        max_batch_size: int = 1,
+        max_batch_wait_ms: float = 5.0,
+        session_ttl: Optional[float] = 24 * 60 * 60,
+    ) -> None:
+        """
+        the slots and stack of each conversation are kept in the session store
+        (by default in this process - parallel instances should share a store
+        e.g. CachedSessionStore(SQLiteSessionStore(path)))
+        each turn is also appended to the journal (if any)
+        and the conversations in it are restored into the store on start up
+        conversations without a turn for session_ttl seconds are forgotten
+        (None = kept until forget is called)
+        if max_batch_size > 1 envelopes are forwarded in batches
+        (of those which arrive within max_batch_wait_ms of each other)
+        """
+        path_to_settings = join(dirname(__file__), "config", "settings.yml")
         self.dst = StateTracker(path_to_settings)
+        self.session_ttl = session_ttl
+        self.sessions = (
+            MemorySessionStore(ttl=session_ttl)
+            if session_store is None
+            else session_store
+        )
+        self.journal = journal
+        if self.journal is not None:
+            self._recover()
+        self.batcher = (
+            EnvelopeBatcher(
+                forward_many=self.forward_many,
+                max_size=max_batch_size,
+                max_wait_ms=max_batch_wait_ms,
+            )
+            if max_batch_size > 1
+            else None
+        )
         # TODO - initialise OxService properly like other MANAGERS
 
     def forward(self, envelope: Envelope) -> Envelope:
@@ -20,14 +61,91 @@ class MANTaskPolicy(OxService):
         relevant data is unpacked from the envelope
         updated (in-place) by the policy
         and repacked back into the envelope
+        (envelopes without a session id are taken as one-off conversations
+        - started afresh and not kept)
         """
-        slots, tasks = self._from_memory()
+        session_id = self._session_id(inputs=envelope)
+        if self.batcher is not None:
+            return self.batcher.forward(envelope)
+        slots, tasks = self._from_memory(session_id=session_id)
         self.dst.update(
             signals=self._from_envelope(inputs=envelope), slots=slots, tasks=tasks
         )
-        self._to_memory(slots=slots, tasks=tasks)
+        self._to_memory(session_id=session_id, slots=slots, tasks=tasks)
+        self._forget_idle()
         return envelope
 
+    def forward_many(self, envelopes: List[Envelope]) -> List[Envelope]:
+        """
+        same as forward but for many envelopes at once
+        so the task classifier is only called once per batch
+        (envelopes of the same conversation are taken in turn)
+        """
+        for envelope_round in self._rounds(envelopes=envelopes):
+            session_ids = [session_id for session_id, _ in envelope_round]
+            turns = [
+                (
+                    self._from_envelope(inputs=envelope),
+                    *self._from_memory(session_id=session_id),
+                )
+                for session_id, envelope in envelope_round
+            ]
+            self.dst.update_many(turns=turns)
+            self._to_memory_many(
+                turns=[
+                    (session_id, slots, tasks)
+                    for session_id, (_, slots, tasks) in zip(session_ids, turns)
+                ]
+            )
+        self._forget_idle()
+        return envelopes
+
+    def forget(self, session_id: str) -> None:
+        """
+        ends the conversation
+        (its state is deleted from the session store and the journal)
+        """
+        if self.journal is not None:
+            self.journal.forget(session_id)
+        self.sessions.delete(session_id)
+
+    def close(self) -> None:
+        """
+        forwards the envelopes already queued
+        then syncs the journal and writes the waiting sessions
+        """
+        if self.batcher is not None:
+            self.batcher.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.sessions.close()
+
+    def _rounds(
+        self, envelopes: List[Envelope]
+    ) -> List[List[Tuple[Optional[str], Envelope]]]:
+        """
+        splits the envelopes so each conversation appears at most once per round
+        (one-off conversations - without a session id - all go in the first)
+        """
+        rounds: List[List[Tuple[Optional[str], Envelope]]] = list()
+        for envelope in envelopes:
+            session_id = self._session_id(inputs=envelope)
+            for envelope_round in rounds:
+                if session_id is None or session_id not in dict(envelope_round):
+                    envelope_round.append((session_id, envelope))
+                    break
+            else:
+                rounds.append([(session_id, envelope)])
+        return rounds
+
+    def _session_id(self, inputs: Envelope) -> Optional[str]:
+        """
+        the id of the conversation the envelope belongs to
+        (None for a one-off conversation - whose state is not kept)
+        """
+        session_id = getattr(inputs, "session_id", None)
+        return str(session_id) if session_id else None
+
     def _from_envelope(self, inputs: Envelope) -> Signals:
         """
         collects and structures all the required data from the input envelope
@@ -39,10 +157,56 @@ class MANTaskPolicy(OxService):
         # TODO
         return Signals()
 
-    def _from_memory(self) -> Tuple[Slots, Stack]:
-        # TODO
-        return Slots(), Stack()
+    def _from_memory(self, session_id: Optional[str]) -> Tuple[Slots, Stack]:
+        """
+        the slots and stack of the conversation
+        (empty for a new or one-off conversation)
+        """
+        session = None if session_id is None else self.sessions.get(session_id)
+        if session is None:
+            return Slots(), Stack()
+        slots, tasks = session
+        return SlotsCodec.decode(slots), StackCodec.decode(
+            tasks, tasks=self.dst.selector.settings.Tasks
+        )
 
-    def _to_memory(self, slots: Slots, tasks: Stack) -> None:
-        # TODO
-        return Envelope()
+    def _to_memory(self, session_id: Optional[str], slots: Slots, tasks: Stack) -> None:
+        self._to_memory_many(turns=[(session_id, slots, tasks)])
+
+    def _to_memory_many(self, turns: List[Tuple[Optional[str], Slots, Stack]]) -> None:
+        """
+        journals the turns of many conversations together
+        (so they are synced to disk in one group)
+        then keeps them in the session store
+        (one-off conversations are not kept)
+        """
+        turns = [turn for turn in turns if turn[0] is not None]
+        if not any(turns):
+            return
+        if self.journal is not None:
+            sequence = 0
+            for session_id, slots, tasks in turns:
+                sequence = self.journal.append(
+                    session_id=session_id, slots=slots, stack=tasks, wait=False
+                )
+            self.journal.wait_for(sequence)
+        for session_id, slots, tasks in turns:
+            self.sessions.put(
+                session_id, (SlotsCodec.encode(slots), StackCodec.encode(tasks))
+            )
+
+    def _forget_idle(self) -> None:
+        """
+        forgets the conversations without a turn for session_ttl seconds
+        """
+        if self.journal is None or self.session_ttl is None:
+            return
+        for session_id in self.journal.forget_idle(idle_seconds=self.session_ttl):
+            self.sessions.delete(session_id)
+
+    def _recover(self) -> None:
+        """
+        restores the conversations replayed from the journal into the session store
+        """
+        for session_id, (slots, tasks) in self.journal.sessions.items():
+            self.sessions.put(session_id, (slots, StackCodec.encode_snapshot(tasks)))
@@ -0,0 +1,81 @@
+from typing import Any, Callable, Dict, Generator, List, Optional
+from contextlib import contextmanager
+from importlib import import_module
+from threading import Lock
+from time import perf_counter
+
+STARTUP_TIMES: Dict[str, float] = dict()
+
+
+@contextmanager
+def timed(stage: str) -> Generator[None, None, None]:
+    """
+    records how long a stage of start up took (in seconds)
+    """
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMES[stage] = STARTUP_TIMES.get(stage, 0.0) + perf_counter() - start
+
+
+class LazyResource:
+    """
+    a heavy resource (e.g. a model) which is only loaded on first use
+    (once - even if first used by several threads at the same time)
+    """
+
+    resources: List["LazyResource"] = list()
+
+    def __init__(self, name: str, load: Callable[[], Any]) -> None:
+        self.name = name
+        self.load = load
+        self.value = None
+        self.loaded = False
+        self.lock = Lock()
+        LazyResource.resources.append(self)
+
+    def get(self) -> Any:
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    with timed(f"load {self.name}"):
+                        self.value = self.load()
+                    self.loaded = True
+        return self.value
+
+
+def preload(warm_up: Optional[Callable[[], None]] = None) -> None:
+    """
+    loads all heavy resources up front
+    then runs the warm up (if any) - e.g. StateTracker.warm_up
+    which embeds the words of its Say templates
+    (for servers which would rather pay the start up cost before the first turn)
+    """
+    with timed("import task_tracker.datastructures.signals"):
+        import_module("task_tracker.datastructures.signals")
+    for resource in LazyResource.resources:
+        resource.get()
+    if warm_up is not None:
+        with timed("warm up"):
+            warm_up()
+
+
+def startup_report() -> str:
+    """
+    how long each stage of start up took
+    (slowest first)
+    """
+    lines = list(
+        map(
+            lambda stage: f"{stage[1] * 1000:10.1f} ms  {stage[0]}",
+            sorted(STARTUP_TIMES.items(), key=lambda stage: stage[1], reverse=True),
+        )
+    )
+    lines.append(f"{sum(STARTUP_TIMES.values()) * 1000:10.1f} ms  total")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    preload()
+    print(startup_report())
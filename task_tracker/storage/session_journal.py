@@ -0,0 +1,315 @@
+from typing import Dict, Generator, List, Optional, Tuple
+from collections import OrderedDict
+from mmap import mmap, ACCESS_READ
+from os import fsync, listdir, remove, replace
+from os.path import getsize, join
+from struct import Struct
+from threading import Condition, Thread
+from time import monotonic, sleep
+from zlib import crc32
+
+from task_tracker.datastructures.slots import Slots
+from task_tracker.datastructures.stack import Stack
+from task_tracker.datastructures.codec import (
+    VERSION,
+    BinaryReader,
+    BinaryWriter,
+    SlotsCodec,
+    StackCodec,
+    StackSnapshot,
+)
+
+RECORD = 0
+
+FRAME = Struct("<II")  # payload length, crc32 of the payload
+
+SEGMENT = "journal-{index:08d}.log"
+SNAPSHOT = "snapshot-{index:08d}.snap"
+
+JournalEntry = Tuple[bytes, StackSnapshot]  # encoded slots, stack
+
+
+class SessionJournal:
+    """
+    an append-only log of the state of each conversation after each turn
+    (the slots and the stack - as a delta against the previous turn
+    with the whole stack every snapshot_every turns of a conversation)
+
+    appends are written and fsynced by one thread in groups
+    (everything appended while the previous group was synced)
+    once a journal segment is bigger than compact_bytes
+    a new segment is started and all the conversations are snapshotted
+    in the background (after which the older segments are deleted)
+    so on start up only the latest snapshot and the segments since are replayed
+    conversations which ended (or went idle) should be forgotten
+    so they are left out of later snapshots
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_every: int = 50,
+        compact_bytes: int = 64 * 1024 * 1024,
+        commit_delay: float = 0.0,
+    ) -> None:
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.compact_bytes = compact_bytes
+        self.commit_delay = commit_delay
+        self.sessions: Dict[str, JournalEntry] = dict()
+        self.turns: Dict[str, int] = dict()
+        self.last_turns: "OrderedDict[str, float]" = OrderedDict()  # oldest first
+        self.buffer = bytearray()
+        self.appended = 0
+        self.committed = 0
+        self.closed = False
+        self.condition = Condition()
+        self.compactor: Optional[Thread] = None
+        self.segment = self.replay() + 1
+        self.file = open(join(directory, SEGMENT.format(index=self.segment)), "ab")
+        self.committer = Thread(
+            target=self.commit_continuously, name="session-journal", daemon=True
+        )
+        self.committer.start()
+
+    def append(
+        self, session_id: str, slots: Slots, stack: Stack, wait: bool = True
+    ) -> int:
+        """
+        journals the state of the conversation after a turn
+        (waiting until it is synced to disk unless wait is False)
+        returns the sequence number of the record (see wait_for)
+        raises ValueError once the journal is closed
+        """
+        snapshot = StackCodec.snapshot(stack)
+        encoded_slots = SlotsCodec.encode(slots)
+        with self.condition:
+            self.check_open()
+            previous = self.sessions.get(session_id)
+            turns = self.turns.get(session_id, 0)
+            if previous is None or turns % self.snapshot_every == 0:
+                encoded_stack = StackCodec.encode_snapshot(snapshot)
+            else:
+                encoded_stack = StackCodec.encode_snapshot_delta(previous[1], snapshot)
+            self.sessions[session_id] = (encoded_slots, snapshot)
+            self.turns[session_id] = turns + 1
+            self.touch(session_id)
+            sequence = self.write(session_id, encoded_slots, encoded_stack)
+        if wait:
+            self.wait_for(sequence)
+        return sequence
+
+    def wait_for(self, sequence: int) -> None:
+        """
+        waits until the records up to the sequence number are synced to disk
+        (so many turns appended without waiting are synced in one group)
+        closing the journal does not stop the wait - as it commits everything
+        appended before the committer stops
+        """
+        with self.condition:
+            while self.committed < sequence:
+                self.condition.wait()
+
+    def forget(self, session_id: str) -> None:
+        """
+        journals that the conversation ended
+        """
+        with self.condition:
+            self.check_open()
+            if self.sessions.pop(session_id, None) is not None:
+                self.turns.pop(session_id, None)
+                self.last_turns.pop(session_id, None)
+                self.write(session_id, b"", b"")
+
+    def forget_idle(self, idle_seconds: float) -> List[str]:
+        """
+        forgets the conversations without a turn in the last idle_seconds
+        returns their session ids
+        """
+        cutoff = monotonic() - idle_seconds
+        idle_sessions = list()
+        with self.condition:
+            for session_id, last_turn in self.last_turns.items():
+                if last_turn >= cutoff:
+                    break
+                idle_sessions.append(session_id)
+            for session_id in idle_sessions:
+                self.forget(session_id)
+        return idle_sessions
+
+    def touch(self, session_id: str) -> None:
+        self.last_turns[session_id] = monotonic()
+        self.last_turns.move_to_end(session_id)
+
+    def check_open(self) -> None:
+        if self.closed:
+            raise ValueError(f"session journal {self.directory} is closed")
+
+    def write(self, session_id: str, slots: bytes, stack: bytes) -> int:
+        """
+        adds the record to the group waiting to be committed
+        (expects the condition's lock to be held)
+        """
+        self.buffer += SessionJournal.frame(session_id, slots, stack)
+        self.appended += 1
+        self.condition.notify_all()
+        return self.appended
+
+    @staticmethod
+    def frame(session_id: str, slots: bytes, stack: bytes) -> bytes:
+        writer = BinaryWriter(version=VERSION, kind=RECORD)
+        writer.string(session_id)
+        writer.value(slots)
+        writer.value(stack)
+        return FRAME.pack(len(writer.buffer), crc32(writer.buffer)) + writer.buffer
+
+    def commit_continuously(self) -> None:
+        """
+        writes and fsyncs each group of records
+        starting a new segment (and a compaction) when the segment is too big
+        """
+        while True:
+            with self.condition:
+                while not self.buffer and not self.closed:
+                    self.condition.wait()
+                if self.closed and not self.buffer:
+                    return
+            if self.commit_delay:
+                sleep(self.commit_delay)
+            with self.condition:
+                group, self.buffer = self.buffer, bytearray()
+                sequence = self.appended
+                rotate = self.file.tell() + len(group) > self.compact_bytes
+                sessions = dict(self.sessions) if rotate else None
+            self.file.write(group)
+            self.file.flush()
+            fsync(self.file.fileno())
+            if rotate:
+                self.rotate(sessions)
+            with self.condition:
+                self.committed = sequence
+                self.condition.notify_all()
+
+    def rotate(self, sessions: Dict[str, JournalEntry]) -> None:
+        """
+        starts a new segment
+        and snapshots the conversations (as of the end of the previous segment)
+        in the background
+        """
+        self.file.close()
+        self.segment += 1
+        self.file = open(join(self.directory, SEGMENT.format(index=self.segment)), "ab")
+        if self.compactor is not None:
+            self.compactor.join()
+        self.compactor = Thread(
+            target=self.compact,
+            args=(sessions, self.segment),
+            name="session-journal-compaction",
+            daemon=True,
+        )
+        self.compactor.start()
+
+    def compact(self, sessions: Dict[str, JournalEntry], segment: int) -> None:
+        """
+        writes the snapshot the segment starts from
+        then deletes the older segments and snapshots
+        """
+        path = join(self.directory, SNAPSHOT.format(index=segment))
+        with open(f"{path}.tmp", "wb") as snapshot_file:
+            for session_id, (slots, snapshot) in sessions.items():
+                snapshot_file.write(
+                    SessionJournal.frame(
+                        session_id, slots, StackCodec.encode_snapshot(snapshot)
+                    )
+                )
+            snapshot_file.flush()
+            fsync(snapshot_file.fileno())
+        replace(f"{path}.tmp", path)
+        for index, filename in self.files():
+            if index < segment:
+                remove(join(self.directory, filename))
+
+    def files(self) -> List[Tuple[int, str]]:
+        """
+        the journal segments and snapshots (index,filename) in order
+        (a snapshot comes before the segment with the same index)
+        """
+        files = list()
+        for filename in listdir(self.directory):
+            for pattern in (SEGMENT, SNAPSHOT):
+                prefix, suffix = pattern.split("{")[0], pattern.split("}")[1]
+                if filename.startswith(prefix) and filename.endswith(suffix):
+                    files.append((int(filename[len(prefix) : -len(suffix)]), filename))
+        return sorted(files, key=lambda file: (file[0], file[1].endswith(".log")))
+
+    def replay(self) -> int:
+        """
+        rebuilds the conversations from the latest snapshot
+        and the segments written since
+        returns the index of the last segment
+        """
+        files = self.files()
+        snapshots = [index for index, filename in files if filename.endswith(".snap")]
+        start = max(snapshots, default=0)
+        last = 0
+        for index, filename in files:
+            if index >= start and (
+                filename.endswith(".log") or (index == start and any(snapshots))
+            ):
+                for session_id, slots, stack in SessionJournal.read(
+                    join(self.directory, filename)
+                ):
+                    self.apply(session_id, slots, stack)
+            last = max(last, index)
+        return last
+
+    def apply(self, session_id: str, slots: bytes, stack: bytes) -> None:
+        if not stack:
+            self.sessions.pop(session_id, None)
+            self.turns.pop(session_id, None)
+            self.last_turns.pop(session_id, None)
+            return
+        previous = self.sessions.get(session_id)
+        try:
+            snapshot = StackCodec.decode_snapshot(
+                stack, previous=None if previous is None else previous[1]
+            )
+        except ValueError:
+            return
+        self.sessions[session_id] = (slots, snapshot)
+        self.turns[session_id] = self.turns.get(session_id, 0) + 1
+        self.touch(session_id)
+
+    @staticmethod
+    def read(path: str) -> Generator[Tuple[str, bytes, bytes], None, None]:
+        """
+        the records of a segment or snapshot (via mmap)
+        up to the first incomplete or corrupt record (e.g. cut off by a crash)
+        returns session_id,slots,stack
+        """
+        if getsize(path) == 0:
+            return
+        with open(path, "rb") as datafile, mmap(
+            datafile.fileno(), 0, access=ACCESS_READ
+        ) as data:
+            offset = 0
+            while offset + FRAME.size <= len(data):
+                length, checksum = FRAME.unpack_from(data, offset)
+                payload = data[offset + FRAME.size : offset + FRAME.size + length]
+                if len(payload) < length or crc32(payload) != checksum:
+                    return
+                reader = BinaryReader(payload)
+                yield reader.string(), reader.value(), reader.value()
+                offset += FRAME.size + length
+
+    def close(self) -> None:
+        """
+        commits everything appended and closes the segment
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.committer.join()
+        if self.compactor is not None:
+            self.compactor.join()
+        self.file.close()
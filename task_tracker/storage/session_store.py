@@ -0,0 +1,317 @@
+from typing import Dict, Generator, Optional, Tuple
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from queue import Empty, Queue
+from sqlite3 import Connection, Error, connect
+from threading import Event, Lock, Thread
+from time import perf_counter
+from warnings import warn
+
+from task_tracker.datastructures.lru_cache import LRUCache
+
+Session = Tuple[bytes, bytes]  # encoded slots, encoded stack
+
+
+class SessionStore(ABC):
+    """
+    where the (encoded) slots and stack of each conversation are kept
+    between turns (keyed by session id)
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Session]:
+        pass
+
+    @abstractmethod
+    def put(self, session_id: str, session: Session) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        """
+        measurements of the store (if any)
+        """
+        return dict()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    keeps the sessions in this process
+    (least recently used sessions are dropped
+    as are sessions not updated for ttl seconds)
+    """
+
+    def __init__(self, max_entries: int = 100000, ttl: Optional[float] = None) -> None:
+        self.sessions = LRUCache(max_entries=max_entries, ttl=ttl)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self.sessions.get(session_id)
+
+    def put(self, session_id: str, session: Session) -> None:
+        self.sessions.put(session_id, session)
+
+    def delete(self, session_id: str) -> None:
+        self.sessions.discard(session_id)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    keeps the sessions in a local SQLite database (in WAL mode)
+    writes are batched - they are written together
+    once batch_size sessions are waiting or every flush_interval seconds
+    (waiting writes - and writes in a transaction not yet committed -
+    are read back before they are written)
+    connections are taken from a pool of up to pool_size connections
+    """
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int = 4,
+        batch_size: int = 64,
+        flush_interval: float = 0.05,
+    ) -> None:
+        self.path = path
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.connections: "Queue[Connection]" = Queue()
+        self.opened = 0
+        self.pool_lock = Lock()
+        self.pending: Dict[str, Optional[Session]] = dict()
+        self.flushing: Dict[str, Optional[Session]] = dict()
+        self.pending_lock = Lock()
+        self.flush_lock = Lock()
+        self.flushes = 0
+        self.flushed = 0
+        self.flush_seconds = 0.0
+        with self.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(session_id TEXT PRIMARY KEY, slots BLOB, stack BLOB)"
+            )
+        self.closed = Event()
+        self.flusher = Thread(
+            target=self.flush_periodically,
+            args=(flush_interval,),
+            name="session-store-flush",
+            daemon=True,
+        )
+        self.flusher.start()
+
+    def open_connection(self) -> Connection:
+        connection = connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Generator[Connection, None, None]:
+        """
+        a connection from the pool
+        (opened if none are free and fewer than pool_size are open)
+        """
+        try:
+            connection = self.connections.get_nowait()
+        except Empty:
+            with self.pool_lock:
+                open_new = self.opened < self.pool_size
+                self.opened += open_new
+            if open_new:
+                try:
+                    connection = self.open_connection()
+                except Error:
+                    with self.pool_lock:
+                        self.opened -= 1
+                    raise
+            else:
+                connection = self.connections.get()
+        try:
+            yield connection
+        finally:
+            self.connections.put(connection)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self.pending_lock:
+            if session_id in self.pending:
+                return self.pending[session_id]
+            if session_id in self.flushing:
+                return self.flushing[session_id]
+        with self.connection() as connection:
+            row = connection.execute(
+                "SELECT slots, stack FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def put(self, session_id: str, session: Session) -> None:
+        self.queue(session_id=session_id, session=session)
+
+    def delete(self, session_id: str) -> None:
+        self.queue(session_id=session_id, session=None)
+
+    def queue(self, session_id: str, session: Optional[Session]) -> None:
+        """
+        the session waits to be written (None = deleted)
+        """
+        with self.pending_lock:
+            self.pending[session_id] = session
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        writes the waiting sessions in one transaction
+        (they can still be read until the transaction is committed
+        and wait for the next flush if it fails)
+        """
+        with self.flush_lock:
+            with self.pending_lock:
+                self.flushing, self.pending = self.pending, dict()
+                flushing = self.flushing
+            if not any(flushing):
+                return
+            try:
+                with self.connection() as connection:
+                    start = perf_counter()
+                    try:
+                        connection.execute("BEGIN")
+                        connection.executemany(
+                            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                            [
+                                (session_id, *session)
+                                for session_id, session in flushing.items()
+                                if session is not None
+                            ],
+                        )
+                        connection.executemany(
+                            "DELETE FROM sessions WHERE session_id = ?",
+                            [
+                                (session_id,)
+                                for session_id, session in flushing.items()
+                                if session is None
+                            ],
+                        )
+                        connection.execute("COMMIT")
+                    except Error:
+                        if connection.in_transaction:
+                            connection.execute("ROLLBACK")
+                        raise
+                    self.flushes += 1
+                    self.flushed += len(flushing)
+                    self.flush_seconds += perf_counter() - start
+            except Error:
+                with self.pending_lock:
+                    self.pending = {**flushing, **self.pending}
+                raise
+            finally:
+                with self.pending_lock:
+                    self.flushing = dict()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        number of flushes, mean sessions per flush
+        and mean latency (in ms) of their transactions
+        """
+        with self.flush_lock:
+            return dict(
+                flushes=self.flushes,
+                mean_flush_size=self.flushed / self.flushes if self.flushes else 0.0,
+                write_latency=self.flush_seconds / self.flushes * 1000
+                if self.flushes
+                else 0.0,
+            )
+
+    def flush_periodically(self, flush_interval: float) -> None:
+        while not self.closed.wait(flush_interval):
+            try:
+                self.flush()
+            except Error as error:
+                warn(f"sessions not written to {self.path} ({error})")
+
+    def close(self) -> None:
+        """
+        writes the waiting sessions and closes the connections
+        """
+        self.closed.set()
+        self.flusher.join()
+        self.flush()
+        with self.pool_lock:
+            for _ in range(self.opened):
+                self.connections.get().close()
+            self.opened = 0
+
+
+class CachedSessionStore(SessionStore):
+    """
+    a read-through (and write-through) cache in front of a session store
+    which also measures its hit rate and the latency of reads from the store
+    (sessions should be routed to the same instance
+    or the cache given a short ttl - as other instances' writes are not seen)
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        max_entries: int = 10000,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.store = store
+        self.cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.reads = 0
+        self.writes = 0
+        self.read_seconds = 0.0
+        self.lock = Lock()
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self.cache.get(session_id)
+        if session is None:
+            start = perf_counter()
+            session = self.store.get(session_id)
+            self.record_read(perf_counter() - start)
+            if session is not None:
+                self.cache.put(session_id, session)
+        return session
+
+    def put(self, session_id: str, session: Session) -> None:
+        self.cache.put(session_id, session)
+        self.store.put(session_id, session)
+        with self.lock:
+            self.writes += 1
+
+    def delete(self, session_id: str) -> None:
+        self.cache.discard(session_id)
+        self.store.delete(session_id)
+
+    def close(self) -> None:
+        self.store.close()
+
+    def record_read(self, seconds: float) -> None:
+        with self.lock:
+            self.reads += 1
+            self.read_seconds += seconds
+
+    def stats(self) -> Dict[str, float]:
+        """
+        hit rate of the cache and mean latency (in ms) of reads from the store
+        (with the store's own stats - e.g. the latency of its writes)
+        """
+        cache_stats = self.cache.stats()
+        with self.lock:
+            return dict(
+                **self.store.stats(),
+                hits=cache_stats["hits"],
+                misses=cache_stats["misses"],
+                hit_rate=cache_stats["hit_rate"],
+                store_reads=self.reads,
+                store_writes=self.writes,
+                read_latency=self.read_seconds / self.reads * 1000
+                if self.reads
+                else 0.0,
+            )
@@ -0,0 +1,241 @@
+from typing import Any, Dict, List, Type
+from abc import ABC, abstractmethod
+
+from numpy import (
+    ndarray,
+    arange,
+    argmax,
+    array,
+    asarray,
+    concatenate,
+    exp,
+    eye,
+    float32,
+    float64,
+    hstack,
+    int32,
+    ones,
+    repeat,
+    unique,
+    vstack,
+    where,
+    zeros,
+)
+from numpy.linalg import norm, solve
+
+from task_tracker.yaml_utils.datatypes import ClassifierFields
+
+
+class ClassifierBackend(ABC):
+    """
+    the model behind the TaskClassifier
+    fitted on signal vectors and task label indexes
+    """
+
+    compress = 3
+
+    def __init__(self, **hyperparameters: Any) -> None:
+        self.hyperparameters = hyperparameters
+        self.task_labels: List[str] = list()
+        self.classes = zeros(0, dtype=int)
+
+    @abstractmethod
+    def fit(self, x: ndarray, y: ndarray) -> None:
+        pass
+
+    @abstractmethod
+    def predict_proba(self, x: ndarray) -> ndarray:
+        """
+        probability of each class (column) for each input vector (row)
+        """
+
+    def predict(self, x: ndarray) -> ndarray:
+        """
+        most probable task label index for each input vector (row)
+        """
+        return self.classes[argmax(self.predict_proba(x), axis=1)]
+
+    @staticmethod
+    def softmax(scores: ndarray, temperature: float) -> ndarray:
+        scores = (scores - scores.max(axis=1, keepdims=True)) / temperature
+        probabilities = exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+class RandomForestBackend(ClassifierBackend):
+    """
+    sklearn's RandomForestClassifier
+    """
+
+    def __init__(self, n_estimators: int = 100) -> None:
+        super().__init__(n_estimators=n_estimators)
+        self.model = None
+
+    def fit(self, x: ndarray, y: ndarray) -> None:
+        from sklearn.ensemble import RandomForestClassifier
+
+        self.model = RandomForestClassifier(**self.hyperparameters)
+        self.model.fit(x, y)
+        self.classes = self.model.classes_
+
+    def predict_proba(self, x: ndarray) -> ndarray:
+        return self.model.predict_proba(x)
+
+
+class FlatForestBackend(RandomForestBackend):
+    """
+    a RandomForest flattened into contiguous arrays of nodes
+    (feature, threshold, left and right child and normalised leaf values)
+    stored uncompressed so it can be memory mapped
+    (i.e. worker processes share the same pages)
+    and traversed for all trees at once with numpy
+    """
+
+    compress = 0
+
+    def __init__(self, n_estimators: int = 100) -> None:
+        super().__init__(n_estimators=n_estimators)
+        self.feature = zeros(0, dtype=int32)
+        self.threshold = zeros(0)
+        self.left = zeros(0, dtype=int32)
+        self.right = zeros(0, dtype=int32)
+        self.values = zeros((0, 0))
+        self.roots = zeros(0, dtype=int32)
+        self.depth = 0
+
+    def fit(self, x: ndarray, y: ndarray) -> None:
+        super().fit(x, y)
+        FlatForestBackend.flatten(forest=self.model, flat_forest=self)
+        self.model = None
+
+    def predict_proba(self, x: ndarray) -> ndarray:
+        """
+        every row descends every tree together (one level per step)
+        left when x <= threshold (like sklearn, on float32 inputs)
+        leaves point to themselves so finished rows stay put
+        """
+        x = asarray(x, dtype=float32)
+        rows = arange(len(x))[:, None]
+        nodes = repeat(self.roots[None, :], len(x), axis=0)
+        for _ in range(self.depth):
+            nodes = where(
+                x[rows, self.feature[nodes]] <= self.threshold[nodes],
+                self.left[nodes],
+                self.right[nodes],
+            )
+        return self.values[nodes].mean(axis=1)
+
+    @staticmethod
+    def flatten(forest: Any, flat_forest: "FlatForestBackend") -> None:
+        """
+        copies the nodes of all the fitted trees (e.g. of a RandomForestClassifier)
+        into the arrays of the flat forest
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_indexes = arange(tree.node_count)
+            is_leaf = tree.children_left < 0
+            features.append(where(is_leaf, 0, tree.feature))
+            thresholds.append(where(is_leaf, 0.0, tree.threshold))
+            lefts.append(where(is_leaf, node_indexes, tree.children_left) + offset)
+            rights.append(where(is_leaf, node_indexes, tree.children_right) + offset)
+            counts = tree.value[:, 0, :]
+            values.append(counts / counts.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+        flat_forest.feature = concatenate(features).astype(int32)
+        flat_forest.threshold = concatenate(thresholds).astype(float64)
+        flat_forest.left = concatenate(lefts).astype(int32)
+        flat_forest.right = concatenate(rights).astype(int32)
+        flat_forest.values = vstack(values).astype(float64)
+        flat_forest.roots = array(roots, dtype=int32)
+        flat_forest.depth = depth
+        flat_forest.classes = forest.classes_
+
+    @staticmethod
+    def export(random_forest: RandomForestBackend) -> "FlatForestBackend":
+        """
+        a flat copy of an already trained RandomForest backend
+        """
+        flat_forest = FlatForestBackend(**random_forest.hyperparameters)
+        flat_forest.task_labels = random_forest.task_labels
+        FlatForestBackend.flatten(forest=random_forest.model, flat_forest=flat_forest)
+        return flat_forest
+
+
+class NearestCentroidBackend(ClassifierBackend):
+    """
+    the class whose (normalised) mean vector is closest by cosine similarity
+    (a single matrix-vector product per prediction)
+    """
+
+    def __init__(self, temperature: float = 0.05) -> None:
+        super().__init__(temperature=temperature)
+        self.centroids = zeros((0, 0))
+
+    def fit(self, x: ndarray, y: ndarray) -> None:
+        self.classes = unique(y)
+        x = NearestCentroidBackend.normalise(x)
+        self.centroids = NearestCentroidBackend.normalise(
+            vstack(list(map(lambda label: x[y == label].mean(axis=0), self.classes)))
+        )
+
+    def predict_proba(self, x: ndarray) -> ndarray:
+        similarities = NearestCentroidBackend.normalise(x) @ self.centroids.T
+        return ClassifierBackend.softmax(
+            similarities, temperature=self.hyperparameters["temperature"]
+        )
+
+    @staticmethod
+    def normalise(x: ndarray) -> ndarray:
+        lengths = norm(x, axis=1, keepdims=True)
+        lengths[lengths == 0] = 1
+        return x / lengths
+
+
+class LinearBackend(ClassifierBackend):
+    """
+    one-vs-rest ridge regression on standardised signal vectors
+    (a single matrix-vector product per prediction)
+    """
+
+    def __init__(self, alpha: float = 1.0, temperature: float = 0.1) -> None:
+        super().__init__(alpha=alpha, temperature=temperature)
+        self.mean = zeros(0)
+        self.scale = ones(0)
+        self.weights = zeros((0, 0))
+
+    def fit(self, x: ndarray, y: ndarray) -> None:
+        self.classes = unique(y)
+        self.mean = x.mean(axis=0)
+        self.scale = x.std(axis=0)
+        self.scale[self.scale == 0] = 1
+        x = self.with_bias(x)
+        targets = (y[:, None] == self.classes[None, :]).astype(float)
+        regularisation = self.hyperparameters["alpha"] * eye(x.shape[1])
+        regularisation[-1, -1] = 0
+        self.weights = solve(x.T @ x + regularisation, x.T @ targets)
+
+    def predict_proba(self, x: ndarray) -> ndarray:
+        return ClassifierBackend.softmax(
+            self.with_bias(x) @ self.weights,
+            temperature=self.hyperparameters["temperature"],
+        )
+
+    def with_bias(self, x: ndarray) -> ndarray:
+        """
+        standardised input vectors with a constant bias feature appended
+        """
+        return hstack([(x - self.mean) / self.scale, ones((len(x), 1))])
+
+
+BACKENDS: Dict[str, Type[ClassifierBackend]] = {
+    ClassifierFields.RANDOM_FOREST.value: RandomForestBackend,
+    ClassifierFields.FLAT_FOREST.value: FlatForestBackend,
+    ClassifierFields.NEAREST_CENTROID.value: NearestCentroidBackend,
+    ClassifierFields.LINEAR.value: LinearBackend,
+}
@@ -0,0 +1,87 @@
+from typing import Any, Optional
+from hashlib import sha256
+from json import dumps
+from os import listdir, remove, replace, utime, makedirs
+from os.path import join, getsize, getmtime, exists
+from joblib import dump, load
+
+
+class ModelCache:
+    """
+    trained models stored side by side in a directory
+    each keyed by a hash of everything the trained model depends on
+    (the least recently used models are removed
+    once the cached models take up more than max_bytes)
+    """
+
+    def __init__(
+        self, directory: str, prefix: str, max_bytes: int = 512 * 1024 * 1024
+    ) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return join(self.directory, f"{self.prefix}-{key}.joblib")
+
+    def load(self, key: str, mmap_mode: Optional[str] = None) -> Optional[Any]:
+        """
+        the cached model (if any)
+        (the arrays of models saved uncompressed can be memory mapped
+        e.g. mmap_mode="r" so processes share them instead of copying)
+        """
+        path = self.path(key)
+        if not exists(path):
+            return None
+        try:
+            utime(path)
+        except OSError:
+            pass  # e.g. a read-only cache (only the eviction order is affected)
+        return load(path, mmap_mode=mmap_mode)
+
+    def save(self, key: str, model: Any, compress: int = 3) -> None:
+        """
+        caches the model
+        (evicting the least recently used models if the cache is too big)
+        """
+        makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        dump(model, f"{path}.tmp", compress=compress)
+        replace(f"{path}.tmp", path)
+        self.evict(keep=path)
+
+    def evict(self, keep: str) -> None:
+        """
+        removes the least recently used models
+        until the cache is within max_bytes
+        (except the model which must be kept)
+        """
+        paths = sorted(
+            map(
+                lambda filename: join(self.directory, filename),
+                filter(
+                    lambda filename: filename.startswith(f"{self.prefix}-")
+                    and filename.endswith(".joblib"),
+                    listdir(self.directory),
+                ),
+            ),
+            key=getmtime,
+        )
+        total_bytes = sum(map(getsize, paths))
+        for path in paths:
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total_bytes -= getsize(path)
+            remove(path)
+
+    @staticmethod
+    def key(*dependencies: Any) -> str:
+        """
+        hash of everything a trained model depends on
+        (e.g. training examples, feature extractor version, hyperparameters)
+        """
+        return sha256(
+            dumps(dependencies, sort_keys=True, default=repr).encode()
+        ).hexdigest()[:16]
@@ -1,63 +1,284 @@
-from typing import List, Generator, Tuple
-from os.path import exists
-from joblib import dump, load
+from typing import Dict, List, Generator, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from math import ceil
+from os.path import dirname, join, splitext, split as split_path
 from re import split
+from threading import Lock
+from time import perf_counter
 
-from numpy import ndarray
-from sklearn.ensemble import RandomForestClassifier
+from numpy import ndarray, argmax, array, asarray, ones, sort, vstack
 
 from task_tracker.yaml_utils.datatypes import Tasks
-from task_tracker.datastructures.signals import Signals
+from task_tracker.datastructures.signals import (
+    Signals,
+    CHEAP_FEATURES,
+    FEATURE_VERSION,
+    SYNTAX_FEATURES,
+    UTTERANCE_FEATURES,
+)
+from task_tracker.trained_models.model_cache import ModelCache
+from task_tracker.trained_models.backends import BACKENDS, ClassifierBackend
+from task_tracker.startup import preload
 from task_tracker.yaml_utils.datatypes import TaskFields
 
+DEFAULT_CLASSIFIER_PATH = join(dirname(__file__), "random_forest.joblib")
+CHEAP_TIER = "cheap"
+FULL_TIER = "full"
 
-class TaskClassifier:
-    def __init__(self, settings: Tasks, classifier_path: str) -> None:
 
-        self.model = None
-        task_labels = list(settings.Tasks)
+def encode_utterances(utterances: Sequence[str]) -> ndarray:
+    """
+    signal vectors of the utterances as a single contiguous matrix
+    (a module level function so worker processes can run it)
+    """
+    return vstack(
+        list(
+            map(
+                lambda utterance: Signals(
+                    user_utterance=utterance, intent=None, topic=None
+                ).vector(),
+                utterances,
+            )
+        )
+    )
 
-        if exists(classifier_path):
-            pretrained = load(classifier_path)
 
-            if pretrained.task_labels == task_labels:
-                self.model = pretrained
+class TaskClassifier:
+    def __init__(
+        self,
+        settings: Tasks,
+        classifier_path: str,
+        encoding_workers: int = 1,
+        cascade_threshold: Optional[float] = None,
+    ) -> None:
+        """
+        the backend model is chosen in the settings (Classifier: Backend:)
+        trained models are cached next to the classifier_path
+        keyed by a hash of the training data, feature version, backend and hyperparameters
+        (e.g. random_forest.joblib -> random_forest-<hash>.joblib)
+        so editing the settings never serves a stale model
+        and switching back to previous settings never retrains
+        encoding_workers processes encode the training examples (if > 1)
+        in cascade mode (Classifier: Cascade: or cascade_threshold)
+        a cheap model first classifies the cheap part of the signals
+        and the full model is only used when the cheap model's
+        confidence margin is below the threshold
+        """
+        self.encoding_workers = encoding_workers
+        self.cascade_threshold = (
+            settings.Classifier.Cascade
+            if cascade_threshold is None
+            else cascade_threshold
+        )
+        self.train_data: Optional[Tuple[ndarray, ndarray]] = None
+        self.tier_stats = {
+            tier: dict(turns=0, hits=0, seconds=0.0) for tier in (CHEAP_TIER, FULL_TIER)
+        }
+        self.tier_stats_lock = Lock()
+        cache_directory, cache_filename = split_path(classifier_path)
+        cache = ModelCache(
+            directory=cache_directory or ".", prefix=splitext(cache_filename)[0]
+        )
+        self.model = self.load_or_train(settings=settings, cache=cache, columns=None)
+        self.cheap_model = (
+            None
+            if self.cascade_threshold is None
+            else self.load_or_train(
+                settings=settings, cache=cache, columns=CHEAP_FEATURES
+            )
+        )
+        self.train_data = None
 
-        if self.model is None:
-            print("training task classifier...")
-            self.model = RandomForestClassifier()
-            self.model.task_labels = task_labels
-            self.train(settings)
-            dump(self.model, classifier_path, compress=3)
+    def load_or_train(
+        self, settings: Tasks, cache: ModelCache, columns: Optional[slice]
+    ) -> ClassifierBackend:
+        """
+        the cached model trained on the given columns of the signal vectors
+        (all columns if None) or a newly trained (and cached) one
+        """
+        task_labels = list(settings.Tasks)
+        backend_name = settings.Classifier.Backend
+        backend = BACKENDS[backend_name]()
+        cache_key = ModelCache.key(
+            list(self.get_train_data(tasks=settings.Tasks)),
+            task_labels,
+            FEATURE_VERSION,
+            backend_name,
+            backend.hyperparameters,
+            *(() if columns is None else (repr(columns),)),
+        )
+        model = cache.load(cache_key, mmap_mode="r" if backend.compress == 0 else None)
+        if model is None:
+            print(f"training task classifier ({backend_name})...")
+            model = backend
+            model.task_labels = task_labels
+            self.train(model=model, settings=settings, columns=columns)
+            cache.save(cache_key, model, compress=model.compress)
+        return model
 
     def predict(self, input_vector: ndarray) -> List[str]:
+        return self.predict_many(input_vectors=[input_vector])
+
+    def predict_many(self, input_vectors: ndarray) -> List[str]:
+        """
+        predicts one task label per row
+        (a single call to the model for the whole batch)
+        """
         return list(
             map(
                 lambda index: self.model.task_labels[index],
-                self.model.predict([input_vector]),
+                self.model.predict(asarray(input_vectors)),
             )
         )
 
-    def train(self, settings: Tasks) -> None:
-        x, y = zip(*self.get_encoded_train_data(settings))
-        self.model.fit(x, y)
+    def extract_features(self, signals: Signals) -> None:
+        """
+        extracts the features of the signals the first tier needs
+        (so they can be extracted ahead of classification)
+        """
+        if self.cheap_model is None:
+            signals.vector()
+        else:
+            signals.cheap_vector()
+
+    def classify(self, signals: Signals) -> List[str]:
+        return self.classify_many(signals=[signals])
+
+    def classify_many(self, signals: List[Signals]) -> List[str]:
+        """
+        predicts one task label per signals
+        (via the cheap model first in cascade mode
+        so the costly features are only extracted for unsure cases)
+        the words of all the utterances are embedded in one batch
+        but each utterance is still encoded by conversation_metrics in turn
+        """
+        task_labels: List[Optional[str]] = [None] * len(signals)
+        unsure = list(range(len(signals)))
+        if self.cheap_model is not None and any(signals):
+            start = perf_counter()
+            Signals.extract_many(signals, group=SYNTAX_FEATURES)
+            probabilities = self.cheap_model.predict_proba(
+                vstack(list(map(lambda signal: signal.cheap_vector(), signals)))
+            )
+            margins = self.confidence_margins(probabilities)
+            unsure = list()
+            for index, (margin, label_index) in enumerate(
+                zip(margins, self.cheap_model.classes[argmax(probabilities, axis=1)])
+            ):
+                if margin >= self.cascade_threshold:
+                    task_labels[index] = self.cheap_model.task_labels[label_index]
+                else:
+                    unsure.append(index)
+            self.record_tier(
+                tier=CHEAP_TIER,
+                turns=len(signals),
+                hits=len(signals) - len(unsure),
+                seconds=perf_counter() - start,
+            )
+        if unsure:
+            start = perf_counter()
+            for group in (UTTERANCE_FEATURES, SYNTAX_FEATURES):
+                Signals.extract_many(
+                    list(map(lambda index: signals[index], unsure)), group=group
+                )
+            for index, task_label in zip(
+                unsure,
+                self.predict_many(
+                    vstack(list(map(lambda index: signals[index].vector(), unsure)))
+                ),
+            ):
+                task_labels[index] = task_label
+            self.record_tier(
+                tier=FULL_TIER,
+                turns=len(unsure),
+                hits=len(unsure),
+                seconds=perf_counter() - start,
+            )
+        return task_labels
 
     @staticmethod
-    def get_encoded_train_data(
-        settings: Tasks,
-    ) -> Generator[Tuple[ndarray, ndarray], None, None]:
+    def confidence_margins(probabilities: ndarray) -> ndarray:
+        """
+        difference between the most and second most probable class
+        for each row (1 if there is only one class)
+        """
+        if probabilities.shape[1] < 2:
+            return ones(len(probabilities))
+        top_two = sort(probabilities, axis=1)[:, -2:]
+        return top_two[:, 1] - top_two[:, 0]
+
+    def record_tier(self, tier: str, turns: int, hits: int, seconds: float) -> None:
+        with self.tier_stats_lock:
+            self.tier_stats[tier]["turns"] += turns
+            self.tier_stats[tier]["hits"] += hits
+            self.tier_stats[tier]["seconds"] += seconds
+
+    def cascade_stats(self) -> Dict[str, Dict[str, float]]:
         """
-        input = signal vector
-        output = task label index
+        for each tier: the turns it saw,
+        the share of all turns it classified (hit_rate)
+        and its mean latency per turn it saw (in milliseconds)
+        """
+        with self.tier_stats_lock:
+            total_turns = max(
+                self.tier_stats[CHEAP_TIER]["turns"],
+                self.tier_stats[FULL_TIER]["turns"],
+            )
+            return {
+                tier: dict(
+                    turns=stats["turns"],
+                    hits=stats["hits"],
+                    hit_rate=stats["hits"] / total_turns if total_turns else 0.0,
+                    mean_latency_ms=(
+                        stats["seconds"] * 1000 / stats["turns"]
+                        if stats["turns"]
+                        else 0.0
+                    ),
+                )
+                for tier, stats in self.tier_stats.items()
+            }
+
+    def train(
+        self, model: ClassifierBackend, settings: Tasks, columns: Optional[slice]
+    ) -> None:
+        """
+        fits the model on the given columns of the encoded training examples
+        (the examples are only encoded once for all models)
+        """
+        if self.train_data is None:
+            self.train_data = self.encode_train_data(
+                settings=settings, workers=self.encoding_workers
+            )
+        x, y = self.train_data
+        model.fit(x if columns is None else x[:, columns], y)
+
+    @staticmethod
+    def encode_train_data(settings: Tasks, workers: int = 1) -> Tuple[ndarray, ndarray]:
+        """
+        input = matrix of signal vectors (one row per example)
+        output = task label indexes
+        the examples are split across a pool of worker processes
+        (each loading the signal encoders once)
         """
         task_labels = list(settings.Tasks)
-        for example_input, example_output in TaskClassifier.get_train_data(
-            tasks=settings.Tasks
-        ):
-            yield (
-                Signals(user_utterance=example_input, intent=None, topic=None).vector(),
-                task_labels.index(example_output),
+        example_inputs, example_outputs = zip(
+            *TaskClassifier.get_train_data(tasks=settings.Tasks)
+        )
+        y = array(list(map(task_labels.index, example_outputs)))
+        if workers <= 1:
+            return encode_utterances(example_inputs), y
+        chunk_size = ceil(len(example_inputs) / (workers * 4))
+        chunks = list(
+            map(
+                lambda start: example_inputs[start : start + chunk_size],
+                range(0, len(example_inputs), chunk_size),
             )
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("spawn"), initializer=preload
+        ) as executor:
+            return vstack(list(executor.map(encode_utterances, chunks))), y
 
     @staticmethod
     def get_train_data(tasks: Tasks) -> Generator[Tuple[str, str], None, None]:
@@ -0,0 +1,117 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ast import Call, Constant, Name, literal_eval, parse
+from string import Formatter
+
+from task_tracker.config import custom_actions
+
+
+class ActionArgument:
+    """
+    an argument of a Do call
+    either the value of a slot or a literal value
+    """
+
+    def __init__(self, slot_name: Optional[str] = None, literal: Any = None) -> None:
+        self.slot_name = slot_name
+        self.literal = literal
+
+    def __repr__(self) -> str:
+        return repr(self.literal) if self.slot_name is None else f"{{{self.slot_name}}}"
+
+    def resolve(self, slot_values: Dict[str, Any]) -> Any:
+        return self.literal if self.slot_name is None else slot_values[self.slot_name]
+
+
+class BoundAction:
+    """
+    a Do call parsed once
+    into the custom action it calls and where each argument comes from
+    e.g. `ExampleAction({location}, units='km')`
+    -> ExampleAction, [{location}], {'units': 'km'}
+    (slot values are passed to the custom action as they are)
+    """
+
+    def __init__(self, call: str) -> None:
+        self.call = call
+        self.name, self.arguments, self.keyword_arguments = BoundAction.parse_call(call)
+        self.function: Callable[..., Any] = getattr(custom_actions, self.name)
+
+    def __call__(self, slot_values: Dict[str, Any]) -> Any:
+        return self.function(
+            *map(lambda argument: argument.resolve(slot_values), self.arguments),
+            **{
+                keyword: argument.resolve(slot_values)
+                for keyword, argument in self.keyword_arguments.items()
+            },
+        )
+
+    @staticmethod
+    def parse_call(
+        call: str,
+    ) -> Tuple[str, List[ActionArgument], Dict[str, ActionArgument]]:
+        """
+        replaces each {slot} with a placeholder variable
+        and parses the call (without evaluating it)
+        arguments must be slots or literals (e.g. 'text', 3, None)
+        """
+        slot_names: List[str] = list()
+        source = ""
+        for literal, slot_name, _, _ in Formatter().parse(call):
+            source += literal
+            if slot_name is None:
+                continue
+            if slot_name not in slot_names:
+                slot_names.append(slot_name)
+            source += BoundAction.placeholder(slot_names.index(slot_name))
+        expression = parse(source.strip(), mode="eval").body
+        if not isinstance(expression, Call) or not isinstance(expression.func, Name):
+            raise ValueError(f"{call} is not a call to a custom action")
+        placeholders = {
+            BoundAction.placeholder(index): slot_name
+            for index, slot_name in enumerate(slot_names)
+        }
+        return (
+            expression.func.id,
+            list(
+                map(
+                    lambda node: BoundAction.parse_argument(node, placeholders),
+                    expression.args,
+                )
+            ),
+            {
+                keyword.arg: BoundAction.parse_argument(keyword.value, placeholders)
+                for keyword in expression.keywords
+            },
+        )
+
+    @staticmethod
+    def parse_argument(node: Any, placeholders: Dict[str, str]) -> ActionArgument:
+        """
+        a {slot} (also if quoted e.g. '{slot}') or a literal
+        """
+        if isinstance(node, Name) and node.id in placeholders:
+            return ActionArgument(slot_name=placeholders[node.id])
+        if isinstance(node, Constant) and node.value in placeholders:
+            return ActionArgument(slot_name=placeholders[node.value])
+        return ActionArgument(literal=literal_eval(node))
+
+    @staticmethod
+    def placeholder(index: int) -> str:
+        return f"__slot{index}__"
+
+
+class ActionBinder:
+    """
+    binds and caches Do calls
+    (keyed by the call string so each is only parsed once per process)
+    """
+
+    bound: Dict[str, BoundAction] = dict()
+
+    @staticmethod
+    def bind(call: str) -> BoundAction:
+        action = ActionBinder.bound.get(call)
+        if action is None:
+            action = BoundAction(call)
+            ActionBinder.bound[call] = action
+        return action
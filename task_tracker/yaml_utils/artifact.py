@@ -0,0 +1,98 @@
+from typing import Optional
+from hashlib import sha256
+from os import replace
+from os.path import exists
+from pickle import dump, load, HIGHEST_PROTOCOL, UnpicklingError
+from sys import argv
+from warnings import warn
+
+from task_tracker.yaml_utils import dataloader, records
+from task_tracker.yaml_utils.dataloader import YamlLoader, DEFAULT_PATH
+from task_tracker.yaml_utils.datatypes import Tasks
+from task_tracker.config import custom_actions
+
+
+class SettingsArtifact:
+    """
+    the validated settings saved as a compact binary artifact
+    stamped with a hash of the yaml file, the yaml defaults, the custom actions
+    and the code which validates the yaml and builds the settings records
+    (so validating the yaml is skipped at start up when none of them changed)
+    VERSION is bumped whenever the pickled shape of the settings changes
+    """
+
+    VERSION = 2
+
+    @staticmethod
+    def load(settings_path: str, artifact_path: Optional[str] = None) -> Tasks:
+        """
+        loads the settings from the artifact if it is up to date
+        otherwise validates the yaml file and (re)writes the artifact
+        """
+        artifact_path = SettingsArtifact.default_path(settings_path, artifact_path)
+        fingerprint = SettingsArtifact.fingerprint(settings_path)
+        if exists(artifact_path):
+            try:
+                with open(artifact_path, "rb") as artifact_file:
+                    artifact = load(artifact_file)
+                if artifact["fingerprint"] == fingerprint:
+                    return artifact["settings"]
+            except (
+                UnpicklingError,
+                EOFError,
+                KeyError,
+                TypeError,
+                AttributeError,
+                ImportError,
+            ):
+                pass  # written by another version (so compiled again)
+        return SettingsArtifact.compile(settings_path, artifact_path)
+
+    @staticmethod
+    def compile(settings_path: str, artifact_path: Optional[str] = None) -> Tasks:
+        """
+        validates the yaml file and writes the resulting settings to the artifact
+        (if the artifact cannot be written the settings are still returned)
+        """
+        artifact_path = SettingsArtifact.default_path(settings_path, artifact_path)
+        settings = YamlLoader.safe_load_tasks(settings_path)
+        artifact = dict(
+            fingerprint=SettingsArtifact.fingerprint(settings_path),
+            settings=settings,
+        )
+        try:
+            with open(f"{artifact_path}.tmp", "wb") as artifact_file:
+                dump(artifact, artifact_file, protocol=HIGHEST_PROTOCOL)
+            replace(f"{artifact_path}.tmp", artifact_path)
+        except OSError as error:
+            warn(f"settings artifact {artifact_path} not written ({error})")
+        return settings
+
+    @staticmethod
+    def fingerprint(settings_path: str) -> str:
+        """
+        hash of everything the validated settings depend on
+        """
+        fingerprint = sha256(str(SettingsArtifact.VERSION).encode())
+        for path in (
+            settings_path,
+            DEFAULT_PATH,
+            custom_actions.__file__,
+            dataloader.__file__,
+            records.__file__,
+        ):
+            with open(path, "rb") as datafile:
+                fingerprint.update(datafile.read())
+        return fingerprint.hexdigest()
+
+    @staticmethod
+    def default_path(settings_path: str, artifact_path: Optional[str]) -> str:
+        """
+        e.g. config/settings.yml -> config/settings.yml.compiled
+        """
+        return f"{settings_path}.compiled" if artifact_path is None else artifact_path
+
+
+if __name__ == "__main__":
+    for settings_path in argv[1:]:
+        SettingsArtifact.compile(settings_path)
@@ -3,6 +3,7 @@ from string import punctuation, Formatter
 from yaml import safe_load, YAMLError
 from warnings import warn
 from copy import deepcopy
+from os.path import dirname, join
 
 from task_tracker.yaml_utils.datatypes import YamlFields, Tasks, tasks
 from task_tracker.yaml_utils.messages import (
@@ -10,10 +11,22 @@ from task_tracker.yaml_utils.messages import (
     WarningMessages,
     DefaultMessages,
 )
+from task_tracker.yaml_utils.trigger_compiler import TriggerCompiler
+from task_tracker.yaml_utils.action_binder import ActionBinder
+from task_tracker.yaml_utils.records import records
+from task_tracker.yaml_utils.template_parser import TemplateParser
 from task_tracker.config import custom_actions
+from task_tracker.startup import LazyResource
 
-with open("task_tracker/yaml_utils/default.yml") as default_file:
-    DEFAULT = tasks(safe_load(default_file))
+DEFAULT_PATH = join(dirname(__file__), "default.yml")
+
+
+def load_defaults() -> Tasks:
+    with open(DEFAULT_PATH) as default_file:
+        return tasks(safe_load(default_file))
+
+
+DEFAULT = LazyResource(name="yaml defaults", load=load_defaults)
 
 
 class YamlLoader:
@@ -26,11 +39,12 @@ class YamlLoader:
         """
         loads in yaml file and
         ensures tasks are formatted correctly etc
+        (each task is loaded into a read-only record)
         """
         with open(path) as datafile:
             data = safe_load(datafile)
         YamlLoader.check_data(data)
-        return tasks(data)
+        return records(data)
 
     @staticmethod
     def check_data(data: YamlFields.STRUCTURE.value) -> None:
@@ -56,6 +70,8 @@ class YamlLoader:
                 )
             )
             data[YamlFields.SLOTS.value.THIS.value] = {}
+        YamlLoader.check_classifier_data(data)
+        YamlLoader.check_actions_data(data)
         YamlLoader.check_slots_data(slotdata=data[YamlFields.SLOTS.value.THIS.value])
         YamlLoader.add_slot_query_tasks(data)
         YamlLoader.check_task_data(
@@ -63,6 +79,167 @@ class YamlLoader:
             declared_slots=data[YamlFields.SLOTS.value.THIS.value].keys(),
         )
 
+    @staticmethod
+    def check_classifier_data(data: YamlFields.STRUCTURE.value) -> None:
+        """
+        ----
+        Classifier:
+            Backend: RandomForest, FlatForest, NearestCentroid or Linear
+            Cascade: null or a confidence margin between 0 and 1
+        ----
+        the Classifier field is optional
+        (no need for warning since this is not expected to be set by user)
+        """
+        if (
+            YamlFields.CLASSIFIER.value.THIS.value not in data
+            or data[YamlFields.CLASSIFIER.value.THIS.value] is None
+        ):
+            data[YamlFields.CLASSIFIER.value.THIS.value] = deepcopy(
+                DEFAULT.get().classifier
+            )
+            return
+        classifier_data = data[YamlFields.CLASSIFIER.value.THIS.value]
+        if not isinstance(classifier_data, dict):
+            raise YAMLError(
+                ErrorMessages.UNEXPECTED_DATA_STRUCTURE.value.format(
+                    task_name=YamlFields.CLASSIFIER.value.THIS.value,
+                    field_name="",
+                    field_type="",
+                    expected_data_structure=dict,
+                    unexpected_data_structure=type(classifier_data),
+                )
+            )
+        YamlLoader.check_task_has_no_invalid_fields(
+            task_name=YamlFields.CLASSIFIER.value.THIS.value,
+            data=classifier_data,
+            valid_field_names=(
+                YamlFields.CLASSIFIER.value.BACKEND.value,
+                YamlFields.CLASSIFIER.value.CASCADE.value,
+            ),
+            field_name="",
+        )
+        if classifier_data.get(YamlFields.CLASSIFIER.value.BACKEND.value) is None:
+            classifier_data[YamlFields.CLASSIFIER.value.BACKEND.value] = deepcopy(
+                DEFAULT.get().classifier.Backend
+            )
+        valid_backends = (
+            YamlFields.CLASSIFIER.value.RANDOM_FOREST.value,
+            YamlFields.CLASSIFIER.value.FLAT_FOREST.value,
+            YamlFields.CLASSIFIER.value.NEAREST_CENTROID.value,
+            YamlFields.CLASSIFIER.value.LINEAR.value,
+        )
+        backend = classifier_data[YamlFields.CLASSIFIER.value.BACKEND.value]
+        if backend not in valid_backends:
+            raise YAMLError(
+                ErrorMessages.UNRECOGNISED_VALUE.value.format(
+                    task_name=YamlFields.CLASSIFIER.value.THIS.value,
+                    field_name="",
+                    field_type=YamlFields.CLASSIFIER.value.BACKEND.value,
+                    recognised_values=valid_backends,
+                    unrecognised_value=backend,
+                )
+            )
+        cascade = classifier_data.setdefault(
+            YamlFields.CLASSIFIER.value.CASCADE.value,
+            deepcopy(DEFAULT.get().classifier.Cascade),
+        )
+        if cascade is not None and (
+            isinstance(cascade, bool)
+            or not isinstance(cascade, (int, float))
+            or not 0 <= cascade <= 1
+        ):
+            raise YAMLError(
+                ErrorMessages.UNRECOGNISED_VALUE.value.format(
+                    task_name=YamlFields.CLASSIFIER.value.THIS.value,
+                    field_name="",
+                    field_type=YamlFields.CLASSIFIER.value.CASCADE.value,
+                    recognised_values="null or a number between 0 and 1",
+                    unrecognised_value=cascade,
+                )
+            )
+
+    @staticmethod
+    def check_actions_data(data: YamlFields.STRUCTURE.value) -> None:
+        """
+        ----
+        Actions:
+            CustomAction:
+                TTL: seconds its results can be reused for
+                MaxEntries: Optional[int]
+        ----
+        the Actions field is optional
+        (only actions whose results should be cached are listed
+        so each needs a TTL)
+        """
+        if (
+            YamlFields.ACTIONS.value.THIS.value not in data
+            or data[YamlFields.ACTIONS.value.THIS.value] is None
+        ):
+            data[YamlFields.ACTIONS.value.THIS.value] = {}
+        actions_data = data[YamlFields.ACTIONS.value.THIS.value]
+        if not isinstance(actions_data, dict):
+            raise YAMLError(
+                ErrorMessages.UNEXPECTED_DATA_STRUCTURE.value.format(
+                    task_name=YamlFields.ACTIONS.value.THIS.value,
+                    field_name="",
+                    field_type="",
+                    expected_data_structure=dict,
+                    unexpected_data_structure=type(actions_data),
+                )
+            )
+        for action_name, cache_policy in actions_data.items():
+            YamlLoader.check_action_exists(
+                task_name=YamlFields.ACTIONS.value.THIS.value, action_name=action_name
+            )
+            if not isinstance(cache_policy, dict):
+                raise YAMLError(
+                    ErrorMessages.UNEXPECTED_DATA_STRUCTURE.value.format(
+                        task_name=YamlFields.ACTIONS.value.THIS.value,
+                        field_name=action_name,
+                        field_type="",
+                        expected_data_structure=dict,
+                        unexpected_data_structure=type(cache_policy),
+                    )
+                )
+            YamlLoader.check_task_has_no_invalid_fields(
+                task_name=YamlFields.ACTIONS.value.THIS.value,
+                data=cache_policy,
+                valid_field_names=(
+                    YamlFields.ACTIONS.value.TTL.value,
+                    YamlFields.ACTIONS.value.MAX_ENTRIES.value,
+                ),
+                field_name=action_name,
+            )
+            if YamlFields.ACTIONS.value.TTL.value not in cache_policy:
+                raise YAMLError(
+                    ErrorMessages.MISSING_FIELD.value.format(
+                        task_name=YamlFields.ACTIONS.value.THIS.value,
+                        field_name=action_name,
+                        required_field_name=YamlFields.ACTIONS.value.TTL.value,
+                    )
+                )
+            for field_name, minimum in (
+                (YamlFields.ACTIONS.value.TTL.value, 0),
+                (YamlFields.ACTIONS.value.MAX_ENTRIES.value, 1),
+            ):
+                value = cache_policy.setdefault(
+                    field_name, deepcopy(DEFAULT.get().action_cache.get(field_name))
+                )
+                if (
+                    isinstance(value, bool)
+                    or not isinstance(value, (int, float))
+                    or value < minimum
+                ):
+                    raise YAMLError(
+                        ErrorMessages.UNRECOGNISED_VALUE.value.format(
+                            task_name=YamlFields.ACTIONS.value.THIS.value,
+                            field_name=action_name,
+                            field_type=field_name,
+                            recognised_values=f"a number of at least {minimum}",
+                            unrecognised_value=value,
+                        )
+                    )
+
     @staticmethod
     def check_slots_data(slotdata: YamlFields.TASKS.value.STRUCTURE.value) -> None:
         """
@@ -154,7 +331,7 @@ class YamlLoader:
         for task_name in taskdata:
             YamlLoader.check_task_name(task_name=task_name)
             if taskdata[task_name] is None:
-                taskdata[task_name] = deepcopy(DEFAULT.task)
+                taskdata[task_name] = deepcopy(DEFAULT.get().task)
             YamlLoader.check_task_fields(
                 task_name=task_name,
                 task_data=taskdata[task_name],
@@ -209,7 +386,7 @@ class YamlLoader:
             or task_data[YamlFields.TASKS.value.TRIGGER.value.THIS.value] is None
         ):
             task_data[YamlFields.TASKS.value.TRIGGER.value.THIS.value] = deepcopy(
-                DEFAULT.task.TriggeredBy
+                DEFAULT.get().task.TriggeredBy
             )
             return
 
@@ -230,26 +407,18 @@ class YamlLoader:
             text_with_slots=trigger,
             remembered_slots=task_data[YamlFields.TASKS.value.MEMORY.value.THIS.value],
         )
-        YamlLoader.check_trigger_condition_evaluates(
-            trigger=trigger,
-            slot_names=declared_slots,
-        )
+        YamlLoader.check_trigger_condition_evaluates(trigger=trigger)
 
     @staticmethod
-    def check_trigger_condition_evaluates(trigger: str, slot_names: List[str]) -> None:
+    def check_trigger_condition_evaluates(trigger: str) -> None:
         """
-        ensure the condition evaluates as a valid boolean expression
-        (we insert fake values for each slot used in the expression - e.g. True)
+        ensure the condition compiles and evaluates as a valid boolean expression
+        (we insert fake values for each slot used in the expression - e.g. 'some_value')
+        the compiled condition is cached for the TaskPolicy to reuse every turn
         """
-        trigger = trigger.replace(
-            YamlFields.TASKS.value.TRIGGER.value.TASKCLASSIFIER.value, "True"
-        )
-        fake_slot_values = dict(
-            map(lambda slot_name: (slot_name, "'some_value'"), slot_names)
-        )
-        trigger_with_fake_values = trigger.format(**fake_slot_values)
         try:
-            eval(trigger_with_fake_values)
+            compiled_trigger = TriggerCompiler.compile(trigger)
+            compiled_trigger(*map(lambda _: "some_value", compiled_trigger.slot_names))
         except:
             raise YAMLError(
                 ErrorMessages.INVALID_TRIGGER_CONDITION.value.format(
@@ -265,7 +434,7 @@ class YamlLoader:
         A task is impossible if it has no actions to say or do
         """
         task_data[YamlFields.TASKS.value.FLAG.value.COMPLETE.value] = deepcopy(
-            DEFAULT.task.Complete
+            DEFAULT.get().task.Complete
         )
         action_data = task_data[YamlFields.TASKS.value.ACTION.value.THIS.value]
         task_data[YamlFields.TASKS.value.FLAG.value.POSSIBLE.value] = any(
@@ -292,7 +461,7 @@ class YamlLoader:
                 )
             )
             task_data[YamlFields.TASKS.value.MEMORY.value.THIS.value] = deepcopy(
-                DEFAULT.task.Memory
+                DEFAULT.get().task.Memory
             )
 
         YamlLoader.check_task_memory_subfields(
@@ -321,7 +490,7 @@ class YamlLoader:
                 )
             )
             task_data[YamlFields.TASKS.value.ACTION.value.THIS.value] = deepcopy(
-                DEFAULT.task.Action
+                DEFAULT.get().task.Action
             )
 
         YamlLoader.check_task_action_subfields(
@@ -443,6 +612,14 @@ class YamlLoader:
                     task_name=task_name,
                     text=say_or_do,
                 )
+                if required_subfield == YamlFields.TASKS.value.ACTION.value.SAY.value:
+                    YamlLoader.check_template_parses(
+                        task_name=task_name, response_template=say_or_do
+                    )
+                if required_subfield == YamlFields.TASKS.value.ACTION.value.DO.value:
+                    YamlLoader.check_action_call_binds(
+                        task_name=task_name, action_call=say_or_do
+                    )
 
     @staticmethod
     def check_actions_are_valid(task_name: str, text: str) -> None:
@@ -462,17 +639,49 @@ class YamlLoader:
     @staticmethod
     def check_action_exists(task_name: str, action_name: str) -> None:
         """
-        checks if action is listed in custom actions
+        checks if action is defined in custom actions
+        (names imported into it - e.g. cache_action - are not actions)
         """
-        try:
-            eval(f"custom_actions.{action_name}")
-        except:
+        action = getattr(custom_actions, action_name.strip(), None)
+        if not callable(action) or (
+            getattr(action, "__module__", None) != custom_actions.__name__
+        ):
             raise YAMLError(
                 ErrorMessages.UNDEFINED_ACTION.value.format(
                     task_name=task_name, action_name=action_name
                 )
             )
 
+    @staticmethod
+    def check_action_call_binds(task_name: str, action_call: str) -> None:
+        """
+        parses (and caches) the Do call
+        so it is not parsed again when the task is completed
+        """
+        try:
+            ActionBinder.bind(action_call)
+        except (SyntaxError, ValueError):
+            raise YAMLError(
+                ErrorMessages.INVALID_ACTION_CALL.value.format(
+                    task_name=task_name, action_call=action_call
+                )
+            )
+
+    @staticmethod
+    def check_template_parses(task_name: str, response_template: str) -> None:
+        """
+        parses (and caches) the Say template
+        so it is not parsed again when the task is completed
+        """
+        try:
+            TemplateParser.parse(response_template)
+        except ValueError:
+            raise YAMLError(
+                ErrorMessages.INVALID_TEMPLATE.value.format(
+                    task_name=task_name, response_template=response_template
+                )
+            )
+
     @staticmethod
     def extract_all_action_references(text: str) -> Generator[str, None, None]:
         """
@@ -544,7 +753,7 @@ class YamlLoader:
                         required_field_type=YamlFields.TASKS.value.MEMORY.value.SLOT.value.THIS.value,
                     )
                 )
-                memory_data[slot] = deepcopy(DEFAULT.slot_settings)
+                memory_data[slot] = deepcopy(DEFAULT.get().slot_settings)
 
             if not isinstance(memory_data[slot], dict):
                 raise YAMLError(
@@ -579,7 +788,7 @@ class YamlLoader:
                 )
                 memory_data[slot][
                     YamlFields.TASKS.value.MEMORY.value.SLOT.value.DEFAULT.value
-                ] = deepcopy(DEFAULT.slot_settings.Default)
+                ] = deepcopy(DEFAULT.get().slot_settings.Default)
             slot_default = memory_data[slot][
                 YamlFields.TASKS.value.MEMORY.value.SLOT.value.DEFAULT.value
             ]
@@ -607,7 +816,7 @@ class YamlLoader:
                 )
                 memory_data[slot][
                     YamlFields.TASKS.value.MEMORY.value.SLOT.value.PROMPT.value
-                ] = deepcopy(DEFAULT.slot_settings.Prompt)
+                ] = deepcopy(DEFAULT.get().slot_settings.Prompt)
             slot_prompt = memory_data[slot][
                 YamlFields.TASKS.value.MEMORY.value.SLOT.value.PROMPT.value
             ]
@@ -639,7 +848,7 @@ class YamlLoader:
                 )
                 memory_data[slot][
                     YamlFields.TASKS.value.MEMORY.value.SLOT.value.SCOPE.value.THIS.value
-                ] = deepcopy(DEFAULT.slot_settings.Scope)
+                ] = deepcopy(DEFAULT.get().slot_settings.Scope)
             slot_scope = memory_data[slot][
                 YamlFields.TASKS.value.MEMORY.value.SLOT.value.SCOPE.value.THIS.value
             ]
@@ -751,7 +960,7 @@ class YamlLoader:
                     type_name=YamlFields.TASKS.value.MEMORY.value.SLOT.value.SCOPE.value.LOCAL.value,
                 )
             )
-            remembered_slots[slot] = deepcopy(DEFAULT.slot_settings)
+            remembered_slots[slot] = deepcopy(DEFAULT.get().slot_settings)
 
     @staticmethod
     def add_slot_query_tasks(data: YamlFields.STRUCTURE.value) -> None:
@@ -63,10 +63,38 @@ class SlotFields(Enum):
     THIS = "Slots"
 
 
+class ClassifierFields(Enum):
+    STRUCTURE = Dict[str, Union[str, float, None]]
+    THIS = "Classifier"
+    BACKEND = "Backend"
+    CASCADE = "Cascade"
+    RANDOM_FOREST = "RandomForest"
+    FLAT_FOREST = "FlatForest"
+    NEAREST_CENTROID = "NearestCentroid"
+    LINEAR = "Linear"
+
+
+class ActionCacheFields(Enum):
+    STRUCTURE = Dict[str, Dict[str, Optional[float]]]
+    THIS = "Actions"
+    TTL = "TTL"
+    MAX_ENTRIES = "MaxEntries"
+
+
 class YamlFields(Enum):
-    STRUCTURE = Dict[str, Union[TaskFields.STRUCTURE.value, SlotFields.STRUCTURE.value]]
+    STRUCTURE = Dict[
+        str,
+        Union[
+            TaskFields.STRUCTURE.value,
+            SlotFields.STRUCTURE.value,
+            ClassifierFields.STRUCTURE.value,
+            ActionCacheFields.STRUCTURE.value,
+        ],
+    ]
     TASKS = TaskFields
     SLOTS = SlotFields
+    CLASSIFIER = ClassifierFields
+    ACTIONS = ActionCacheFields
 
 
 class Tasks(dict):
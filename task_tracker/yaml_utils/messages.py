@@ -8,6 +8,7 @@ class DefaultMessages(Enum):
         "I know you want me to {task_name} but I can't right now",
     ]
     QUERY_SLOT_PROMPT = "I don't know the {slot_name}"
+    ACTION_TIMEOUT = "Sorry, I couldn't {task_name} in time"
 
 
 class WarningMessages(Enum):
@@ -27,5 +28,10 @@ class ErrorMessages(Enum):
         "remove invalid character {invalid_character} from {text}"
     )
     UNEXPECTED_DATA_STRUCTURE = "{task_name}: {field_name}: {field_type}:... should have a {expected_data_structure}, but a {unexpected_data_structure} was found"
+    MISSING_FIELD = (
+        "{task_name}: {field_name}: should have a {required_field_name}: field"
+    )
     UNRECOGNISED_VALUE = "{task_name}: {field_name}: {field_type}:... should have a value from {recognised_values}, but {unrecognised_value} was found"
     UNDEFINED_ACTION = "{task_name} references an undefined action: {action_name}.  Please add this to config/custom_actions.py"
+    INVALID_TEMPLATE = "{task_name} says '{response_template}' which is not a valid template. Make sure every {{ is matched by a }} (use {{{{ and }}}} for literal braces)"
+    INVALID_ACTION_CALL = "{task_name} calls {action_call} which is not a valid action call. Arguments should be {{slots}} or literal values (e.g. 'text', 3, None)"
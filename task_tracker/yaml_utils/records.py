@@ -0,0 +1,132 @@
+from typing import Any, Dict, Iterator, List, Tuple
+from collections.abc import Mapping
+
+from task_tracker.yaml_utils.datatypes import Tasks, YamlFields
+
+
+class Record(Mapping):
+    """
+    a frozen node of the validated settings
+    whose fields are stored in __slots__ (rather than a dict)
+    attribute access works as it does for Tasks
+    and it is also a read-only mapping (field name -> value)
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values: Any, **named_values: Any) -> None:
+        for field_name, value in zip(self.__slots__, values):
+            object.__setattr__(self, field_name, value)
+        for field_name in self.__slots__[len(values) :]:
+            object.__setattr__(self, field_name, named_values[field_name])
+
+    def __setattr__(self, field_name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} settings are read-only")
+
+    def __delattr__(self, field_name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} settings are read-only")
+
+    def __reduce__(self) -> Tuple[type, Tuple[Any, ...]]:
+        return type(self), tuple(self.values())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.as_dict()})"
+
+    def __getitem__(self, field_name: str) -> Any:
+        if field_name not in self.__slots__:
+            raise KeyError(field_name)
+        return getattr(self, field_name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        the record as a (plain) dict tree
+        """
+        return {
+            field_name: Record.to_dict(getattr(self, field_name))
+            for field_name in self.__slots__
+        }
+
+    @staticmethod
+    def to_dict(value: Any) -> Any:
+        if isinstance(value, Record):
+            return value.as_dict()
+        if isinstance(value, dict):
+            return {key: Record.to_dict(item) for key, item in value.items()}
+        return value
+
+
+class SlotSetting(Record):
+    __slots__ = ("Scope", "Default", "Prompt")
+
+
+class Action(Record):
+    __slots__ = ("Say", "Do")
+
+
+class Task(Record):
+    __slots__ = ("Action", "Memory", "TriggeredBy", "Complete", "Possible")
+
+
+class CacheSetting(Record):
+    __slots__ = ("TTL", "MaxEntries")
+
+
+def records(data: dict) -> Tasks:
+    """
+    the validated settings with each task
+    (and its action and slot settings)
+    and each custom action's cache settings as a record
+    """
+    actions_field = YamlFields.ACTIONS.value.THIS.value
+    tasks_field = YamlFields.TASKS.value.THIS.value
+    settings = Tasks(
+        {
+            field_name: Tasks(value) if isinstance(value, dict) else value
+            for field_name, value in data.items()
+            if field_name not in (actions_field, tasks_field)
+        }
+    )
+    settings[actions_field] = Tasks(
+        {
+            action_name: CacheSetting(**cache_data)
+            for action_name, cache_data in data[actions_field].items()
+        }
+    )
+    settings[tasks_field] = Tasks(
+        {
+            task_name: task_record(task_data)
+            for task_name, task_data in data[tasks_field].items()
+        }
+    )
+    return settings
+
+
+def task_record(task_data: dict) -> Task:
+    action_data = task_data[YamlFields.TASKS.value.ACTION.value.THIS.value]
+    return Task(
+        Action=Action(
+            Say=tuple_of(action_data[YamlFields.TASKS.value.ACTION.value.SAY.value]),
+            Do=tuple_of(action_data[YamlFields.TASKS.value.ACTION.value.DO.value]),
+        ),
+        Memory=Tasks(
+            {
+                slot_name: SlotSetting(**slot_data)
+                for slot_name, slot_data in task_data[
+                    YamlFields.TASKS.value.MEMORY.value.THIS.value
+                ].items()
+            }
+        ),
+        TriggeredBy=task_data[YamlFields.TASKS.value.TRIGGER.value.THIS.value],
+        Complete=task_data[YamlFields.TASKS.value.FLAG.value.COMPLETE.value],
+        Possible=task_data[YamlFields.TASKS.value.FLAG.value.POSSIBLE.value],
+    )
+
+
+def tuple_of(values: List[str]) -> Tuple[str, ...]:
+    return tuple(values)
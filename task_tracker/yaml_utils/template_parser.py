@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional, Tuple
+from re import compile as compile_pattern
+from string import Formatter
+
+ACTION_REFERENCE = compile_pattern(r"__\w+?__")
+
+LITERAL = "literal"
+SLOT = "slot"
+ACTION = "action"
+
+Segment = Tuple[str, str, Optional[str], str]  # kind, text, conversion, format spec
+
+
+class ParsedTemplate:
+    """
+    a Say template parsed once into a list of segments
+    (literal text, {slot} references and __action__ references)
+    e.g. `It is __TimeNow__ in {location}`
+    -> [literal 'It is ', action '__TimeNow__', literal ' in ', slot 'location']
+    """
+
+    formatter = Formatter()
+
+    def __init__(self, template: str) -> None:
+        self.template = template
+        self.segments = ParsedTemplate.parse_segments(template)
+        self.slot_names = list(
+            dict.fromkeys(text for kind, text, _, _ in self.segments if kind == SLOT)
+        )
+        self.action_names = list(
+            dict.fromkeys(text for kind, text, _, _ in self.segments if kind == ACTION)
+        )
+
+    def render(
+        self, slot_values: Dict[str, Any], action_results: Dict[str, Any]
+    ) -> str:
+        """
+        joins the segments
+        filling in the slots and actions used in the template
+        (action references without a result are left as they are)
+        """
+        return "".join(
+            map(
+                lambda segment: ParsedTemplate.render_segment(
+                    segment, slot_values, action_results
+                ),
+                self.segments,
+            )
+        )
+
+    @staticmethod
+    def render_segment(
+        segment: Segment, slot_values: Dict[str, Any], action_results: Dict[str, Any]
+    ) -> str:
+        kind, text, conversion, format_spec = segment
+        if kind == LITERAL:
+            return text
+        if kind == ACTION:
+            return str(action_results.get(text, text))
+        value = slot_values[text]
+        if conversion is None and not format_spec:
+            return str(value)
+        return ParsedTemplate.formatter.format_field(
+            ParsedTemplate.formatter.convert_field(value, conversion), format_spec
+        )
+
+    @staticmethod
+    def parse_segments(template: str) -> List[Segment]:
+        """
+        splits the template into slot references (as str.format would)
+        and the literal text in between into action references
+        """
+        segments: List[Segment] = list()
+        for literal, slot_name, format_spec, conversion in Formatter().parse(template):
+            segments.extend(ParsedTemplate.parse_literal(literal))
+            if slot_name is not None:
+                segments.append((SLOT, slot_name, conversion, format_spec or ""))
+        return segments
+
+    @staticmethod
+    def parse_literal(literal: str) -> List[Segment]:
+        segments: List[Segment] = list()
+        start = 0
+        for action_reference in ACTION_REFERENCE.finditer(literal):
+            if action_reference.start() > start:
+                segments.append(
+                    (LITERAL, literal[start : action_reference.start()], None, "")
+                )
+            segments.append((ACTION, action_reference.group(), None, ""))
+            start = action_reference.end()
+        if start < len(literal):
+            segments.append((LITERAL, literal[start:], None, ""))
+        return segments
+
+
+class TemplateParser:
+    """
+    parses and caches Say templates
+    (keyed by the template so each is only parsed once per process)
+    """
+
+    parsed: Dict[str, ParsedTemplate] = dict()
+
+    @staticmethod
+    def parse(template: str) -> ParsedTemplate:
+        parsed_template = TemplateParser.parsed.get(template)
+        if parsed_template is None:
+            parsed_template = ParsedTemplate(template)
+            TemplateParser.parsed[template] = parsed_template
+        return parsed_template
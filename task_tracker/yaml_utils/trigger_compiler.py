@@ -0,0 +1,68 @@
+from typing import Any, Callable, Dict, List, Tuple
+from string import Formatter
+
+from task_tracker.yaml_utils.datatypes import YamlFields
+
+
+class CompiledTrigger:
+    """
+    a TriggeredBy condition compiled once
+    into a function taking the slot values as arguments
+    e.g. `({intent}=='Greet' and {name}!='Bob')`
+    -> lambda intent, name: (intent=='Greet' and name!='Bob')
+    """
+
+    def __init__(self, condition: str) -> None:
+        self.condition = condition
+        self.slot_names, source = CompiledTrigger.rewrite_condition(condition)
+        self.evaluate: Callable[..., Any] = eval(
+            compile(source, f"<TriggeredBy: {condition}>", "eval"), {}
+        )
+
+    def __call__(self, *slot_values: Any) -> bool:
+        return bool(self.evaluate(*slot_values))
+
+    @staticmethod
+    def rewrite_condition(condition: str) -> Tuple[Tuple[str, ...], str]:
+        """
+        replaces each {slot} with a variable name
+        and wraps the condition as a lambda over those variables
+        (slot names are not guaranteed to be valid python identifiers)
+        """
+        condition = condition.replace(
+            YamlFields.TASKS.value.TRIGGER.value.TASKCLASSIFIER.value, "True"
+        )
+        slot_names: List[str] = list()
+        expression = ""
+        for literal, slot_name, _, _ in Formatter().parse(condition):
+            expression += literal
+            if slot_name is None:
+                continue
+            if slot_name not in slot_names:
+                slot_names.append(slot_name)
+            expression += CompiledTrigger.variable_name(slot_names.index(slot_name))
+        arguments = ", ".join(
+            map(CompiledTrigger.variable_name, range(len(slot_names)))
+        )
+        return tuple(slot_names), f"lambda {arguments}: ({expression})"
+
+    @staticmethod
+    def variable_name(index: int) -> str:
+        return f"__slot{index}__"
+
+
+class TriggerCompiler:
+    """
+    compiles and caches TriggeredBy conditions
+    (keyed by the condition string so each is only compiled once per process)
+    """
+
+    compiled: Dict[str, CompiledTrigger] = dict()
+
+    @staticmethod
+    def compile(condition: str) -> CompiledTrigger:
+        trigger = TriggerCompiler.compiled.get(condition)
+        if trigger is None:
+            trigger = CompiledTrigger(condition)
+            TriggerCompiler.compiled[condition] = trigger
+        return trigger
@@ -19,4 +19,4 @@ while True:
         tasks=stack,
     )
     print(stack)
-    print(dumps(stack.open, indent=2))
+    print(dumps(stack.open, indent=2, default=lambda task: task.as_dict()))
@@ -1,11 +1,15 @@
 from unittest import TestCase, main
-from numpy import ndarray
+from pickle import dumps, loads
+from numpy import ndarray, float32
 
 from task_tracker.yaml_utils.dataloader import YamlLoader
 from tests.utils import temporary_configuration, configuration_path
 from task_tracker.datastructures.stack import Stack
+from task_tracker.datastructures.task_state import TaskState
 from task_tracker.datastructures.slots import Slots
-from task_tracker.datastructures.signals import Signals
+from task_tracker.datastructures.signals import Signals, WordEmbeddings
+from task_tracker.datastructures.lru_cache import LRUCache
+from task_tracker.datastructures.codec import StackCodec, SlotsCodec
 
 
 @temporary_configuration(
@@ -70,7 +74,7 @@ class TestStack(TestCase):
             self.assertFalse(mock_stack.open["IncompleteTask"].Complete)
 
     def test_push(self):
-        mock_task = mock_settings.Tasks.IncompleteTask
+        mock_task = TaskState(mock_settings.Tasks.IncompleteTask)
         mock_task.Memory.name.Default = "Bob"
         mock_task.Memory.event.Default = "birthday"
         mock_stack.push(task_label="IncompleteTask", task_data=mock_task)
@@ -95,6 +99,24 @@ class TestStack(TestCase):
                 mock_stack.open["IncompleteTask"].Memory.everMissingSlot.Default
             )
 
+    def test_remember(self):
+        mock_session = Stack()
+        mock_session.push(
+            task_label="IncompleteTask", task_data=mock_settings.Tasks.IncompleteTask
+        )
+        mock_session.remember(slot_name="everMissingSlot", slot_value="found")
+        with self.subTest("slot value set in open task"):
+            self.assertEqual(
+                mock_session.open["IncompleteTask"].Memory.everMissingSlot.Default,
+                "found",
+            )
+        with self.subTest("slot value not set in shared settings"):
+            self.assertIsNone(
+                mock_settings.Tasks.IncompleteTask.Memory.everMissingSlot.Default
+            )
+        with self.subTest("slot value not shared with other conversations"):
+            self.assertNotIn("everMissingSlot", mock_stack.memory)
+
     def test_pop(self):
         mock_stack.open["Foo"] = mock_settings.Tasks.CompleteTask
         mock_stack.pop()
@@ -103,17 +125,67 @@ class TestStack(TestCase):
     def test_open_tasks(self):
         self.assertEqual(list(mock_stack.open), mock_stack.open_tasks())
 
-    def test_slots_filled(self):
-        with self.subTest("task with no missing slots"):
-            result = mock_stack.slots_filled(
-                task_memory=mock_settings.Tasks.CompleteTask.Memory
+    def test_completeness_tracked_per_slot(self):
+        mock_session = Stack()
+        mock_session.push_tasks_to_stack(
+            triggered={},
+            predicted={"IncompleteTask": mock_settings.Tasks.IncompleteTask},
+        )
+        with self.subTest("missing slots indexed"):
+            self.assertIn(
+                "everMissingSlot", mock_session.open.unfilled["IncompleteTask"]
             )
-            self.assertTrue(result)
-        with self.subTest("task with missing slots"):
-            result = mock_stack.slots_filled(
-                task_memory=mock_settings.Tasks.IncompleteTask.Memory
+            self.assertFalse(mock_session.open["IncompleteTask"].Complete)
+        mock_session.remember(slot_name="name", slot_value="Bob")
+        mock_session.remember(slot_name="everMissingSlot", slot_value="found")
+        with self.subTest("only changed tasks rechecked"):
+            self.assertEqual(list(mock_session.open.changed), ["IncompleteTask"])
+        mock_session.push_tasks_to_stack(triggered={}, predicted={})
+        with self.subTest("task complete once its missing slots are filled"):
+            self.assertTrue(mock_session.open["IncompleteTask"].Complete)
+            self.assertIn("IncompleteTask", mock_session.open.finished_tasks())
+        mock_session.pop()
+        with self.subTest("finished tasks popped"):
+            self.assertEqual(mock_session.open, {})
+            self.assertEqual(mock_session.open.owners, {})
+
+    def test_missing_slots(self):
+        mock_session = Stack()
+        mock_session.push_tasks_to_stack(
+            triggered={},
+            predicted={
+                "CompleteTask": mock_settings.Tasks.CompleteTask,
+                "IncompleteTask": mock_settings.Tasks.IncompleteTask,
+            },
+        )
+        with self.subTest("only the missing slots of incomplete tasks listed"):
+            self.assertEqual(
+                sorted(mock_session.open.missing_slots()),
+                [("IncompleteTask", "everMissingSlot"), ("IncompleteTask", "name")],
             )
-            self.assertFalse(result)
+
+
+class TestTaskRecords(TestCase):
+    def test_attribute_access(self):
+        mock_task = mock_settings.Tasks.IncompleteTask
+        with self.subTest("task fields"):
+            self.assertTrue(mock_task.Possible)
+            self.assertEqual(mock_task.Memory.location.Default, "London")
+        with self.subTest("dict view"):
+            self.assertEqual(mock_task["Memory"]["event"]["Default"], "party")
+            self.assertIn("Action", dict(mock_task))
+
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            mock_settings.Tasks.IncompleteTask.Complete = False
+        with self.assertRaises(AttributeError):
+            mock_settings.Tasks.IncompleteTask.Memory.name.Default = "Bob"
+
+    def test_pickle(self):
+        mock_task = loads(dumps(mock_settings.Tasks.IncompleteTask))
+        self.assertEqual(
+            mock_task.as_dict(), mock_settings.Tasks.IncompleteTask.as_dict()
+        )
 
 
 class TestSlots(TestCase):
@@ -127,6 +199,46 @@ class TestSlots(TestCase):
             self.assertEqual(mock_slots.time, "3pm")
 
 
+class TestCodec(TestCase):
+    def test_encode_stack(self):
+        mock_session = Stack()
+        mock_session.push_tasks_to_stack(
+            triggered={},
+            predicted={"IncompleteTask": mock_settings.Tasks.IncompleteTask},
+        )
+        mock_session.system_prompt = "what is your name?"
+        encoded = StackCodec.encode(mock_session)
+        decoded = StackCodec.decode(encoded, tasks=mock_settings.Tasks)
+        with self.subTest("stack restored"):
+            self.assertEqual(
+                StackCodec.snapshot(decoded), StackCodec.snapshot(mock_session)
+            )
+            self.assertIn("name", decoded.open.unfilled["IncompleteTask"])
+        with self.subTest("task settings not encoded"):
+            self.assertNotIn(b"London", encoded)
+        previous = StackCodec.snapshot(mock_session)
+        mock_session.remember(slot_name="name", slot_value="Bob")
+        delta = StackCodec.encode_delta(previous, mock_session)
+        with self.subTest("delta restores the stack"):
+            self.assertEqual(
+                StackCodec.decode_snapshot(delta, previous=previous),
+                StackCodec.snapshot(mock_session),
+            )
+        with self.subTest("delta smaller than the whole stack"):
+            self.assertLess(len(delta), len(StackCodec.encode(mock_session)))
+        mock_session.remember(slot_name="sentiment", slot_value=float32(0.25))
+        with self.subTest("numpy scalars encoded as python values"):
+            decoded = StackCodec.decode(
+                StackCodec.encode(mock_session), tasks=mock_settings.Tasks
+            )
+            self.assertEqual(decoded.memory["sentiment"], 0.25)
+            self.assertIs(type(decoded.memory["sentiment"]), float)
+
+    def test_encode_slots(self):
+        mock_slots = SlotsCodec.decode(SlotsCodec.encode(Slots(name="Bob", time=3)))
+        self.assertEqual(vars(mock_slots), vars(Slots(name="Bob", time=3)))
+
+
 class TestSignals(TestCase):
     def test_init(self):
         with self.subTest("user utterance init"):
@@ -153,6 +265,115 @@ class TestSignals(TestCase):
                 len(mock_signals._semantics) + len(mock_signals._syntax) + 2,
             )
 
+    def test_feature_cache(self):
+        mock_cache = LRUCache(max_entries=10)
+        first_signals = Signals(
+            user_utterance="hi  there",
+            intent=None,
+            topic=None,
+            feature_cache=mock_cache,
+        )
+        with self.subTest("features only extracted when used"):
+            self.assertEqual(len(mock_cache), 0)
+        first_signals._syntax
+        cached_signals = Signals(
+            user_utterance=" hi there",
+            intent=None,
+            topic=None,
+            feature_cache=mock_cache,
+        )
+        with self.subTest("features cached by group and normalised utterance"):
+            self.assertIn(("syntax", "hi there"), mock_cache)
+            self.assertNotIn(("utterance", "hi there"), mock_cache)
+        with self.subTest("cached features are used"):
+            self.assertIs(cached_signals._syntax, first_signals._syntax)
+            self.assertEqual(mock_cache.stats()["hits"], 1)
+            self.assertEqual(mock_cache.stats()["misses"], 1)
+
+    def test_extract_many(self):
+        mock_cache = LRUCache(max_entries=10)
+        many_signals = [
+            Signals(
+                user_utterance=user_utterance,
+                intent=None,
+                topic=None,
+                feature_cache=mock_cache,
+            )
+            for user_utterance in ("hi there", "tell me a joke", "hi there")
+        ]
+        Signals.extract_many(many_signals, group="syntax")
+        with self.subTest("features extracted for all the signals"):
+            self.assertTrue(
+                all("syntax" in signals.features for signals in many_signals)
+            )
+        with self.subTest("each distinct utterance extracted once"):
+            self.assertEqual(len(mock_cache), 2)
+        with self.subTest("only the requested features extracted"):
+            self.assertNotIn("utterance", many_signals[0].features)
+
+
+class TestWordEmbeddings(TestCase):
+    def test_warm(self):
+        mock_embeddings = WordEmbeddings()
+        mock_embeddings.warm(["Hello {name}", "hi there"])
+        for word in ("hello", "{name}", "hi", "there"):
+            with self.subTest(f"{word} embedded ahead of time"):
+                self.assertIn(word, mock_embeddings.cache)
+
+    def test_max_pool(self):
+        mock_embeddings = WordEmbeddings()
+        with self.subTest("one embedding dimension"):
+            self.assertEqual(
+                mock_embeddings.max_pool(["hi", "hi", "there"]).shape, (300,)
+            )
+        with self.subTest("repeated words only embedded once"):
+            self.assertEqual(len(mock_embeddings.cache), 2)
+        with self.subTest("no words"):
+            self.assertFalse(mock_embeddings.max_pool([]).any())
+
+
+class TestLRUCache(TestCase):
+    def test_put_and_get(self):
+        mock_cache = LRUCache(max_entries=2)
+        mock_cache.put("a", 1)
+        with self.subTest("cached value returned"):
+            self.assertEqual(mock_cache.get("a"), 1)
+        with self.subTest("missing value returns None"):
+            self.assertIsNone(mock_cache.get("b"))
+        with self.subTest("hits and misses counted"):
+            self.assertEqual(mock_cache.stats()["hits"], 1)
+            self.assertEqual(mock_cache.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used(self):
+        mock_cache = LRUCache(max_entries=2)
+        mock_cache.put("a", 1)
+        mock_cache.put("b", 2)
+        mock_cache.get("a")
+        mock_cache.put("c", 3)
+        self.assertIn("a", mock_cache)
+        self.assertNotIn("b", mock_cache)
+        self.assertEqual(mock_cache.stats()["evictions"], 1)
+
+    def test_evicts_by_size(self):
+        mock_cache = LRUCache(max_entries=10, max_bytes=10, sizeof=lambda _, size: size)
+        mock_cache.put("a", 6)
+        mock_cache.put("b", 6)
+        with self.subTest("entries evicted to stay within max bytes"):
+            self.assertEqual(len(mock_cache), 1)
+            self.assertEqual(mock_cache.total_bytes, 6)
+        with self.subTest("entries bigger than the cache are not cached"):
+            mock_cache.put("c", 11)
+            self.assertNotIn("c", mock_cache)
+
+    def test_expires_after_ttl(self):
+        mock_cache = LRUCache(max_entries=10, ttl=0)
+        mock_cache.put("a", 1)
+        with self.subTest("expired value returns None"):
+            self.assertIsNone(mock_cache.get("a"))
+        with self.subTest("expired entries evicted"):
+            self.assertNotIn("a", mock_cache)
+            self.assertEqual(mock_cache.stats()["evictions"], 1)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,73 @@
+from unittest import TestCase, main
+from concurrent.futures import ThreadPoolExecutor
+
+from task_tracker.core.envelope_batcher import EnvelopeBatcher
+
+
+class TestEnvelopeBatcher(TestCase):
+    def test_forward(self):
+        batch_sizes = list()
+
+        def forward_many(envelopes):
+            batch_sizes.append(len(envelopes))
+            return [envelope.upper() for envelope in envelopes]
+
+        mock_batcher = EnvelopeBatcher(forward_many, max_size=4, max_wait_ms=50)
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(mock_batcher.forward, "abcdefgh"))
+        mock_batcher.close()
+        with self.subTest("each caller gets its own result"):
+            self.assertEqual(results, list("ABCDEFGH"))
+        with self.subTest("envelopes batched up to max size"):
+            self.assertLessEqual(max(batch_sizes), 4)
+            self.assertLess(len(batch_sizes), 8)
+        with self.subTest("batches counted"):
+            self.assertEqual(mock_batcher.stats()["batches"], len(batch_sizes))
+            self.assertEqual(mock_batcher.stats()["queue_depth"], 0)
+
+    def test_forward_error(self):
+        def forward_many(envelopes):
+            raise ValueError("bad envelope")
+
+        mock_batcher = EnvelopeBatcher(forward_many)
+        with self.assertRaises(ValueError):
+            mock_batcher.forward("a")
+        mock_batcher.close()
+
+    def test_forward_missing_results(self):
+        mock_batcher = EnvelopeBatcher(lambda envelopes: envelopes[1:])
+        with self.assertRaises(ValueError):
+            mock_batcher.forward("a")
+        mock_batcher.close()
+
+    def test_cancelled(self):
+        mock_batcher = EnvelopeBatcher(
+            lambda envelopes: [envelope.upper() for envelope in envelopes],
+            max_wait_ms=50,
+        )
+        cancelled_result = mock_batcher.submit("a")
+        cancelled_result.cancel()
+        with self.subTest("other callers still get their result"):
+            self.assertEqual(mock_batcher.forward("b"), "B")
+        mock_batcher.close()
+        with self.subTest("cancelled envelope not forwarded"):
+            self.assertEqual(mock_batcher.stats()["batches"], 1)
+            self.assertEqual(mock_batcher.stats()["mean_batch_size"], 1)
+
+    def test_closed(self):
+        mock_batcher = EnvelopeBatcher(lambda envelopes: envelopes, max_wait_ms=50)
+        queued_result = mock_batcher.submit("a")
+        mock_batcher.close()
+        with self.subTest("envelopes queued before close forwarded"):
+            self.assertEqual(queued_result.result(timeout=1), "a")
+        with self.subTest("envelopes rejected once closed"):
+            with self.assertRaises(RuntimeError):
+                mock_batcher.submit("b")
+            with self.assertRaises(RuntimeError):
+                mock_batcher.forward("b")
+        with self.subTest("closing again does nothing"):
+            mock_batcher.close()
+
+
+if __name__ == "__main__":
+    main()
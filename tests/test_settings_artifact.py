@@ -0,0 +1,77 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from os.path import join
+from pickle import dumps
+from tempfile import TemporaryDirectory
+from textwrap import dedent
+
+from task_tracker.yaml_utils.artifact import SettingsArtifact
+from task_tracker.yaml_utils.dataloader import YamlLoader
+
+mock_configuration = """
+Tasks:
+    Foo:
+        Action:
+            Say: Foo foo foo
+Slots:
+    location: [10]
+"""
+
+
+def write_settings(directory: str, say: str = "Foo foo foo") -> str:
+    settings_path = join(directory, "settings.yml")
+    with open(settings_path, "w") as settings_file:
+        settings_file.write(dedent(mock_configuration).replace("Foo foo foo", say))
+    return settings_path
+
+
+class TestSettingsArtifact(TestCase):
+    def test_load(self):
+        with TemporaryDirectory() as directory:
+            settings_path = write_settings(directory)
+            compiled_settings = SettingsArtifact.compile(settings_path)
+            with patch.object(
+                YamlLoader, "safe_load_tasks", wraps=YamlLoader.safe_load_tasks
+            ) as safe_load_tasks:
+                with self.subTest("up to date artifact loaded without validating"):
+                    self.assertEqual(
+                        SettingsArtifact.load(settings_path), compiled_settings
+                    )
+                    self.assertEqual(safe_load_tasks.call_count, 0)
+                write_settings(directory, say="Bar bar bar")
+                with self.subTest("changed yaml compiled again"):
+                    settings = SettingsArtifact.load(settings_path)
+                    self.assertEqual(settings.Tasks.Foo.Action.Say, ("Bar bar bar",))
+                    self.assertEqual(safe_load_tasks.call_count, 1)
+                with self.subTest("artifact rewritten"):
+                    SettingsArtifact.load(settings_path)
+                    self.assertEqual(safe_load_tasks.call_count, 1)
+
+    def test_load_unreadable_artifact(self):
+        with TemporaryDirectory() as directory:
+            settings_path = write_settings(directory)
+            for artifact in (
+                b"not a pickle",
+                dumps(dict(fingerprint="stale", settings=None)),
+                dumps(dict(settings=None)),
+                b"cbuiltins\nmissing_function\n.",
+                b"cmissing_module\nRecord\n.",
+            ):
+                with open(f"{settings_path}.compiled", "wb") as artifact_file:
+                    artifact_file.write(artifact)
+                with self.subTest("compiled again", artifact=artifact):
+                    settings = SettingsArtifact.load(settings_path)
+                    self.assertEqual(settings.Tasks.Foo.Action.Say, ("Foo foo foo",))
+
+    def test_compile_unwritable_artifact(self):
+        with TemporaryDirectory() as directory:
+            settings_path = write_settings(directory)
+            with self.assertWarns(UserWarning):
+                settings = SettingsArtifact.compile(
+                    settings_path, join(directory, "missing", "settings.compiled")
+                )
+            self.assertEqual(settings.Tasks.Foo.Action.Say, ("Foo foo foo",))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from threading import Thread
+
+from task_tracker.startup import (
+    LazyResource,
+    STARTUP_TIMES,
+    preload,
+    startup_report,
+    timed,
+)
+from task_tracker.datastructures.signals import utterance_encoder
+
+
+class TestLazyResource(TestCase):
+    def test_get(self):
+        loads = list()
+        mock_resource = LazyResource(
+            name="mock resource", load=lambda: loads.append(None) or len(loads)
+        )
+        with self.subTest("not loaded until first used"):
+            self.assertFalse(mock_resource.loaded)
+            self.assertEqual(loads, [])
+        threads = [Thread(target=mock_resource.get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self.subTest("loaded once by concurrent first uses"):
+            self.assertEqual(loads, [None])
+            self.assertEqual(mock_resource.get(), 1)
+        with self.subTest("load time recorded"):
+            self.assertIn("load mock resource", STARTUP_TIMES)
+
+    def test_registered(self):
+        self.assertIn(utterance_encoder, LazyResource.resources)
+
+    def test_preload(self):
+        with patch.object(LazyResource, "resources", list()):
+            mock_resource = LazyResource(name="preloaded resource", load=lambda: 1)
+            preload()
+        self.assertTrue(mock_resource.loaded)
+
+    def test_warm_up(self):
+        warm_ups = list()
+        with patch.object(LazyResource, "resources", list()):
+            preload(warm_up=lambda: warm_ups.append(None))
+        with self.subTest("warmed up once"):
+            self.assertEqual(warm_ups, [None])
+        with self.subTest("warm up time recorded"):
+            self.assertIn("warm up", STARTUP_TIMES)
+
+
+class TestStartupReport(TestCase):
+    def test_timed(self):
+        with timed("mock stage"):
+            pass
+        first_time = STARTUP_TIMES["mock stage"]
+        with timed("mock stage"):
+            pass
+        with self.subTest("repeated stages add up"):
+            self.assertGreaterEqual(STARTUP_TIMES["mock stage"], first_time)
+        with self.subTest("stage and total reported"):
+            report = startup_report()
+            self.assertIn("mock stage", report)
+            self.assertTrue(report.splitlines()[-1].endswith("total"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from asyncio import CancelledError, TimeoutError, ensure_future, run, sleep
+from time import sleep as block
+
+from tests.utils import temporary_configuration, configuration_path, classifier_path
+from task_tracker.core.state_tracker import StateTracker
+from task_tracker.datastructures.codec import StackCodec
+from task_tracker.datastructures.signals import Signals
+from task_tracker.datastructures.slots import Slots
+from task_tracker.datastructures.stack import Stack
+
+
+@temporary_configuration(
+    configuration="""
+    Tasks:
+        Foo:
+            Action:
+                Say: Foo foo foo
+                Do: TimeNow()
+        Bar:
+            Action:
+                Say: Bar bar bar
+            TriggeredBy: ({location} == 'London')
+    Slots:
+        location: [10]
+    Actions:
+        TimeNow:
+            TTL: 30
+    """,
+    filename=configuration_path,
+)
+def state_tracker():
+    return StateTracker(
+        settings_filename=configuration_path, task_classifier_path=classifier_path
+    )
+
+
+tracker = state_tracker()
+default_tracker = StateTracker(
+    settings_filename="task_tracker/config/settings.yml",
+    task_classifier_path=classifier_path,
+)
+
+
+def slowly(function, seconds):
+    def slow_function(*arguments, **keyword_arguments):
+        block(seconds)
+        return function(*arguments, **keyword_arguments)
+
+    return slow_function
+
+
+class TestStateTracker(TestCase):
+    def test_init(self):
+        with self.subTest("cache settings loaded as records"):
+            self.assertEqual(tracker.selector.settings.Actions["TimeNow"].TTL, 30)
+            self.assertEqual(
+                tracker.selector.settings.Actions["TimeNow"].MaxEntries, 1000
+            )
+        with self.subTest("cache policies set from the settings"):
+            action_cache = tracker.action_scheduler.action_cache
+            self.assertEqual(action_cache.policies["TimeNow"].ttl, 30)
+        with self.subTest("each tracker has its own cache policies"):
+            self.assertNotIn(
+                "TimeNow", default_tracker.action_scheduler.action_cache.policies
+            )
+
+    def test_update_encoded(self):
+        mock_stack = Stack()
+        for user_utterance, intent in (("hi there", "Greet"), ("tell me a joke", None)):
+            default_tracker.update(
+                signals=Signals(
+                    user_utterance=user_utterance, intent=intent, topic=None
+                ),
+                slots=Slots(name="Bob"),
+                tasks=mock_stack,
+            )
+        decoded_stack = StackCodec.decode(
+            StackCodec.encode(mock_stack),
+            tasks=default_tracker.selector.settings.Tasks,
+        )
+        with self.subTest("decoded stack is the same"):
+            self.assertEqual(
+                StackCodec.snapshot(decoded_stack), StackCodec.snapshot(mock_stack)
+            )
+        with self.subTest("no methods remembered"):
+            self.assertFalse(any(map(callable, mock_stack.memory.values())))
+
+
+class TestUpdateAsync(TestCase):
+    def test_result(self):
+        async_stack, sync_stack = Stack(), Stack()
+        run(
+            tracker.update_async(
+                signals=Signals(user_utterance="bla", intent=None, topic=None),
+                slots=Slots(location="London"),
+                tasks=async_stack,
+            )
+        )
+        tracker.update(
+            signals=Signals(user_utterance="bla", intent=None, topic=None),
+            slots=Slots(location="London"),
+            tasks=sync_stack,
+        )
+        with self.subTest("same turn as update"):
+            self.assertEqual(async_stack.triggered, ["Bar"])
+            self.assertEqual(
+                StackCodec.snapshot(async_stack), StackCodec.snapshot(sync_stack)
+            )
+
+    def test_timeout(self):
+        mock_stack = Stack()
+        with patch.object(
+            tracker.selector,
+            "select_tasks_via_model",
+            slowly(tracker.selector.select_tasks_via_model, seconds=0.5),
+        ):
+            with self.assertRaises(TimeoutError):
+                run(
+                    tracker.update_async(
+                        signals=Signals(user_utterance="foo", intent=None, topic=None),
+                        slots=Slots(),
+                        tasks=mock_stack,
+                        timeout=0.1,
+                    )
+                )
+        with self.subTest("no tasks pushed once timed out"):
+            self.assertEqual(mock_stack.predicted, [])
+            self.assertEqual(mock_stack.open_tasks(), [])
+            self.assertIsNone(mock_stack.system_utterance)
+
+    def test_cancelled(self):
+        mock_stack = Stack()
+
+        async def cancel_turn():
+            turn = ensure_future(
+                tracker.update_async(
+                    signals=Signals(user_utterance="bla", intent=None, topic=None),
+                    slots=Slots(location="London"),
+                    tasks=mock_stack,
+                )
+            )
+            await sleep(0.2)
+            turn.cancel()
+            with self.assertRaises(CancelledError):
+                await turn
+            return mock_stack.system_utterance
+
+        with patch.object(
+            tracker.compilor,
+            "pop_tasks_off_stack",
+            slowly(tracker.compilor.pop_tasks_off_stack, seconds=0.5),
+        ):
+            system_utterance = run(cancel_turn())
+        with self.subTest("started turn finished before the cancellation"):
+            self.assertEqual(system_utterance, "Bar bar bar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+from os import fsync, listdir
+from os.path import join
+from sqlite3 import OperationalError
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import sleep
+
+from task_tracker.storage.session_store import (
+    CachedSessionStore,
+    MemorySessionStore,
+    SQLiteSessionStore,
+    SessionStore,
+)
+from task_tracker.storage.session_journal import SessionJournal
+from task_tracker.datastructures.slots import Slots
+from task_tracker.datastructures.stack import Stack
+
+mock_session = (b"slots", b"stack")
+
+
+class TestMemorySessionStore(TestCase):
+    def test_put_and_get(self):
+        mock_store = MemorySessionStore()
+        mock_store.put("a", mock_session)
+        with self.subTest("stored session returned"):
+            self.assertEqual(mock_store.get("a"), mock_session)
+        with self.subTest("unknown session returns None"):
+            self.assertIsNone(mock_store.get("b"))
+        mock_store.delete("a")
+        with self.subTest("deleted session returns None"):
+            self.assertIsNone(mock_store.get("a"))
+
+    def test_expires_after_ttl(self):
+        mock_store = MemorySessionStore(ttl=0)
+        mock_store.put("a", mock_session)
+        self.assertIsNone(mock_store.get("a"))
+
+
+class TestSQLiteSessionStore(TestCase):
+    def test_put_and_get(self):
+        with TemporaryDirectory() as directory:
+            path = join(directory, "sessions.db")
+            mock_store = SQLiteSessionStore(path, batch_size=2, flush_interval=60)
+            mock_store.put("a", mock_session)
+            with self.subTest("waiting writes are read back"):
+                self.assertEqual(mock_store.pending, {"a": mock_session})
+                self.assertEqual(mock_store.get("a"), mock_session)
+            mock_store.put("b", mock_session)
+            with self.subTest("writes batched"):
+                self.assertEqual(mock_store.pending, {})
+            mock_store.delete("b")
+            mock_store.close()
+            reopened_store = SQLiteSessionStore(path)
+            with self.subTest("sessions written on close"):
+                self.assertEqual(reopened_store.get("a"), mock_session)
+                self.assertIsNone(reopened_store.get("b"))
+            reopened_store.close()
+
+    def test_flush_error(self):
+        with TemporaryDirectory() as directory:
+            path = join(directory, "sessions.db")
+            mock_store = SQLiteSessionStore(path, flush_interval=60)
+            mock_store.put("a", mock_session)
+            with mock_store.connection() as connection:
+                connection.execute("DROP TABLE sessions")
+            with self.subTest("error raised"):
+                with self.assertRaises(OperationalError):
+                    mock_store.flush()
+            with self.subTest("sessions wait for the next flush"):
+                self.assertEqual(mock_store.pending, {"a": mock_session})
+                self.assertEqual(mock_store.flushing, {})
+                self.assertEqual(mock_store.get("a"), mock_session)
+            with mock_store.connection() as connection:
+                self.assertFalse(connection.in_transaction)
+                connection.execute(
+                    "CREATE TABLE sessions "
+                    "(session_id TEXT PRIMARY KEY, slots BLOB, stack BLOB)"
+                )
+            mock_store.flush()
+            with self.subTest("sessions written by the next flush"):
+                self.assertEqual(mock_store.pending, {})
+                self.assertEqual(mock_store.get("a"), mock_session)
+            mock_store.close()
+
+    def test_connection_error(self):
+        with TemporaryDirectory() as directory:
+            mock_store = SQLiteSessionStore(join(directory, "sessions.db"))
+            mock_store.close()
+            mock_store.path = join(directory, "missing", "sessions.db")
+            with self.assertRaises(OperationalError):
+                mock_store.get("a")
+            self.assertEqual(mock_store.opened, 0)
+
+
+class TestCachedSessionStore(TestCase):
+    def test_read_through(self):
+        mock_backend = MemorySessionStore()
+        mock_backend.put("a", mock_session)
+        mock_store = CachedSessionStore(mock_backend)
+        mock_store.get("a")
+        mock_store.get("a")
+        with self.subTest("only first read goes to the store"):
+            self.assertEqual(mock_store.stats()["store_reads"], 1)
+            self.assertEqual(mock_store.stats()["hit_rate"], 0.5)
+        mock_store.put("b", mock_session)
+        with self.subTest("writes go through to the store"):
+            self.assertEqual(mock_backend.get("b"), mock_session)
+            self.assertEqual(mock_store.stats()["store_writes"], 1)
+
+    def test_write_latency(self):
+        with TemporaryDirectory() as directory:
+            mock_store = CachedSessionStore(
+                SQLiteSessionStore(join(directory, "sessions.db"), flush_interval=60)
+            )
+            mock_store.put("a", mock_session)
+            mock_store.put("b", mock_session)
+            with self.subTest("nothing written before the flush"):
+                self.assertEqual(mock_store.stats()["flushes"], 0)
+            mock_store.store.flush()
+            stats = mock_store.stats()
+            with self.subTest("sessions written in one transaction"):
+                self.assertEqual(stats["flushes"], 1)
+                self.assertEqual(stats["mean_flush_size"], 2)
+            with self.subTest("transaction timed"):
+                self.assertGreater(stats["write_latency"], 0)
+            mock_store.close()
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            SessionStore()
+
+
+class TestSessionJournal(TestCase):
+    def test_replay(self):
+        with TemporaryDirectory() as directory:
+            mock_journal = SessionJournal(directory, snapshot_every=2)
+            mock_stack = Stack()
+            for turn in range(3):
+                mock_stack.remember(slot_name="name", slot_value=f"Bob{turn}")
+                mock_journal.append("a", Slots(name="Bob"), mock_stack)
+            mock_journal.append("b", Slots(), Stack())
+            mock_journal.forget("b")
+            mock_journal.close()
+            with open(join(directory, listdir(directory)[0]), "ab") as segment:
+                segment.write(b"cut off by a crash")
+            replayed_journal = SessionJournal(directory)
+            with self.subTest("conversations rebuilt"):
+                self.assertEqual(list(replayed_journal.sessions), ["a"])
+                self.assertEqual(
+                    replayed_journal.sessions["a"][1].memory, {"name": "Bob2"}
+                )
+            replayed_journal.close()
+
+    def test_compaction(self):
+        with TemporaryDirectory() as directory:
+            mock_journal = SessionJournal(directory, compact_bytes=1)
+            mock_journal.append("a", Slots(name="Bob"), Stack())
+            mock_journal.append("b", Slots(), Stack())
+            mock_journal.close()
+            with self.subTest("older segments replaced by a snapshot"):
+                self.assertEqual(
+                    sorted(listdir(directory)),
+                    ["journal-00000003.log", "snapshot-00000003.snap"],
+                )
+            replayed_journal = SessionJournal(directory)
+            with self.subTest("conversations rebuilt from the snapshot"):
+                self.assertEqual(sorted(replayed_journal.sessions), ["a", "b"])
+            replayed_journal.close()
+
+    def test_group_commit(self):
+        with TemporaryDirectory() as directory:
+            mock_journal = SessionJournal(directory, commit_delay=0.05)
+            with patch(
+                "task_tracker.storage.session_journal.fsync", wraps=fsync
+            ) as mock_fsync:
+                sequences = [
+                    mock_journal.append(session_id, Slots(), Stack(), wait=False)
+                    for session_id in "abcdefgh"
+                ]
+                mock_journal.wait_for(sequences[-1])
+            with self.subTest("waits until the records are synced"):
+                self.assertGreaterEqual(mock_journal.committed, sequences[-1])
+            with self.subTest("records appended together synced together"):
+                self.assertEqual(mock_fsync.call_count, 1)
+            mock_journal.close()
+
+    def test_forget_idle(self):
+        with TemporaryDirectory() as directory:
+            mock_journal = SessionJournal(directory)
+            mock_journal.append("a", Slots(), Stack())
+            mock_journal.append("b", Slots(), Stack())
+            mock_journal.append("a", Slots(), Stack())
+            with self.subTest("active conversations kept"):
+                self.assertEqual(mock_journal.forget_idle(idle_seconds=60), [])
+            with self.subTest("idle conversations forgotten (oldest first)"):
+                self.assertEqual(mock_journal.forget_idle(idle_seconds=0), ["b", "a"])
+                self.assertEqual(mock_journal.sessions, {})
+            mock_journal.close()
+            replayed_journal = SessionJournal(directory)
+            with self.subTest("forgotten conversations not replayed"):
+                self.assertEqual(replayed_journal.sessions, {})
+            replayed_journal.close()
+
+    def test_closed(self):
+        with TemporaryDirectory() as directory:
+            mock_journal = SessionJournal(directory)
+            mock_journal.close()
+            with self.assertRaises(ValueError):
+                mock_journal.append("a", Slots(), Stack())
+
+    def test_wait_while_closing(self):
+        with TemporaryDirectory() as directory:
+            mock_journal = SessionJournal(directory, commit_delay=0.2)
+            sequence = mock_journal.append("a", Slots(), Stack(), wait=False)
+            closer = Thread(target=mock_journal.close)
+            closer.start()
+            sleep(0.05)
+            mock_journal.wait_for(sequence)
+            self.assertGreaterEqual(mock_journal.committed, sequence)
+            closer.join()
+
+
+if __name__ == "__main__":
+    main()
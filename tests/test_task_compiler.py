@@ -1,9 +1,21 @@
 from unittest import TestCase, main
+from concurrent.futures import Future
+from time import monotonic
+from os.path import join
+from tempfile import TemporaryDirectory
+from textwrap import dedent
+from yaml import YAMLError
 
 from tests.utils import temporary_configuration, configuration_path
 from task_tracker.yaml_utils.dataloader import YamlLoader
 from task_tracker.core.task_compiler import TaskCompiler
+from task_tracker.core.action_scheduler import ActionScheduler
+from task_tracker.core.action_cache import ActionCache
+from task_tracker.core.cache_policy import CachePolicy
+from task_tracker.yaml_utils.action_binder import ActionBinder
+from task_tracker.yaml_utils.template_parser import TemplateParser
 from task_tracker.datastructures.stack import Stack
+from task_tracker.datastructures.open_tasks import OpenTasks
 
 
 @temporary_configuration(
@@ -35,10 +47,15 @@ def settings():
     return YamlLoader.safe_load_tasks(configuration_path)
 
 
+def open_tasks():
+    mock_open_tasks = OpenTasks(mock_settings.Tasks)
+    mock_open_tasks.set_complete(task_name="IncompleteTask", complete=False)
+    return mock_open_tasks
+
+
 mock_settings = settings()
-mock_settings.Tasks.IncompleteTask.Complete = False
 mock_stack = Stack()
-mock_stack.open = mock_settings.Tasks
+mock_stack.open = open_tasks()
 
 
 class TestTaskCompiler(TestCase):
@@ -46,14 +63,97 @@ class TestTaskCompiler(TestCase):
         TaskCompiler.pop_tasks_off_stack(tasks=mock_stack)
         self.assertEqual(mock_stack.open_tasks(), ["IncompleteTask"])
 
-    def test_get_prompts(self):
-        prompts = TaskCompiler.get_prompts(open_tasks=mock_settings.Tasks)
-        self.assertIn("what is slotX?", prompts)
+    def test_get_missing_slot_prompts(self):
+        prompts = TaskCompiler.get_missing_slot_prompts(open_tasks=open_tasks())
+        self.assertEqual(list(prompts), ["what is slotX?"])
 
     def test_compile_tasks(self):
-        responses = TaskCompiler.compile_tasks(open_tasks=mock_settings.Tasks)
+        responses = TaskCompiler.compile_tasks(open_tasks=open_tasks())
+        self.assertIn("Bla bla bla", responses)
+
+    def test_compile_tasks_with_action_cache(self):
+        mock_cache = ActionCache()
+        mock_cache.configure({"ExampleAction": CachePolicy(ttl=60)})
+        for _ in range(2):
+            list(
+                TaskCompiler.compile_tasks(
+                    open_tasks=open_tasks(), action_cache=mock_cache
+                )
+            )
+        self.assertEqual(mock_cache.stats()["ExampleAction"]["hits"], 1)
+
+    def test_compile_tasks_with_scheduler(self):
+        responses = TaskCompiler.compile_tasks(
+            open_tasks=open_tasks(), scheduler=ActionScheduler()
+        )
         self.assertIn("Bla bla bla", responses)
 
+    def test_action_scheduler_results(self):
+        scheduler = ActionScheduler()
+        with self.subTest("results of the scheduled actions"):
+            self.assertEqual(
+                ActionScheduler.results(
+                    [scheduler.submit("ExampleAction({location})", {"location": "UK"})]
+                ),
+                {"__ExampleAction__": "some generated text"},
+            )
+        with self.subTest("no results if an action runs out of time"):
+            self.assertIsNone(
+                ActionScheduler.results([("ExampleAction", Future(), monotonic())])
+            )
+
+    def test_action_cache(self):
+        mock_cache = ActionCache()
+        mock_cache.configure({"ExampleAction": CachePolicy(ttl=60, max_entries=1)})
+        action = ActionBinder.bind("ExampleAction({location})")
+        mock_cache.call(action, {"location": "London"})
+        mock_cache.call(action, {"location": "London"})
+        mock_cache.call(action, {"location": "Paris"})
+        stats = mock_cache.stats()["ExampleAction"]
+        with self.subTest("cached by argument values"):
+            self.assertEqual(stats["hits"], 1)
+            self.assertEqual(stats["misses"], 2)
+        with self.subTest("least recently used results evicted"):
+            self.assertEqual(stats["evictions"], 1)
+        with self.subTest("actions without a cache policy are not cached"):
+            mock_cache.call(ActionBinder.bind("PlayRadio()"), {})
+            self.assertNotIn("PlayRadio", mock_cache.stats())
+        with self.subTest("cached None results are reused"):
+            mock_cache.caches["ExampleAction"].put(
+                ActionCache.key(action, {"location": "Rome"}), None
+            )
+            self.assertIsNone(mock_cache.call(action, {"location": "Rome"}))
+
+    def test_action_cache_settings(self):
+        with TemporaryDirectory() as directory:
+            settings_path = join(directory, "settings.yml")
+            with open(settings_path, "w") as settings_file:
+                settings_file.write(
+                    dedent(
+                        """
+                        Tasks:
+                            Foo:
+                                Action:
+                                    Do: TimeNow()
+                        Actions:
+                            TimeNow:
+                                MaxEntries: 10
+                        """
+                    )
+                )
+            with self.assertRaisesRegex(YAMLError, "TTL"):
+                YamlLoader.safe_load_tasks(settings_path)
+
+    def test_action_exists(self):
+        with self.subTest("custom action"):
+            YamlLoader.check_action_exists(task_name="Foo", action_name="TimeNow")
+        for action_name in ("Undefined", "cache_policy", "cache_action"):
+            with self.subTest("not a custom action", action_name=action_name):
+                with self.assertRaisesRegex(YAMLError, "undefined action"):
+                    YamlLoader.check_action_exists(
+                        task_name="Foo", action_name=action_name
+                    )
+
     def test_complete_task(self):
         with self.subTest("test for task with response"):
             response = TaskCompiler.complete_task(task=mock_settings.Tasks.Foo)
@@ -65,36 +165,38 @@ class TestTaskCompiler(TestCase):
     def test_get_action_dictionary(self):
         action_dictionary = TaskCompiler.get_action_dictionary(
             task_actions=mock_settings.Tasks.Bar.Action.Do,
-            slots={"location": "'London'"},
+            slots={"location": "London"},
         )
         self.assertEqual(
             dict(action_dictionary), {"__ExampleAction__": "some generated text"}
         )
 
     def test_get_slot_dictionary(self):
-        with self.subTest("as action parameter = False"):
-            slot_dictionary = TaskCompiler.get_slot_dictionary(
-                task_memory=mock_settings.Tasks.Bar.Memory, as_action_parameter=False
-            )
-            self.assertEqual(dict(slot_dictionary), {"location": "London"})
-
-            slot_dictionary = TaskCompiler.get_slot_dictionary(
-                task_memory=mock_settings.Tasks.IncompleteTask.Memory,
-                as_action_parameter=False,
-            )
-            self.assertEqual(dict(slot_dictionary), {"slotX": None})
-
-        with self.subTest("as action parameter = True"):
-            slot_dictionary = TaskCompiler.get_slot_dictionary(
-                task_memory=mock_settings.Tasks.Bar.Memory, as_action_parameter=True
-            )
-            self.assertEqual(dict(slot_dictionary), {"location": "'London'"})
+        slot_dictionary = TaskCompiler.get_slot_dictionary(
+            task_memory=mock_settings.Tasks.Bar.Memory
+        )
+        self.assertEqual(dict(slot_dictionary), {"location": "London"})
 
-            slot_dictionary = TaskCompiler.get_slot_dictionary(
-                task_memory=mock_settings.Tasks.IncompleteTask.Memory,
-                as_action_parameter=True,
+        slot_dictionary = TaskCompiler.get_slot_dictionary(
+            task_memory=mock_settings.Tasks.IncompleteTask.Memory,
+        )
+        self.assertEqual(dict(slot_dictionary), {"slotX": None})
+
+    def test_bind_action(self):
+        action = ActionBinder.bind("ExampleAction({location}, 'km', units=None)")
+        with self.subTest("call parsed into the custom action and its arguments"):
+            self.assertEqual(action.name, "ExampleAction")
+            self.assertEqual(action.arguments[0].slot_name, "location")
+            self.assertEqual(action.arguments[1].literal, "km")
+            self.assertIsNone(action.keyword_arguments["units"].literal)
+        with self.subTest("bound once per call"):
+            self.assertIs(
+                ActionBinder.bind("ExampleAction({location}, 'km', units=None)"),
+                action,
             )
-            self.assertEqual(dict(slot_dictionary), {"slotX": "'None'"})
+        with self.subTest("only slots and literals as arguments"):
+            with self.assertRaises(ValueError):
+                ActionBinder.bind("ExampleAction(open('file.txt'))")
 
     def test_fill_response_template(self):
         filled_template = TaskCompiler.fill_response_template(
@@ -106,6 +208,32 @@ class TestTaskCompiler(TestCase):
             filled_template, "bla bla London bla bla some generated text bla bla"
         )
 
+    def test_parse_template(self):
+        parsed_template = TemplateParser.parse("It is __TimeNow__ in {location}")
+        with self.subTest("segments of the template"):
+            self.assertEqual(parsed_template.slot_names, ["location"])
+            self.assertEqual(parsed_template.action_names, ["__TimeNow__"])
+        with self.subTest("parsed once per template"):
+            self.assertIs(
+                TemplateParser.parse("It is __TimeNow__ in {location}"),
+                parsed_template,
+            )
+        with self.subTest("render the template"):
+            self.assertEqual(
+                parsed_template.render(
+                    slot_values={"location": "London"},
+                    action_results={"__TimeNow__": "3pm"},
+                ),
+                "It is 3pm in London",
+            )
+        with self.subTest("action references without a result left as they are"):
+            self.assertEqual(
+                parsed_template.render(
+                    slot_values={"location": "London"}, action_results={}
+                ),
+                "It is __TimeNow__ in London",
+            )
+
     def test_impossible_task(self):
         response = TaskCompiler.impossible_task(task_label="Foo")
         self.assertIn("foo", response.split())
@@ -1,4 +1,6 @@
 from unittest import TestCase, main
+from numpy import array
+from numpy.testing import assert_allclose
 
 from tests.utils import temporary_configuration, configuration_path, classifier_path
 from task_tracker.yaml_utils.dataloader import YamlLoader
@@ -6,6 +8,7 @@ from task_tracker.core.task_policy import TaskPolicy
 from task_tracker.datastructures.slots import Slots
 from task_tracker.datastructures.signals import Signals
 from task_tracker.datastructures.stack import Stack
+from task_tracker.trained_models.task_classifier import TaskClassifier
 
 
 @temporary_configuration(
@@ -52,25 +55,51 @@ class TestTaskPolicy(TestCase):
             self.assertIn("Foo", mock_stack.open_tasks())
         with self.subTest("check triggered task overrides predicted"):
             mock_stack = Stack()
+            mock_signals = Signals(user_utterance="foo", intent=None, topic=None)
             policy.push_tasks_to_stack(
-                signals=Signals(user_utterance="foo", intent=None, topic=None),
+                signals=mock_signals,
                 slots=Slots(location="London"),
                 tasks=mock_stack,
             )
             self.assertEqual(mock_stack.triggered, ["Bar"])
             self.assertIn("Bar", mock_stack.open_tasks())
-            self.assertEqual(mock_stack.predicted, ["Foo"])
+            self.assertEqual(mock_stack.predicted, [])
+            self.assertEqual(mock_signals.features, dict())
             self.assertNotIn("Foo", mock_stack.open_tasks())
 
     def test_update_slot_values(self):
+        mock_stack = Stack()
         policy.update_slot_values(
             slots=Slots(location="Washington DC"),
             signals=Signals(user_utterance="bla", intent=None, topic=None),
-            tasks=Stack(),
+            tasks=mock_stack,
         )
-        self.assertEqual(
-            policy.settings.Tasks.Bar.Memory.location.Default, "Washington DC"
+        with self.subTest("slot value remembered for the conversation"):
+            self.assertEqual(mock_stack.memory["location"], "Washington DC")
+        with self.subTest("shared settings are not modified"):
+            self.assertIsNone(policy.settings.Tasks.Bar.Memory.location.Default)
+
+    def test_update_slot_values_lazily(self):
+        default_policy = TaskPolicy(
+            settings=YamlLoader.safe_load_tasks("task_tracker/config/settings.yml"),
+            task_classifier_path=classifier_path,
         )
+        mock_stack = Stack()
+        mock_signals = Signals(user_utterance="hi there", intent="Greet", topic=None)
+        default_policy.push_tasks_to_stack(
+            signals=mock_signals, slots=Slots(name="Bob"), tasks=mock_stack
+        )
+        with self.subTest("task triggered"):
+            self.assertEqual(mock_stack.triggered, ["ChitChat"])
+        with self.subTest("utterance not encoded to fill slots"):
+            self.assertNotIn("utterance", mock_signals.features)
+            self.assertNotIn("sentiment", mock_stack.memory)
+        with self.subTest("slots filled by extracted features"):
+            default_policy.select_tasks_via_model(signals=mock_signals)
+            default_policy.update_feature_slot_values(
+                signals=mock_signals, tasks=mock_stack
+            )
+            self.assertEqual(mock_stack.memory["sentiment"], mock_signals.sentiment)
 
     def test_select_tasks_via_model(self):
         with self.subTest("predicting using empty string doesnt throw error"):
@@ -108,6 +137,52 @@ class TestTaskPolicy(TestCase):
             )
             self.assertIn("QuerySlotLocation", predicted_tasks)
 
+    def test_select_tasks_via_model_many(self):
+        predicted_tasks = policy.select_tasks_via_model_many(
+            signals=[
+                Signals(user_utterance="foo", intent=None, topic=None),
+                Signals(user_utterance="bar", intent=None, topic=None),
+            ]
+        )
+        with self.subTest("one prediction per signals"):
+            self.assertEqual(len(predicted_tasks), 2)
+        with self.subTest("predictions in the same order as the signals"):
+            self.assertIn("Foo", predicted_tasks[0])
+            self.assertIn("Bar", predicted_tasks[1])
+
+    def test_classify_many_cascade(self):
+        cascade_classifier = TaskClassifier(
+            settings=mock_settings,
+            classifier_path=classifier_path,
+            cascade_threshold=0.0,
+        )
+        mock_signals = Signals(user_utterance="foo", intent=None, topic=None)
+        task_labels = cascade_classifier.classify_many([mock_signals])
+        with self.subTest("one task label per signals"):
+            self.assertEqual(len(task_labels), 1)
+            self.assertIn(task_labels[0], mock_settings.Tasks)
+        with self.subTest("confident turns stop at the cheap tier"):
+            self.assertNotIn("utterance", mock_signals.features)
+            self.assertEqual(cascade_classifier.cascade_stats()["full"]["turns"], 0)
+            self.assertEqual(cascade_classifier.cascade_stats()["cheap"]["hit_rate"], 1)
+        with self.subTest("confidence margin between the top two classes"):
+            margins = TaskClassifier.confidence_margins(
+                array([[0.7, 0.2, 0.1], [1.0, 0.0, 0.0]])
+            )
+            self.assertAlmostEqual(margins[0], 0.5)
+            self.assertAlmostEqual(margins[1], 1.0)
+
+    def test_encode_train_data(self):
+        serial_x, serial_y = TaskClassifier.encode_train_data(settings=mock_settings)
+        parallel_x, parallel_y = TaskClassifier.encode_train_data(
+            settings=mock_settings, workers=2
+        )
+        with self.subTest("same examples in the same order"):
+            self.assertEqual(parallel_y.tolist(), serial_y.tolist())
+        with self.subTest("same signal vectors"):
+            self.assertEqual(parallel_x.shape, serial_x.shape)
+            assert_allclose(parallel_x, serial_x, atol=1e-6)
+
     def test_get_task_data(self):
         tasks = list(policy.get_task_data(task_labels=["Foo"]))
         self.assertEqual(tasks[0], ("Foo", mock_settings.Tasks.Foo))
@@ -144,37 +219,64 @@ class TestTaskPolicy(TestCase):
             )
             self.assertNotIn("Bar", predicted_tasks)
 
-    def test_get_trigger_slots(self):
-        expected_mapping = {
-            "user_utterance": "'bla'",
-            "intent": "'Greet'",
-            "topic": "'Food'",
+    def test_check_task_triggers_memoised(self):
+        mock_stack = Stack()
+        list(
+            policy.check_task_triggers(
+                signals=Signals(user_utterance="bla", intent=None, topic=None),
+                slots=Slots(location="London"),
+                tasks=mock_stack,
+            )
+        )
+        with self.subTest("trigger inputs and results remembered in stack"):
+            self.assertEqual(mock_stack.trigger_values, {"location": "London"})
+            self.assertEqual(mock_stack.trigger_results, {"Bar"})
+        with self.subTest("unchanged slots do not re-evaluate their triggers"):
+            stale_triggers = policy.get_stale_triggers(
+                trigger_values={"location": "London"},
+                previous_values=mock_stack.trigger_values,
+            )
+            self.assertEqual(stale_triggers, set())
+        with self.subTest("changed slots re-evaluate their triggers"):
+            stale_triggers = policy.get_stale_triggers(
+                trigger_values={"location": "Paris"},
+                previous_values=mock_stack.trigger_values,
+            )
+            self.assertEqual(stale_triggers, {"Bar"})
+
+    def test_index_trigger_dependencies(self):
+        self.assertEqual(policy.trigger_dependencies, {"location": ["Bar"]})
+
+    def test_compile_triggers(self):
+        with self.subTest("only tasks with slots in their trigger are compiled"):
+            self.assertEqual(list(policy.triggers), ["Bar"])
+        with self.subTest("compiled trigger binds slot values as variables"):
+            self.assertEqual(policy.triggers["Bar"].slot_names, ("location",))
+            self.assertTrue(policy.triggers["Bar"]("London"))
+            self.assertFalse(policy.triggers["Bar"]("Mayor's house"))
+
+    def test_get_trigger_values(self):
+        expected_values = {
+            "user_utterance": "bla",
+            "intent": "Greet",
+            "topic": "Food",
             "sentiment": 0.0,
             "formality": 1.0,
-            "name": "'Georgie'",
-            "location": "'Balham'",
+            "name": "Georgie",
+            "location": "Balham",
             "system_utterance": None,
             "system_prompt": None,
+            "undeclared_slot": None,
         }
-        mapping = dict(
-            policy.get_trigger_slots(
-                trigger_condition="bla {user_utterance} {intent} {topic} {sentiment} {formality} {name} {location} {system_utterance} {system_prompt}",
-                signals=Signals(user_utterance="bla", intent="Greet", topic="Food"),
-                slots=Slots(name="Georgie", location="Balham"),
-                tasks=Stack(),
-            )
+        values = policy.get_trigger_values(
+            slot_names=tuple(expected_values),
+            signals=Signals(user_utterance="bla", intent="Greet", topic="Food"),
+            slots=Slots(name="Georgie", location="Balham"),
+            tasks=Stack(),
         )
-        for key, value in expected_mapping.items():
-            with self.subTest(f"expected mapping key:{key}"):
-                self.assertEqual(value, mapping[key])
-
-    def test_format_slot_value(self):
-        with self.subTest("does not modify non-string values"):
-            result = policy.format_slot_value(slot_value=10.0)
-            self.assertEqual(result, 10.0)
-        with self.subTest("modifies string values"):
-            result = policy.format_slot_value(slot_value="Mayor's house")
-            self.assertEqual(result, "'Mayor s house'")
+        for (key, expected_value), value in zip(expected_values.items(), values):
+            with self.subTest(f"expected value for key:{key}"):
+                self.assertEqual(expected_value, value)
 
 
 if __name__ == "__main__":
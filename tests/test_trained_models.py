@@ -0,0 +1,96 @@
+from unittest import TestCase, main
+from os import listdir, utime
+from tempfile import TemporaryDirectory
+
+from numpy import array, eye, repeat
+from numpy.random import default_rng
+
+from task_tracker.trained_models.model_cache import ModelCache
+from task_tracker.trained_models.backends import (
+    ClassifierBackend,
+    FlatForestBackend,
+    LinearBackend,
+    NearestCentroidBackend,
+    RandomForestBackend,
+)
+
+mock_y = repeat(array([0, 1, 2]), 20)
+mock_x = eye(3)[mock_y] * 4 + default_rng(0).normal(scale=0.5, size=(60, 3))
+
+
+class TestModelCache(TestCase):
+    def test_key(self):
+        with self.subTest("same dependencies same key"):
+            self.assertEqual(
+                ModelCache.key({"a": 1, "b": [2]}, "v1"),
+                ModelCache.key({"b": [2], "a": 1}, "v1"),
+            )
+        with self.subTest("changed dependencies new key"):
+            self.assertNotEqual(ModelCache.key("v1"), ModelCache.key("v2"))
+
+    def test_save_and_load(self):
+        with TemporaryDirectory() as directory:
+            mock_cache = ModelCache(directory, prefix="mock")
+            with self.subTest("nothing cached"):
+                self.assertIsNone(mock_cache.load("a"))
+            mock_cache.save("a", {"weights": [1, 2, 3]})
+            with self.subTest("cached model loaded"):
+                self.assertEqual(mock_cache.load("a"), {"weights": [1, 2, 3]})
+            with self.subTest("no temporary files left"):
+                self.assertEqual(listdir(directory), ["mock-a.joblib"])
+
+    def test_evict(self):
+        with TemporaryDirectory() as directory:
+            mock_cache = ModelCache(directory, prefix="mock", max_bytes=0)
+            mock_cache.save("a", list(range(100)))
+            utime(mock_cache.path("a"), (0, 0))
+            mock_cache.save("b", list(range(100)))
+            with self.subTest("least recently used model removed"):
+                self.assertEqual(listdir(directory), ["mock-b.joblib"])
+            with self.subTest("other prefixes left alone"):
+                ModelCache(directory, prefix="other", max_bytes=0).save("c", [])
+                self.assertIn("mock-b.joblib", listdir(directory))
+
+
+class TestBackends(TestCase):
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            ClassifierBackend()
+
+    def test_fit_and_predict_proba(self):
+        for backend in (NearestCentroidBackend(), LinearBackend()):
+            backend.fit(mock_x, mock_y)
+            probabilities = backend.predict_proba(mock_x)
+            with self.subTest("one probability per class", backend=backend):
+                self.assertEqual(probabilities.shape, (60, 3))
+                self.assertEqual(backend.classes.tolist(), [0, 1, 2])
+            with self.subTest("probabilities sum to one", backend=backend):
+                self.assertTrue((probabilities >= 0).all())
+                self.assertTrue(abs(probabilities.sum(axis=1) - 1).max() < 1e-9)
+            with self.subTest("separable classes predicted", backend=backend):
+                self.assertEqual(backend.predict(mock_x).tolist(), mock_y.tolist())
+            with self.subTest("single rows predicted", backend=backend):
+                self.assertEqual(backend.predict(mock_x[:1]).tolist(), [0])
+
+    def test_flat_forest(self):
+        random_forest = RandomForestBackend(n_estimators=10)
+        random_forest.fit(mock_x, mock_y)
+        flat_forest = FlatForestBackend.export(random_forest)
+        unseen_x = default_rng(1).normal(scale=3, size=(50, 3))
+        with self.subTest("same probabilities as sklearn"):
+            self.assertTrue(
+                abs(
+                    flat_forest.predict_proba(unseen_x)
+                    - random_forest.predict_proba(unseen_x)
+                ).max()
+                < 1e-8
+            )
+        with self.subTest("same predictions as sklearn"):
+            self.assertEqual(
+                flat_forest.predict(unseen_x).tolist(),
+                random_forest.predict(unseen_x).tolist(),
+            )
+
+
+if __name__ == "__main__":
+    main()